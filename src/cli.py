@@ -0,0 +1,424 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+命令行入口（不创建图形界面），用于定时导入和批量查询。
+
+用法:
+    python -m src.cli import <档案目录> [--extract-metadata] [--parse-excel]
+    python -m src.cli import [根目录] --manifest <文件清单.csv|.jsonl|.json> [--extract-metadata]
+    python -m src.cli import <档案目录> --dry-run [--format csv|json] [--output 报告.csv]
+    python -m src.cli import-archives <档案目录> [--restart]
+    python -m src.cli search [--name 姓名] [--id 编号] [--format csv|json]
+    python -m src.cli cleanup
+    python -m src.cli export [--name 姓名] [--id 编号] [--format csv|json] [--output 文件.xlsx]
+    python -m src.cli lookup [列表文件] [--format csv|json] [--output 文件.xlsx]
+    python -m src.cli publish [发布目录]
+    python -m src.cli stats [--incomplete] [--format csv|json]
+    python -m src.cli audit [--excel-root 目录] [--format csv|json] [--output 报告.csv]
+    python -m src.cli backup [--backup-dir 目录] [--keep 数量]
+    python -m src.cli restore <备份文件>
+    python -m src.cli maintain [--force]
+    python -m src.cli access-log [--user 用户] [--name 姓名] [--id 编号] [--since 日期] [--until 日期]
+
+结果输出到标准输出（json 格式为每行一个JSON对象），日志输出到标准错误和日志文件。
+"""
+
+import sys
+import csv
+import json
+import argparse
+import logging
+import multiprocessing
+
+from src.config.logger import setup_logger
+from src.config.user_settings import load_user_settings
+from src.models.database import Database
+from src.models.replica import open_database, publish_snapshot
+from src.models.taxonomy import CategoryTaxonomy, set_taxonomy
+from src.controllers.file_manager import FileManager
+from src.utils.process_pool import shutdown_process_pool
+
+# 输出字段
+SEARCH_FIELDS = ['file_id', 'person_name', 'class_code', 'file_name', 'page_count', 'file_path']
+EXPORT_FIELDS = ['file_id', 'person_name', 'dir_name', 'class_code', 'material_name', 'file_name',
+                 'file_date', 'page_count', 'file_path']
+
+# 不修改数据库的命令
+READ_ONLY_COMMANDS = ('search', 'export', 'lookup', 'stats', 'access-log')
+
+
+def write_rows(rows, fields, output_format, out=None):
+    """
+    流式输出结果行。
+    :param rows: 可迭代的 dict 行
+    :param fields: 输出的字段列表
+    :param output_format: csv 或 json
+    :return: 输出的行数
+    """
+    out = out or sys.stdout
+    count = 0
+    if output_format == 'json':
+        for row in rows:
+            out.write(json.dumps({field: row.get(field, '') for field in fields}, ensure_ascii=False))
+            out.write('\n')
+            count += 1
+    else:
+        writer = csv.DictWriter(out, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    out.flush()
+    return count
+
+
+def cmd_import_archives(db, args):
+    """增量导入档案目录，上次导入未完成时从检查点继续"""
+    from src.controllers.archive_import import ArchiveImporter
+
+    importer = ArchiveImporter(db)
+    unfinished = None if args.restart else importer.find_resumable_run(args.folder)
+    if unfinished:
+        print(f"继续上次未完成的导入（已完成 {unfinished['done_count']}/{unfinished['folder_count']} 个目录）",
+              file=sys.stderr)
+    try:
+        importer.run(args.folder, unfinished['id'] if unfinished else None)
+    except KeyboardInterrupt:
+        print("导入已中断，再次执行可从上次完成的目录继续", file=sys.stderr)
+        return 130
+    stats = importer.stats
+    print(f"导入 {stats['imported']} 个人员目录，{stats['files']} 个新文件，跳过已完成的 {stats['skipped']} 个目录",
+          file=sys.stderr)
+    return 0
+
+
+def preview_import(db, args):
+    """导入预览：汇总输出到标准错误，变化明细输出到标准输出或 --output 指定的CSV，不修改数据"""
+    from src.controllers.import_preview import ImportPreview, PREVIEW_FIELDS
+
+    preview = ImportPreview(db)
+    if args.manifest:
+        stats = preview.scan_manifest(args.manifest, db.conn, args.folder)
+    elif args.folder:
+        stats = preview.scan_folder(args.folder, db.conn)
+    else:
+        print("请指定人员档案文件夹或文件清单（--manifest）", file=sys.stderr)
+        return 2
+    print(f"扫描 {stats.pop('scanned')} 个文件，未变化 {stats.pop('unchanged')} 个", file=sys.stderr)
+    for description, count in stats.items():
+        print(f"{description}: {count}", file=sys.stderr)
+    if args.output:
+        report_path, _ = preview.write_report(db.conn, args.output)
+        print(f"变化明细已保存: {report_path}", file=sys.stderr)
+    else:
+        write_rows(preview.iter_changes(db.conn), PREVIEW_FIELDS, args.format)
+    return 0
+
+
+def cmd_import(db, args):
+    """全量导入档案目录（或按文件清单导入）"""
+    if args.dry_run:
+        return preview_import(db, args)
+    if args.manifest:
+        imported_count = FileManager.import_manifest(db, args.manifest, args.folder)
+    elif args.folder:
+        imported_count = FileManager.import_files(db, args.folder)
+    else:
+        print("请指定人员档案文件夹或文件清单（--manifest）", file=sys.stderr)
+        return 2
+    print(f"文件导入成功，共导入 {imported_count} 个文件", file=sys.stderr)
+
+    if args.extract_metadata:
+        from src.controllers.pdf_metadata import PdfMetadataExtractor
+        PdfMetadataExtractor(db).run()
+
+    if args.parse_excel and args.folder:
+        from src.controllers.workbook_ingest import WorkbookIngestor
+        stats = WorkbookIngestor(db).run(args.folder)
+        print(f"Excel目录解析完成，新解析 {stats['parsed']} 个文件，失败 {stats['errors']} 个", file=sys.stderr)
+    return 0
+
+
+def cmd_search(db, args):
+    """按姓名/编号搜索文件"""
+    if not args.name and not args.id:
+        print("请输入姓名或编号进行搜索", file=sys.stderr)
+        return 2
+
+    # 只按姓名搜索时提示重名情况（命令行不交互，结果中会包含编号列）
+    if args.name and not args.id:
+        id_list = FileManager.find_duplicate_ids(db, args.name)
+        if len(id_list) > 1:
+            print(f"发现 {len(id_list)} 个同名人员，编号: {', '.join(id_list)}", file=sys.stderr)
+
+    rows = FileManager.iter_catalog(db, args.name, args.id, pdf_only=True)
+    count = write_rows(rows, SEARCH_FIELDS, args.format)
+    print(f"找到 {count} 个匹配文件", file=sys.stderr)
+    return 0 if count else 1
+
+
+def cmd_cleanup(db, args):
+    """清理重复和无效记录"""
+    duplicate_count, missing_count = FileManager.cleanup_database(db)
+    print(f"数据库清理完成！删除重复记录 {duplicate_count} 条，无效记录 {missing_count} 条", file=sys.stderr)
+    return 0
+
+
+def cmd_export(db, args):
+    """导出档案目录（含Excel中的材料信息）"""
+    from src.controllers.exporter import CatalogExporter
+
+    excel_root = args.excel_root or load_user_settings().get('import_root_dir')
+    exporter = CatalogExporter(db, excel_root)
+    if args.output:
+        count = exporter.export_catalog(args.output, args.name, args.id)
+    else:
+        count = write_rows(exporter.iter_rows(args.name, args.id), EXPORT_FIELDS, args.format)
+    print(f"共导出 {count} 条记录", file=sys.stderr)
+    return 0
+
+
+def cmd_lookup(db, args):
+    """批量查询编号/姓名列表（从文件或标准输入读取）"""
+    from src.controllers.exporter import CatalogExporter
+
+    if args.list_file:
+        with open(args.list_file, encoding='utf-8-sig') as f:
+            text = f.read()
+    else:
+        text = sys.stdin.read()
+    tokens = FileManager.parse_lookup_tokens(text)
+    if not tokens:
+        print("列表为空", file=sys.stderr)
+        return 2
+
+    rows, duplicate_names, unmatched = FileManager.batch_lookup(db, tokens)
+    for name, id_list in duplicate_names.items():
+        print(f"同名人员 {name}，编号: {', '.join(id_list)}", file=sys.stderr)
+    if unmatched:
+        print(f"未找到 {len(unmatched)} 个: {', '.join(unmatched)}", file=sys.stderr)
+
+    exporter = CatalogExporter(db, args.excel_root or load_user_settings().get('import_root_dir'))
+    rows = exporter.enrich_rows(rows)
+    if args.output:
+        count = exporter.export_rows(rows, args.output)
+    else:
+        count = write_rows(rows, EXPORT_FIELDS, args.format)
+    print(f"共找到 {count} 个文件", file=sys.stderr)
+    return 0 if count else 1
+
+
+def cmd_publish(db, args):
+    """发布数据库快照，供其他电脑同步只读副本"""
+    publish_dir = args.publish_dir or load_user_settings().get('replica_dir')
+    if not publish_dir:
+        print("请指定发布目录", file=sys.stderr)
+        return 2
+    manifest = publish_snapshot(db, publish_dir)
+    print(f"已发布数据库快照，版本 {manifest['version']}", file=sys.stderr)
+    return 0
+
+
+def cmd_stats(db, args):
+    """输出档案统计：汇总和各分类数量输出到标准错误，人员统计输出到标准输出"""
+    from src.controllers.archive_stats import PERSON_STATS_FIELDS, iter_person_stats, get_category_counts
+    from src.models.taxonomy import get_taxonomy
+
+    stats = db.get_archive_stats()
+    summary = stats['summary']
+    print(f"共 {summary['persons']} 人，{summary['files']} 个文件，{summary['pdfs']} 个PDF，"
+          f"{summary['pages']} 页", file=sys.stderr)
+    taxonomy = get_taxonomy()
+    counts = get_category_counts(stats, taxonomy)
+    for category in taxonomy:
+        indent = '  ' if category.parent_code else ''
+        print(f"{indent}{category.display_text}: {counts.get(category.code, 0)}", file=sys.stderr)
+
+    count = write_rows(iter_person_stats(stats, args.incomplete), PERSON_STATS_FIELDS, args.format)
+    print(f"共 {count} 人{'档案不完整' if args.incomplete else ''}", file=sys.stderr)
+    return 0
+
+
+def cmd_audit(db, args):
+    """检查全部档案的PDF文件与Excel目录是否一致"""
+    from src.controllers.audit import ArchiveAuditor, AUDIT_FIELDS
+
+    excel_root = args.excel_root or load_user_settings().get('import_root_dir')
+    if not excel_root:
+        print("请指定Excel目录文件所在根目录", file=sys.stderr)
+        return 2
+    auditor = ArchiveAuditor(db)
+    run_id = auditor.run(excel_root)
+    if args.output:
+        _, count = auditor.write_report(run_id, args.output)
+    else:
+        count = write_rows(auditor.iter_issues(run_id), AUDIT_FIELDS, args.format)
+    for issue_type, number in auditor.stats.items():
+        print(f"{issue_type}: {number}", file=sys.stderr)
+    print(f"共发现 {count} 个问题", file=sys.stderr)
+    return 1 if count else 0
+
+
+def cmd_backup(db, args):
+    """在线备份数据库到备份目录，并删除超出保留数量的旧备份"""
+    from src.models.backup import create_backup, DEFAULT_KEEP_BACKUPS
+    from src.utils.paths import get_backup_dir
+
+    settings = load_user_settings()
+    backup_dir = args.backup_dir or get_backup_dir(settings)
+    keep = args.keep or settings.get('backup_keep', DEFAULT_KEEP_BACKUPS)
+    info = create_backup(db.conn, backup_dir, keep=keep)
+    print(f"数据库已备份: {info['path']}", file=sys.stderr)
+    return 0
+
+
+def cmd_restore(db, args):
+    """从备份恢复数据库（恢复前自动备份当前数据库）"""
+    from src.models.backup import restore_backup
+    from src.utils.paths import get_backup_dir
+
+    safety_backup = restore_backup(db, args.backup_file, get_backup_dir(load_user_settings()))
+    print(f"数据库已恢复，恢复前的数据库已备份到: {safety_backup['path']}", file=sys.stderr)
+    return 0
+
+
+def cmd_maintain(db, args):
+    """执行到期的数据库维护任务（回收空闲页、更新统计信息、完整性检查）"""
+    from src.controllers.maintenance import DatabaseMaintenance
+
+    maintenance = DatabaseMaintenance(db)
+    results = maintenance.run(force=args.force)
+    if not results:
+        print("没有到期的维护任务", file=sys.stderr)
+    for task, result, duration in results:
+        print(f"{task}\t{result}\t{duration:.1f}s")
+    page_count, freelist_count = DatabaseMaintenance.get_fragmentation(db.conn)
+    print(f"数据库: {page_count} 页，空闲页 {freelist_count}", file=sys.stderr)
+    return 0 if all(result == 'ok' for _, result, _ in results) else 1
+
+
+def cmd_access_log(db, args):
+    """按用户、人员和日期查询访问记录"""
+    from datetime import datetime, timedelta
+    from src.controllers.access_log import AccessLog, ACCESS_LOG_FIELDS
+
+    since = datetime.strptime(args.since, '%Y-%m-%d').timestamp() if args.since else None
+    until = (datetime.strptime(args.until, '%Y-%m-%d') + timedelta(days=1)).timestamp() if args.until else None
+    rows = AccessLog(db).query(user_name=args.user, person_name=args.name, file_id=args.id,
+                               start_time=since, end_time=until, limit=args.limit)
+    count = write_rows(rows, ACCESS_LOG_FIELDS, args.format)
+    print(f"共 {count} 条访问记录", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description='档案检索系统命令行工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='全量导入档案目录')
+    import_parser.add_argument('folder', nargs='?',
+                               help='人员档案文件夹（使用 --manifest 时为清单中相对路径的根目录）')
+    import_parser.add_argument('--manifest', help='按文件清单导入，不遍历目录（CSV 含 path 列，或 JSONL、JSON 对象数组）')
+    import_parser.add_argument('--extract-metadata', action='store_true', help='导入后提取PDF页数和元数据')
+    import_parser.add_argument('--parse-excel', action='store_true', help='导入后解析全部Excel目录文件并入库')
+    import_parser.add_argument('--dry-run', action='store_true', help='只比对并输出导入后的变化，不修改数据')
+    import_parser.add_argument('--output', help='导入预览的变化明细保存到CSV文件，不指定时输出到标准输出')
+    import_parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='导入预览的输出格式')
+    import_parser.set_defaults(func=cmd_import)
+
+    for name, func, help_text in (('search', cmd_search, '搜索人员档案'), ('export', cmd_export, '导出档案目录')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--name', help='姓名（完全匹配）')
+        sub.add_argument('--id', help='编号')
+        sub.add_argument('--format', choices=['csv', 'json'], default='csv', help='输出格式')
+        sub.set_defaults(func=func)
+
+    export_parser = subparsers.choices['export']
+    export_parser.add_argument('--output', help='导出到文件（.xlsx 或 .csv），不指定时输出到标准输出')
+    export_parser.add_argument('--excel-root', help='Excel目录文件所在根目录，默认使用界面中设置的导入目录')
+
+    lookup_parser = subparsers.add_parser('lookup', help='批量查询编号/姓名列表')
+    lookup_parser.add_argument('list_file', nargs='?', help='编号/姓名列表文件（每行一个或逗号分隔），不指定时从标准输入读取')
+    lookup_parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='输出格式')
+    lookup_parser.add_argument('--output', help='导出到文件（.xlsx 或 .csv），不指定时输出到标准输出')
+    lookup_parser.add_argument('--excel-root', help='Excel目录文件所在根目录，默认使用界面中设置的导入目录')
+    lookup_parser.set_defaults(func=cmd_lookup)
+
+    publish_parser = subparsers.add_parser('publish', help='发布数据库快照')
+    publish_parser.add_argument('publish_dir', nargs='?', help='发布目录（共享目录），默认使用设置中的 replica_dir')
+    publish_parser.set_defaults(func=cmd_publish)
+
+    stats_parser = subparsers.add_parser('stats', help='档案统计')
+    stats_parser.add_argument('--incomplete', action='store_true', help='只输出不完整的档案')
+    stats_parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='输出格式')
+    stats_parser.set_defaults(func=cmd_stats)
+
+    audit_parser = subparsers.add_parser('audit', help='检查PDF文件与Excel目录是否一致')
+    audit_parser.add_argument('--excel-root', help='Excel目录文件所在根目录，默认使用界面中设置的导入目录')
+    audit_parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='输出格式')
+    audit_parser.add_argument('--output', help='报告保存到CSV文件，不指定时输出到标准输出')
+    audit_parser.set_defaults(func=cmd_audit)
+
+    backup_parser = subparsers.add_parser('backup', help='在线备份数据库')
+    backup_parser.add_argument('--backup-dir', help='备份目录，默认使用设置中的 backup_dir')
+    backup_parser.add_argument('--keep', type=int, help='保留的备份数量')
+    backup_parser.set_defaults(func=cmd_backup)
+
+    restore_parser = subparsers.add_parser('restore', help='从备份恢复数据库')
+    restore_parser.add_argument('backup_file', help='备份文件（.db.gz 或 .db）')
+    restore_parser.set_defaults(func=cmd_restore)
+
+    access_log_parser = subparsers.add_parser('access-log', help='查询访问记录')
+    access_log_parser.add_argument('--user', help='用户名')
+    access_log_parser.add_argument('--name', help='被访问人员的姓名')
+    access_log_parser.add_argument('--id', help='被访问人员的编号')
+    access_log_parser.add_argument('--since', help='开始日期（YYYY-MM-DD）')
+    access_log_parser.add_argument('--until', help='结束日期（YYYY-MM-DD，包含当天）')
+    access_log_parser.add_argument('--limit', type=int, default=1000, help='最多输出的记录数')
+    access_log_parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='输出格式')
+    access_log_parser.set_defaults(func=cmd_access_log)
+
+    maintain_parser = subparsers.add_parser('maintain', help='数据库维护')
+    maintain_parser.add_argument('--force', action='store_true', help='忽略执行间隔，执行全部维护任务')
+    maintain_parser.set_defaults(func=cmd_maintain)
+
+    archives_parser = subparsers.add_parser('import-archives', help='增量导入档案目录（中断后可继续）')
+    archives_parser.add_argument('folder', help='档案目录（每个子目录为一个人员）')
+    archives_parser.add_argument('--restart', action='store_true', help='放弃上次未完成的导入，重新开始')
+    archives_parser.set_defaults(func=cmd_import_archives)
+
+    cleanup_parser = subparsers.add_parser('cleanup', help='清理重复和无效记录')
+    cleanup_parser.set_defaults(func=cmd_cleanup)
+    return parser
+
+
+def main(argv=None):
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    setup_logger()
+
+    # 只读命令在订阅模式下使用本机副本
+    if args.command in READ_ONLY_COMMANDS:
+        db = open_database(load_user_settings())
+    else:
+        db = Database()
+    # Excel目录的sheet名由分类体系决定
+    set_taxonomy(CategoryTaxonomy.from_db(db.cursor))
+    try:
+        return args.func(db, args)
+    except BrokenPipeError:
+        # 输出被管道截断（例如 | head），不视为错误
+        return 0
+    except Exception as e:
+        logging.error(f"命令执行失败: {str(e)}", exc_info=True)
+        print(f"命令执行失败: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        shutdown_process_pool()
+        db.conn.close()
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
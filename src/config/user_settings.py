@@ -0,0 +1,37 @@
+import os
+import json
+import logging
+
+
+def get_user_settings_path():
+    """获取用户设置文件路径（程序目录下的 config/user_settings.json）"""
+    config_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config')
+    os.makedirs(config_dir, exist_ok=True)
+    return os.path.join(config_dir, 'user_settings.json')
+
+
+def load_user_settings(settings_file=None):
+    """加载用户设置，文件不存在或损坏时返回空字典"""
+    settings_file = settings_file or get_user_settings_path()
+    if not os.path.exists(settings_file):
+        logging.info("未找到用户设置文件，将使用默认设置")
+        return {}
+    try:
+        with open(settings_file, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+        logging.info(f"成功加载用户设置: {settings}")
+        return settings
+    except Exception as e:
+        logging.error(f"加载用户设置失败: {str(e)}")
+        return {}
+
+
+def save_user_settings(settings, settings_file=None):
+    """保存用户设置"""
+    settings_file = settings_file or get_user_settings_path()
+    try:
+        with open(settings_file, 'w', encoding='utf-8') as f:
+            json.dump(settings, f, ensure_ascii=False, indent=2)
+        logging.info(f"成功保存用户设置: {settings}")
+    except Exception as e:
+        logging.error(f"保存用户设置失败: {str(e)}")
@@ -0,0 +1,242 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from src.models.database import ACCESS_LOG_DDL
+from src.utils.paths import get_local_access_log_path
+
+# 操作类型 -> 说明
+ACCESS_ACTIONS = {
+    'search': "搜索",
+    'open': "打开文件",
+}
+
+# 查询结果的字段及表头
+ACCESS_LOG_FIELDS = ['created_at', 'user_name', 'action', 'person_name', 'file_id', 'file_path', 'detail']
+ACCESS_LOG_HEADERS = ['时间', '用户', '操作', '姓名', '编号', '文件', '说明']
+
+
+class AccessLog:
+    """
+    访问记录：记录谁搜索、打开了哪些人员的档案。
+    界面线程只把记录放入内存中的环形缓冲区，由后台线程批量写入只追加的 access_log 表，
+    超过保留天数的记录在写入线程启动时清理。
+    使用只读数据库副本时不能写入共享数据库，记录写入本机的只追加访问记录库（get_local_access_log_path），
+    查询、清理也使用该库；本机访问记录库无法打开时才写到程序日志中。
+    """
+
+    # 缓冲区最多保留的记录数（写入长时间失败时丢弃最早的记录）
+    BUFFER_SIZE = 10000
+    # 批量写入的间隔（秒）
+    FLUSH_INTERVAL = 2.0
+    # 默认保留天数
+    DEFAULT_RETENTION_DAYS = 365
+
+    def __init__(self, db, retention_days=DEFAULT_RETENTION_DAYS):
+        self.db = db
+        self.retention_days = retention_days
+        self._buffer = deque(maxlen=self.BUFFER_SIZE)
+        self._buffer_lock = threading.Lock()
+        # 写入数据库的锁（后台写入和退出前的最后一次写入不会同时进行）
+        self._flush_lock = threading.Lock()
+        self._dropped = 0
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def record(self, action, user_name, person_name=None, file_id=None, file_path=None, detail=None):
+        """
+        添加一条访问记录（只放入缓冲区，不访问数据库，可在界面线程中调用）。
+        :param action: 操作类型，见 ACCESS_ACTIONS
+        """
+        entry = (time.time(), user_name, action, person_name, file_id, file_path, detail)
+        with self._buffer_lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._dropped += 1
+            self._buffer.append(entry)
+
+    def is_running(self):
+        """后台写入线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动后台写入线程"""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="AccessLogWriter", daemon=True)
+        self._thread.start()
+
+    def _open_connection(self):
+        """
+        打开写入访问记录的连接（使用后需关闭）：共享数据库的独立连接，只读副本时为本机访问记录库。
+        """
+        if not self.db.read_only:
+            return self.db.new_connection()
+        conn = sqlite3.connect(get_local_access_log_path(), timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for sql in ACCESS_LOG_DDL:
+                conn.execute(sql)
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def stop(self, timeout=5):
+        """停止后台写入线程，并写入缓冲区中剩余的记录（程序退出前调用）"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        conn = None
+        try:
+            try:
+                conn = self._open_connection()
+            except Exception as e:
+                logging.error(f"打开访问记录库失败，访问记录写入程序日志: {str(e)}")
+            self.flush(conn)
+        except Exception as e:
+            logging.error(f"写入访问记录失败: {str(e)}", exc_info=True)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _run(self):
+        conn = None
+        try:
+            try:
+                conn = self._open_connection()
+            except Exception as e:
+                # 访问记录库无法打开时，访问记录写到程序日志中
+                logging.error(f"打开访问记录库失败，访问记录写入程序日志: {str(e)}")
+            if conn is not None:
+                try:
+                    self.prune(conn=conn)
+                except Exception as e:
+                    logging.warning(f"清理访问记录失败: {str(e)}")
+            while not self._stop_event.wait(self.FLUSH_INTERVAL):
+                try:
+                    self.flush(conn)
+                except Exception as e:
+                    # 写入失败时记录留在缓冲区，下次重试
+                    logging.error(f"写入访问记录失败: {str(e)}", exc_info=True)
+        except Exception as e:
+            logging.error(f"访问记录写入线程异常: {str(e)}", exc_info=True)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def flush(self, conn=None):
+        """
+        把缓冲区中的记录批量写入数据库。
+        :param conn: 数据库连接（后台线程中使用独立连接）；为 None 时写入程序日志
+        :return: 写入的记录数
+        """
+        with self._flush_lock:
+            with self._buffer_lock:
+                entries = list(self._buffer)
+                self._buffer.clear()
+                dropped, self._dropped = self._dropped, 0
+            if dropped:
+                logging.warning(f"访问记录缓冲区已满，丢弃了 {dropped} 条最早的记录")
+            if not entries:
+                return 0
+
+            try:
+                if conn is None:
+                    for created_at, user_name, action, person_name, file_id, file_path, detail in entries:
+                        logging.info(f"访问记录: {user_name} {ACCESS_ACTIONS.get(action, action)} "
+                                     f"{person_name or ''} {file_id or ''} {file_path or ''}")
+                else:
+                    conn.executemany('''
+                        INSERT INTO access_log
+                            (created_at, user_name, action, person_name, file_id, file_path, detail)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', entries)
+                    conn.commit()
+            except Exception:
+                # 写入失败时放回缓冲区（排在写入期间新增的记录之前），下次重试
+                if conn is not None:
+                    conn.rollback()
+                with self._buffer_lock:
+                    pending = entries + list(self._buffer)
+                    self._buffer.clear()
+                    self._buffer.extend(pending)
+                    self._dropped += max(0, len(pending) - self._buffer.maxlen)
+                raise
+            return len(entries)
+
+    def prune(self, retention_days=None, conn=None):
+        """
+        删除超过保留天数的记录。
+        :param conn: 数据库连接，默认使用 db.conn（只读副本时为本机访问记录库）
+        :return: 删除的记录数
+        """
+        retention_days = self.retention_days if retention_days is None else retention_days
+        if not retention_days or retention_days <= 0:
+            return 0
+        if conn is None and self.db.read_only:
+            local_conn = self._open_connection()
+            try:
+                return self.prune(retention_days, local_conn)
+            finally:
+                local_conn.close()
+        conn = conn or self.db.conn
+        cutoff = time.time() - retention_days * 24 * 3600
+        count = conn.execute('DELETE FROM access_log WHERE created_at < ?', (cutoff,)).rowcount
+        conn.commit()
+        if count:
+            logging.info(f"已清理 {count} 条超过 {retention_days} 天的访问记录")
+        return count
+
+    def query(self, user_name=None, person_name=None, file_id=None, start_time=None, end_time=None,
+              limit=1000, conn=None):
+        """
+        按用户、人员（姓名或编号）和时间范围查询访问记录（只查询已写入数据库的记录），最新的在前。
+        :param start_time: 开始时间（时间戳，包含）
+        :param end_time: 结束时间（时间戳，不包含）
+        :param conn: 数据库连接，默认使用 db.conn（只读副本时为本机访问记录库）
+        :return: [dict, ...]，字段见 ACCESS_LOG_FIELDS，action 为说明文字，created_at 为格式化的时间
+        """
+        conditions = []
+        params = []
+        for column, value in (('user_name', user_name), ('person_name', person_name), ('file_id', file_id)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if start_time is not None:
+            conditions.append("created_at >= ?")
+            params.append(start_time)
+        if end_time is not None:
+            conditions.append("created_at < ?")
+            params.append(end_time)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        if conn is None and self.db.read_only:
+            local_conn = self._open_connection()
+            try:
+                return self.query(user_name, person_name, file_id, start_time, end_time, limit, local_conn)
+            finally:
+                local_conn.close()
+        cursor = (conn or self.db.conn).cursor()
+        try:
+            cursor.execute(f'''
+                SELECT {', '.join(ACCESS_LOG_FIELDS)}
+                FROM access_log
+                {where}
+                ORDER BY created_at DESC
+                LIMIT ?
+            ''', params + [limit])
+            rows = []
+            for row in cursor.fetchall():
+                entry = dict(zip(ACCESS_LOG_FIELDS, ('' if value is None else value for value in row)))
+                entry['action'] = ACCESS_ACTIONS.get(entry['action'], entry['action'])
+                entry['created_at'] = datetime.fromtimestamp(row[0]).strftime('%Y-%m-%d %H:%M:%S')
+                rows.append(entry)
+            return rows
+        finally:
+            cursor.close()
@@ -0,0 +1,197 @@
+import os
+import re
+import logging
+import threading
+import time
+
+from src.models.taxonomy import parse_category_code
+
+
+class ArchiveImporter:
+    """
+    按人员目录增量导入档案（已存在的文件不重复导入），每完成一批目录提交一次事务并记录检查点。
+    导入中断（出错、取消或程序退出）后再次导入同一目录时，从最后完成的目录之后继续。
+    """
+
+    # 每完成多少个人员目录提交一次（目录的文件记录和检查点在同一事务中提交）
+    CHECKPOINT_FOLDERS = 50
+
+    def __init__(self, db):
+        self.db = db
+        self._stop_event = threading.Event()
+        # 同一时间只执行一次导入（重复启动会放弃正在进行的导入的检查点）
+        self._run_lock = threading.Lock()
+        self.stats = {}
+
+    def is_running(self):
+        """是否正在导入"""
+        return self._run_lock.locked()
+
+    def stop(self):
+        """请求停止导入（当前目录完成并提交后停止，之后可继续导入）"""
+        self._stop_event.set()
+
+    def find_resumable_run(self, folder_path, conn=None):
+        """
+        查找同一目录未完成的导入。
+        :return: {'id', 'started_at', 'status', 'folder_count', 'done_count', 'file_count'}，没有时返回 None
+        """
+        cursor = (conn or self.db.conn).cursor()
+        try:
+            cursor.execute('''
+                SELECT id, started_at, status, folder_count, done_count, file_count
+                FROM import_runs
+                WHERE folder_path = ? AND status NOT IN ('done', 'abandoned')
+                ORDER BY id DESC
+                LIMIT 1
+            ''', (os.path.abspath(folder_path),))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip(('id', 'started_at', 'status', 'folder_count', 'done_count', 'file_count'), row))
+        finally:
+            cursor.close()
+
+    def run(self, folder_path, resume_run_id=None):
+        """
+        执行导入（后台线程中调用，使用独立连接）。
+        :param folder_path: 档案目录（每个子目录为一个人员）
+        :param resume_run_id: 继续的导入编号（见 find_resumable_run），为 None 时开始新的导入
+        :return: 导入编号
+        :raises RuntimeError: 已有导入正在进行
+        :raises: 导入出错时已完成的目录保留，导入标记为失败后抛出异常
+        """
+        if not self._run_lock.acquire(blocking=False):
+            raise RuntimeError("增量导入档案正在进行中")
+        try:
+            self._stop_event.clear()
+            return self._run(folder_path, resume_run_id)
+        finally:
+            self._run_lock.release()
+
+    def _run(self, folder_path, resume_run_id):
+        folder_path = os.path.abspath(folder_path)
+        start_time = time.time()
+        conn = self.db.new_connection()
+        run_id = resume_run_id
+        try:
+            cursor = conn.cursor()
+            person_folders = sorted(name for name in os.listdir(folder_path)
+                                    if os.path.isdir(os.path.join(folder_path, name)))
+            if run_id is None:
+                # 放弃同一目录之前未完成的导入
+                cursor.execute('''
+                    DELETE FROM import_run_folders WHERE run_id IN (
+                        SELECT id FROM import_runs WHERE folder_path = ? AND status NOT IN ('done', 'abandoned')
+                    )
+                ''', (folder_path,))
+                cursor.execute('''
+                    UPDATE import_runs SET status = 'abandoned'
+                    WHERE folder_path = ? AND status NOT IN ('done', 'abandoned')
+                ''', (folder_path,))
+
+                # 新的导入先清理重复记录
+                cursor.execute('''
+                    DELETE FROM person_files
+                    WHERE rowid NOT IN (
+                        SELECT MIN(rowid)
+                        FROM person_files
+                        GROUP BY person_name, file_name, file_path
+                    )
+                ''')
+                cursor.execute('''
+                    INSERT INTO import_runs (folder_path, folder_count, status) VALUES (?, ?, 'running')
+                ''', (folder_path, len(person_folders)))
+                run_id = cursor.lastrowid
+                done_folders = set()
+            else:
+                cursor.execute("UPDATE import_runs SET status = 'running', folder_count = ? WHERE id = ?",
+                               (len(person_folders), run_id))
+                cursor.execute('SELECT folder_name FROM import_run_folders WHERE run_id = ?', (run_id,))
+                done_folders = {row[0] for row in cursor.fetchall()}
+                logging.info(f"继续导入 {folder_path}: 已完成 {len(done_folders)}/{len(person_folders)} 个目录")
+            conn.commit()
+
+            self.stats = {'folders': len(person_folders), 'skipped': 0, 'imported': 0, 'files': 0}
+            pending = 0
+            for person_folder in person_folders:
+                if person_folder in done_folders:
+                    self.stats['skipped'] += 1
+                    continue
+                if self._stop_event.is_set():
+                    break
+                file_count = self._import_folder(cursor, os.path.join(folder_path, person_folder), person_folder)
+                cursor.execute('''
+                    INSERT OR REPLACE INTO import_run_folders (run_id, folder_name, file_count)
+                    VALUES (?, ?, ?)
+                ''', (run_id, person_folder, file_count))
+                self.stats['imported'] += 1
+                self.stats['files'] += file_count
+                pending += 1
+                if pending >= self.CHECKPOINT_FOLDERS:
+                    self._checkpoint(conn, run_id)
+                    pending = 0
+
+            status = 'cancelled' if self._stop_event.is_set() else 'done'
+            self.stats['status'] = status
+            self._checkpoint(conn, run_id, status)
+            logging.info(f"导入档案{'已取消' if status == 'cancelled' else '完成'}: {folder_path}, {self.stats}，"
+                         f"用时 {time.time() - start_time:.1f} 秒")
+            return run_id
+        except Exception:
+            conn.rollback()
+            if run_id is not None:
+                try:
+                    self._checkpoint(conn, run_id, 'failed')
+                except Exception as e:
+                    logging.error(f"记录导入状态失败: {str(e)}")
+            raise
+        finally:
+            conn.close()
+
+    def _import_folder(self, cursor, person_path, person_folder):
+        """导入一个人员目录下的全部文件（不提交），返回新增的文件数量"""
+        person_name = person_folder  # 文件夹名即为人名
+        match = re.match(r'^(\d+)(.*)', person_folder)
+        file_id = match.group(1) if match else ""
+
+        # 在数据库中记录人员信息
+        cursor.execute('''
+            INSERT OR REPLACE INTO persons (name, folder_path) VALUES (?, ?)
+        ''', (person_name, os.path.abspath(person_path)))
+
+        file_count = 0
+        for root, _, files in os.walk(person_path):
+            for file in files:
+                # 跳过临时文件和隐藏文件
+                if file.startswith('~') or file.startswith('.'):
+                    continue
+                abs_path = os.path.abspath(os.path.join(root, file))
+                # 已存在的文件不重复导入
+                cursor.execute('''
+                    INSERT INTO person_files (person_name, file_name, file_path, dir_name, file_id,
+                                              main_category_num, sub_category_num)
+                    SELECT ?, ?, ?, ?, ?, ?, ?
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM person_files WHERE file_path = ? AND person_name = ? AND file_name = ?
+                    )
+                ''', (person_name, file, abs_path, person_folder, file_id, *parse_category_code(file),
+                      abs_path, person_name, file))
+                file_count += cursor.rowcount
+        return file_count
+
+    def _checkpoint(self, conn, run_id, status=None):
+        """提交已完成目录的文件记录和检查点，更新导入进度"""
+        conn.execute('''
+            UPDATE import_runs SET
+                done_count = (SELECT COUNT(*) FROM import_run_folders WHERE run_id = ?),
+                file_count = (SELECT COALESCE(SUM(file_count), 0) FROM import_run_folders WHERE run_id = ?),
+                status = COALESCE(?, status),
+                finished_at = CASE WHEN ? IS NULL THEN finished_at ELSE CURRENT_TIMESTAMP END
+            WHERE id = ?
+        ''', (run_id, run_id, status, status, run_id))
+        conn.commit()
+        if status == 'done':
+            # 已完成的导入不再需要检查点
+            conn.execute('DELETE FROM import_run_folders WHERE run_id = ?', (run_id,))
+            conn.commit()
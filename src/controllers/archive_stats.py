@@ -0,0 +1,53 @@
+from datetime import datetime
+
+# 人员统计的输出字段
+PERSON_STATS_FIELDS = ['file_id', 'person_name', 'dir_name', 'file_count', 'pdf_count', 'excel_count',
+                       'page_total', 'last_modified', 'status']
+
+
+def get_person_status(pdf_count, excel_count):
+    """
+    判断人员档案是否完整。
+    :return: 不完整的原因，完整时返回空字符串
+    """
+    problems = []
+    if not pdf_count:
+        problems.append("无PDF文件")
+    if not excel_count:
+        problems.append("目录中无Excel目录")
+    return '，'.join(problems)
+
+
+def iter_person_stats(stats, incomplete_only=False):
+    """
+    把 Database.get_archive_stats() 中的人员统计转换为 dict 行。
+    :param incomplete_only: 是否只返回不完整的档案
+    :return: 生成器，字段见 PERSON_STATS_FIELDS
+    """
+    for dir_name, person_name, file_id, file_count, pdf_count, excel_count, page_total, last_modified \
+            in stats['persons']:
+        status = get_person_status(pdf_count, excel_count)
+        if incomplete_only and not status:
+            continue
+        yield {
+            'file_id': file_id or '',
+            'person_name': person_name or '',
+            'dir_name': dir_name,
+            'file_count': file_count,
+            'pdf_count': pdf_count,
+            'excel_count': excel_count,
+            'page_total': page_total,
+            'last_modified': datetime.fromtimestamp(last_modified).strftime('%Y-%m-%d %H:%M') if last_modified else '',
+            'status': status,
+        }
+
+
+def get_category_counts(stats, taxonomy):
+    """
+    汇总各分类的PDF文件数量。
+    :param taxonomy: CategoryTaxonomy
+    :return: {类号: 数量}，一级分类为其下全部文件数量
+    """
+    return taxonomy.count_by_code(
+        (main_num, sub_num or None, count) for main_num, sub_num, count in stats['categories']
+    )
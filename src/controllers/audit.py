@@ -0,0 +1,220 @@
+import os
+import csv
+import logging
+import time
+from datetime import datetime
+
+from src.controllers.workbook_ingest import WorkbookIngestor
+from src.utils.excel_utils import ExcelFileIndex, get_sheet_name
+from src.utils.paths import get_exports_dir
+
+# 问题类型 -> 说明
+ISSUE_TYPES = {
+    'excel_missing': "未找到Excel目录",
+    'excel_parse_error': "Excel目录解析失败",
+    'pdf_missing': "Excel中有记录但没有PDF文件",
+    'excel_row_missing': "PDF文件在Excel中没有记录",
+    'page_mismatch': "Excel页数与PDF页数不一致",
+    'duplicate_id': "编号重复",
+}
+
+# 审计报告的输出字段及表头
+AUDIT_FIELDS = ['issue_type', 'file_id', 'person_name', 'dir_name', 'class_code', 'detail', 'file_path',
+                'workbook_path']
+AUDIT_HEADERS = ['问题', '编号', '姓名', '目录名', '类号', '说明', 'PDF路径', 'Excel路径']
+
+
+class ArchiveAuditor:
+    """
+    档案完整性、一致性检查：一次性比对全部人员的PDF文件和Excel目录，结果写入 audit_issues 表。
+    检查前先增量解析Excel目录（只解析新增或已变化的文件），比对全部在SQL中按集合完成。
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.stats = {}
+
+    def run(self, import_root_dir):
+        """
+        执行检查（后台线程中调用，使用独立连接）。
+        :param import_root_dir: Excel目录文件所在根目录
+        :return: 本次检查的编号
+        """
+        start_time = time.time()
+        WorkbookIngestor(self.db).run(import_root_dir)
+
+        conn = self.db.new_connection()
+        try:
+            conn.create_function('sheet_name', 1, get_sheet_name)
+            cursor = conn.cursor()
+            cursor.execute('INSERT INTO audit_runs (import_root_dir) VALUES (?)', (import_root_dir,))
+            run_id = cursor.lastrowid
+
+            # 1. 人员 -> Excel目录文件（查找规则同界面显示）
+            index = ExcelFileIndex(import_root_dir)
+            cursor.execute('SELECT dir_name, person_name, file_id FROM person_stats')
+            person_workbooks = []
+            for dir_name, person_name, file_id in cursor.fetchall():
+                workbook_path = index.find(person_name, file_id)
+                # excel_workbooks/excel_catalog 中保存的是绝对路径
+                person_workbooks.append((dir_name, person_name, file_id,
+                                         os.path.abspath(workbook_path) if workbook_path else None))
+            cursor.execute('DROP TABLE IF EXISTS temp.audit_person_workbooks')
+            cursor.execute('''
+                CREATE TEMP TABLE audit_person_workbooks (
+                    dir_name TEXT PRIMARY KEY,
+                    person_name TEXT,
+                    file_id TEXT,
+                    workbook_path TEXT,
+                    parse_error INTEGER DEFAULT 0
+                )
+            ''')
+            cursor.executemany('''
+                INSERT INTO audit_person_workbooks (dir_name, person_name, file_id, workbook_path) VALUES (?, ?, ?, ?)
+            ''', person_workbooks)
+            # 解析失败的Excel目录没有目录内容，单独报告，不参与下面的逐条比对
+            cursor.execute('''
+                UPDATE audit_person_workbooks SET parse_error = 1
+                WHERE workbook_path IN (SELECT workbook_path FROM excel_workbooks WHERE parse_error = 1)
+            ''')
+
+            # 2. 人员的PDF文件及类号（文件名去掉 .pdf）
+            cursor.execute('DROP TABLE IF EXISTS temp.audit_pdfs')
+            cursor.execute('''
+                CREATE TEMP TABLE audit_pdfs AS
+                SELECT f.dir_name, f.file_path, substr(f.file_name, 1, length(f.file_name) - 4) AS class_code
+                FROM person_files f
+                WHERE f.file_name LIKE '%.pdf' AND f.file_name NOT LIKE '~%' AND f.file_name NOT LIKE '.%'
+            ''')
+            cursor.execute('CREATE INDEX temp.idx_audit_pdfs ON audit_pdfs(dir_name, class_code)')
+
+            # 3. 按集合比对，结果写入报告表
+            cursor.execute('''
+                INSERT INTO audit_issues (run_id, issue_type, dir_name, person_name, file_id, detail)
+                SELECT ?, 'excel_missing', dir_name, person_name, file_id, NULL
+                FROM audit_person_workbooks
+                WHERE workbook_path IS NULL
+            ''', (run_id,))
+            cursor.execute('''
+                INSERT INTO audit_issues (run_id, issue_type, dir_name, person_name, file_id, workbook_path, detail)
+                SELECT ?, 'excel_parse_error', w.dir_name, w.person_name, w.file_id, w.workbook_path, e.error_message
+                FROM audit_person_workbooks w
+                JOIN excel_workbooks e ON e.workbook_path = w.workbook_path
+                WHERE w.parse_error = 1
+            ''', (run_id,))
+            cursor.execute('''
+                INSERT INTO audit_issues
+                    (run_id, issue_type, dir_name, person_name, file_id, class_code, workbook_path, detail)
+                SELECT DISTINCT ?, 'pdf_missing', w.dir_name, w.person_name, w.file_id, c.class_code,
+                       w.workbook_path, c.material_name
+                FROM audit_person_workbooks w
+                JOIN excel_catalog c ON c.workbook_path = w.workbook_path
+                WHERE w.parse_error = 0 AND NOT EXISTS (
+                    SELECT 1 FROM audit_pdfs p WHERE p.dir_name = w.dir_name AND p.class_code = c.class_code
+                )
+            ''', (run_id,))
+            cursor.execute('''
+                INSERT INTO audit_issues
+                    (run_id, issue_type, dir_name, person_name, file_id, class_code, file_path, workbook_path)
+                SELECT ?, 'excel_row_missing', w.dir_name, w.person_name, w.file_id, p.class_code,
+                       p.file_path, w.workbook_path
+                FROM audit_pdfs p
+                JOIN audit_person_workbooks w ON w.dir_name = p.dir_name
+                WHERE w.workbook_path IS NOT NULL AND w.parse_error = 0 AND sheet_name(p.class_code) IS NOT NULL
+                  AND NOT EXISTS (
+                      SELECT 1 FROM excel_catalog c
+                      WHERE c.workbook_path = w.workbook_path AND c.class_code = p.class_code
+                  )
+            ''', (run_id,))
+            cursor.execute('''
+                INSERT INTO audit_issues
+                    (run_id, issue_type, dir_name, person_name, file_id, class_code, file_path, workbook_path, detail)
+                SELECT ?, 'page_mismatch', w.dir_name, w.person_name, w.file_id, p.class_code,
+                       p.file_path, w.workbook_path,
+                       'Excel ' || MIN(c.page_count) || ' 页，PDF ' || m.page_count || ' 页'
+                FROM audit_pdfs p
+                JOIN audit_person_workbooks w ON w.dir_name = p.dir_name
+                JOIN excel_catalog c ON c.workbook_path = w.workbook_path AND c.class_code = p.class_code
+                JOIN pdf_metadata m ON m.file_path = p.file_path AND m.parse_error = 0
+                WHERE w.parse_error = 0 AND c.page_count != '' AND CAST(c.page_count AS INTEGER) != m.page_count
+                GROUP BY p.dir_name, p.file_path
+            ''', (run_id,))
+            cursor.execute('''
+                INSERT INTO audit_issues (run_id, issue_type, dir_name, person_name, file_id, detail)
+                SELECT ?, 'duplicate_id', s.dir_name, s.person_name, s.file_id, d.dir_names
+                FROM person_stats s
+                JOIN (
+                    SELECT file_id, group_concat(dir_name, '、') AS dir_names
+                    FROM person_stats
+                    WHERE file_id IS NOT NULL AND file_id != ''
+                    GROUP BY file_id
+                    HAVING COUNT(*) > 1
+                ) d ON d.file_id = s.file_id
+            ''', (run_id,))
+
+            cursor.execute('''
+                SELECT issue_type, COUNT(*) FROM audit_issues WHERE run_id = ? GROUP BY issue_type
+            ''', (run_id,))
+            self.stats = {ISSUE_TYPES[issue_type]: count for issue_type, count in cursor.fetchall()}
+            issue_count = sum(self.stats.values())
+
+            # 只保留最近一次检查的明细
+            cursor.execute('DELETE FROM audit_issues WHERE run_id < ?', (run_id,))
+            cursor.execute('''
+                UPDATE audit_runs SET finished_at = CURRENT_TIMESTAMP, person_count = ?, issue_count = ?
+                WHERE id = ?
+            ''', (len(person_workbooks), issue_count, run_id))
+            cursor.execute('DROP TABLE temp.audit_person_workbooks')
+            cursor.execute('DROP TABLE temp.audit_pdfs')
+            conn.commit()
+            logging.info(f"档案检查完成: 检查 {len(person_workbooks)} 人，发现 {issue_count} 个问题 {self.stats}，"
+                         f"用时 {time.time() - start_time:.1f} 秒")
+            return run_id
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def iter_issues(self, run_id=None, conn=None):
+        """
+        读取检查结果（默认最近一次）。
+        :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 db.conn
+        :return: 生成器，每行为 dict，字段见 AUDIT_FIELDS，issue_type 为说明文字
+        """
+        cursor = (conn or self.db.conn).cursor()
+        try:
+            if run_id is None:
+                cursor.execute('SELECT MAX(id) FROM audit_runs WHERE finished_at IS NOT NULL')
+                run_id = cursor.fetchone()[0]
+            cursor.execute('''
+                SELECT issue_type, file_id, person_name, dir_name, class_code, detail, file_path, workbook_path
+                FROM audit_issues
+                WHERE run_id = ?
+                ORDER BY issue_type, dir_name, class_code
+            ''', (run_id,))
+            for row in cursor:
+                issue = dict(zip(AUDIT_FIELDS, ('' if value is None else value for value in row)))
+                issue['issue_type'] = ISSUE_TYPES.get(issue['issue_type'], issue['issue_type'])
+                yield issue
+        finally:
+            cursor.close()
+
+    def write_report(self, run_id=None, output_path=None, conn=None):
+        """
+        将检查结果写入CSV。
+        :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 db.conn
+        :return: (报告文件路径, 问题数量)
+        """
+        if output_path is None:
+            file_name = f"档案检查报告_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            output_path = os.path.join(get_exports_dir(), file_name)
+        count = 0
+        with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(AUDIT_HEADERS)
+            for issue in self.iter_issues(run_id, conn):
+                writer.writerow([issue[field] for field in AUDIT_FIELDS])
+                count += 1
+        logging.info(f"档案检查报告已保存: {output_path}")
+        return output_path, count
@@ -0,0 +1,199 @@
+import os
+import csv
+import hashlib
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from src.utils.paths import get_exports_dir
+
+# 快速哈希读取的字节数
+QUICK_HASH_SIZE = 64 * 1024
+# 完整哈希每次读取的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_quick_hash(file_path):
+    """计算文件开头部分的哈希"""
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read(QUICK_HASH_SIZE)).hexdigest()
+
+
+def compute_full_hash(file_path):
+    """分块读取计算完整文件的SHA256，内存占用固定"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class DuplicateFinder:
+    """
+    按内容查找重复的档案文件。
+    先按文件大小分组，只有大小相同的文件才计算哈希；
+    哈希按路径+修改时间+大小缓存在 file_hashes 表中。
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.stats = {}
+
+    def find_duplicates(self):
+        """
+        查找内容重复的PDF文件。
+        :return: 重复组列表，每组为 {'hash', 'file_size', 'files': [(dir_name, person_name, file_id, file_path), ...]}
+        """
+        start_time = time.time()
+        conn = self.db.new_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT file_path, MIN(dir_name), MIN(person_name), MIN(file_id)
+                FROM person_files
+                WHERE file_name LIKE '%.pdf'
+                GROUP BY file_path
+            ''')
+
+            # 第一步：按文件大小分组（只需读取文件状态）
+            owners = {}
+            by_size = defaultdict(list)
+            total_size = 0
+            for file_path, dir_name, person_name, file_id in cursor:
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                owners[file_path] = (dir_name, person_name, file_id)
+                by_size[stat.st_size].append((file_path, stat.st_mtime))
+                total_size += stat.st_size
+
+            candidates = [(size, files) for size, files in by_size.items() if len(files) > 1 and size > 0]
+            candidate_count = sum(len(files) for _, files in candidates)
+            logging.info(f"重复文件检查: 共 {len(owners)} 个文件，大小相同的候选文件 {candidate_count} 个")
+
+            # 第二步：大小相同的文件先比较开头部分，再比较完整内容
+            cache = self._load_hash_cache(cursor, [path for _, files in candidates for path, _ in files])
+            updates = {}
+            bytes_read = 0
+            groups = []
+            for size, files in candidates:
+                by_quick = defaultdict(list)
+                for file_path, mtime in files:
+                    entry = self._get_cached(cache, file_path, mtime, size)
+                    quick_hash = entry[0] if entry else None
+                    if quick_hash is None:
+                        try:
+                            quick_hash = compute_quick_hash(file_path)
+                        except OSError as e:
+                            logging.warning(f"读取文件失败: {file_path}, {str(e)}")
+                            continue
+                        bytes_read += min(size, QUICK_HASH_SIZE)
+                        updates[file_path] = [mtime, size, quick_hash, None]
+                    by_quick[quick_hash].append((file_path, mtime))
+
+                for quick_files in by_quick.values():
+                    if len(quick_files) < 2:
+                        continue
+                    by_full = defaultdict(list)
+                    for file_path, mtime in quick_files:
+                        entry = self._get_cached(cache, file_path, mtime, size)
+                        full_hash = entry[1] if entry else None
+                        if full_hash is None:
+                            try:
+                                full_hash = compute_full_hash(file_path)
+                            except OSError as e:
+                                logging.warning(f"读取文件失败: {file_path}, {str(e)}")
+                                continue
+                            bytes_read += size
+                            update = updates.setdefault(file_path, [mtime, size, entry[0] if entry else None, None])
+                            update[3] = full_hash
+                        by_full[full_hash].append(file_path)
+
+                    for full_hash, paths in by_full.items():
+                        if len(paths) > 1:
+                            groups.append({
+                                'hash': full_hash,
+                                'file_size': size,
+                                'files': [owners[path] + (path,) for path in sorted(paths)],
+                            })
+
+            self._save_hash_cache(conn, updates)
+
+            self.stats = {
+                'total_files': len(owners),
+                'total_bytes': total_size,
+                'candidate_files': candidate_count,
+                'bytes_read': bytes_read,
+                'duplicate_groups': len(groups),
+                'elapsed': time.time() - start_time,
+            }
+            logging.info(
+                f"重复文件检查完成: {len(groups)} 组重复，读取 {bytes_read / 1024 / 1024:.1f} MB / "
+                f"总计 {total_size / 1024 / 1024:.1f} MB，用时 {self.stats['elapsed']:.1f} 秒"
+            )
+            groups.sort(key=lambda group: -group['file_size'])
+            return groups
+        finally:
+            conn.close()
+
+    def _load_hash_cache(self, cursor, file_paths):
+        """读取已缓存的哈希"""
+        cache = {}
+        for i in range(0, len(file_paths), 500):
+            chunk = file_paths[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT file_path, mtime, file_size, quick_hash, full_hash
+                FROM file_hashes WHERE file_path IN ({placeholders})
+            ''', chunk)
+            for file_path, mtime, size, quick_hash, full_hash in cursor.fetchall():
+                cache[file_path] = (mtime, size, quick_hash, full_hash)
+        return cache
+
+    @staticmethod
+    def _get_cached(cache, file_path, mtime, size):
+        """缓存有效时返回 (quick_hash, full_hash)，否则返回 None"""
+        entry = cache.get(file_path)
+        if entry and entry[0] == mtime and entry[1] == size:
+            return entry[2], entry[3]
+        return None
+
+    @staticmethod
+    def _save_hash_cache(conn, updates):
+        """保存新计算的哈希（已有的完整哈希不会被覆盖为空）"""
+        if not updates:
+            return
+        conn.executemany('''
+            INSERT INTO file_hashes (file_path, mtime, file_size, quick_hash, full_hash, hashed_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(file_path) DO UPDATE SET
+                quick_hash = COALESCE(excluded.quick_hash, file_hashes.quick_hash),
+                full_hash = CASE
+                    WHEN file_hashes.mtime = excluded.mtime AND file_hashes.file_size = excluded.file_size
+                    THEN COALESCE(excluded.full_hash, file_hashes.full_hash)
+                    ELSE excluded.full_hash END,
+                mtime = excluded.mtime,
+                file_size = excluded.file_size,
+                hashed_at = CURRENT_TIMESTAMP
+        ''', [(path, mtime, size, quick, full) for path, (mtime, size, quick, full) in updates.items()])
+        conn.commit()
+
+    @staticmethod
+    def write_report(groups, output_path=None):
+        """
+        将重复文件报告写入CSV。
+        :return: 报告文件路径
+        """
+        if output_path is None:
+            file_name = f"重复文件报告_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            output_path = os.path.join(get_exports_dir(), file_name)
+        with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['组号', '文件大小', 'SHA256', '目录名', '姓名', '编号', '路径'])
+            for index, group in enumerate(groups, 1):
+                for dir_name, person_name, file_id, file_path in group['files']:
+                    writer.writerow([index, group['file_size'], group['hash'], dir_name, person_name, file_id, file_path])
+        logging.info(f"重复文件报告已保存: {output_path}")
+        return output_path
@@ -0,0 +1,138 @@
+import os
+import csv
+import logging
+import time
+from datetime import datetime
+
+from src.controllers.file_manager import FileManager
+from src.utils.excel_utils import find_excel_file, list_excel_files, load_excel_catalog, lookup_catalog
+from src.utils.paths import get_exports_dir
+
+# 导出列：(字段名, 表头)
+EXPORT_COLUMNS = [
+    ('file_id', '编号'),
+    ('person_name', '姓名'),
+    ('class_code', '类号'),
+    ('material_name', '材料名称'),
+    ('file_name', '文件名'),
+    ('file_date', '日期'),
+    ('page_count', '页数'),
+    ('file_path', '路径'),
+]
+
+
+def get_default_export_path(prefix, extension='.xlsx'):
+    """生成默认导出文件路径（导出目录下，带时间戳）"""
+    file_name = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}"
+    return os.path.join(get_exports_dir(), file_name)
+
+
+class CatalogExporter:
+    """
+    流式导出档案目录到 Excel/CSV。
+    数据库按目录名顺序逐行读取，每次只缓存当前人员的Excel目录，内存占用与总行数无关。
+    """
+
+    def __init__(self, db, import_root_dir=None):
+        self.db = db
+        self.import_root_dir = import_root_dir
+        self._excel_files = None
+        self._current_dir = None
+        self._current_catalog = None
+        self._conn = None
+
+    def export_catalog(self, output_path, person_name=None, file_id=None, conn=None):
+        """
+        导出单个人员或全部档案的目录。
+        :param conn: 数据库连接（后台线程中需传入独立连接）
+        :return: 导出的行数
+        """
+        return self.export_rows(self.iter_rows(person_name, file_id, conn), output_path)
+
+    def iter_rows(self, person_name=None, file_id=None, conn=None):
+        """流式读取档案目录，并补充Excel中的材料信息"""
+        return self.enrich_rows(FileManager.iter_catalog(self.db, person_name, file_id, conn=conn, pdf_only=True), conn)
+
+    def enrich_rows(self, rows, conn=None):
+        """
+        为目录行流式补充Excel中的材料信息（行需按人员顺序排列以复用缓存）。
+        :param conn: 数据库连接（后台线程中需传入独立连接），用于读取已入库的Excel目录
+        """
+        self._conn = conn
+        for row in rows:
+            yield self._with_excel_info(row)
+
+    def export_rows(self, rows, output_path):
+        """
+        将行写入文件，根据扩展名选择 xlsx 或 csv 格式。
+        :param rows: 可迭代的 dict 行（字段见 EXPORT_COLUMNS）
+        :return: 导出的行数
+        """
+        start_time = time.time()
+        if output_path.lower().endswith('.csv'):
+            count = self._write_csv(rows, output_path)
+        else:
+            count = self._write_xlsx(rows, output_path)
+        logging.info(f"导出完成: {output_path}, 共 {count} 行，用时 {time.time() - start_time:.1f} 秒")
+        return count
+
+    @staticmethod
+    def _write_csv(rows, output_path):
+        count = 0
+        with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow([title for _, title in EXPORT_COLUMNS])
+            for row in rows:
+                writer.writerow([row.get(field, '') for field, _ in EXPORT_COLUMNS])
+                count += 1
+        return count
+
+    @staticmethod
+    def _write_xlsx(rows, output_path):
+        from openpyxl import Workbook
+
+        # write_only 模式逐行写入临时文件，不在内存中保留整个工作表
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('档案目录')
+        sheet.append([title for _, title in EXPORT_COLUMNS])
+        count = 0
+        for row in rows:
+            sheet.append([row.get(field, '') for field, _ in EXPORT_COLUMNS])
+            count += 1
+        workbook.save(output_path)
+        return count
+
+    def _with_excel_info(self, row):
+        """补充Excel中的材料名称、日期、页数（Excel中没有页数时保留PDF页数）"""
+        row.setdefault('material_name', '')
+        row.setdefault('file_date', '')
+        if not self.import_root_dir or not row['file_name'].lower().endswith('.pdf'):
+            return row
+
+        catalog = self._get_catalog(row['dir_name'], row['person_name'], row['file_id'])
+        if catalog:
+            material_name, file_date, page_count = lookup_catalog(catalog, row['class_code'])
+            row['material_name'] = material_name
+            row['file_date'] = file_date
+            if page_count:
+                row['page_count'] = page_count
+        return row
+
+    def _get_catalog(self, dir_name, person_name, file_id):
+        """获取当前人员的Excel目录，切换人员时才重新读取"""
+        if dir_name == self._current_dir:
+            return self._current_catalog
+
+        self._current_dir = dir_name
+        self._current_catalog = None
+        if self._excel_files is None:
+            # 只遍历一次目录
+            self._excel_files = list_excel_files(self.import_root_dir)
+        excel_file = find_excel_file(self.import_root_dir, person_name, file_id, self._excel_files)
+        if excel_file:
+            try:
+                # 优先使用已入库的Excel目录
+                self._current_catalog = load_excel_catalog(excel_file, self.db, self._conn)
+            except Exception as e:
+                logging.warning(f"读取Excel目录失败: {excel_file}, {str(e)}")
+        return self._current_catalog
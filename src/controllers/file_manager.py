@@ -1,14 +1,488 @@
 import os
+import re
+import csv
+import json
 import logging
-import pandas as pd
+import itertools
+from datetime import datetime
+
+from src.models.taxonomy import CategoryTaxonomy, parse_category_code
 
 class FileManager:
+    # 流式读取时每次从游标获取的行数
+    FETCH_SIZE = 1000
+    # 全量导入时每写入多少行提交一次（影子表对其他连接不可见，分批提交不会让搜索看到一半的数据）
+    IMPORT_BATCH_SIZE = 5000
+    # 批量查询临时表的序号（每次查询使用各自的临时表，同一连接上的多个查询互不影响）
+    _lookup_counter = itertools.count(1)
+
     @staticmethod
     def import_categories(excel_file, db):
+        """
+        从分类Excel导入分类体系并写入分类表；文件中没有可识别的分类时使用默认分类。
+        :return: CategoryTaxonomy
+        """
+        import pandas as pd
+
         logging.info(f"开始导入分类: {excel_file}")
         try:
-            df = pd.read_excel(excel_file)
-            # 导入逻辑
+            df = pd.read_excel(excel_file, engine='openpyxl')
+            try:
+                taxonomy = CategoryTaxonomy.from_dataframe(df)
+            except ValueError as e:
+                logging.warning(f"{str(e)}，使用默认分类")
+                taxonomy = CategoryTaxonomy.default()
+            taxonomy.save_to_db(db.cursor)
+            db.conn.commit()
+            logging.info(f"分类导入完成: 共 {len(taxonomy.roots)} 个一级分类，{len(taxonomy)} 个分类")
+            return taxonomy
         except Exception as e:
+            db.conn.rollback()
             logging.error(f"导入分类失败: {e}")
-            raise 
\ No newline at end of file
+            raise
+
+    @staticmethod
+    def parse_dir_name(dir_name):
+        """
+        从目录名中提取编号和人名（例如 123张三 -> ('123', '张三')）。
+        :return: (file_id, person_name)
+        """
+        match = re.match(r'^(\d+)(.*)', dir_name)
+        if match:
+            return match.group(1), match.group(2).strip()
+        return "", dir_name
+
+    @staticmethod
+    def import_files(db, folder_path, conn=None):
+        """
+        全量导入目录下的所有文件，替换原有文件记录。
+        新记录先写入影子表，完成后在一个事务中换入；导入期间搜索仍使用原有记录，导入中断时原有记录不变。
+        :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 db.conn
+        :return: 导入的文件数量
+        """
+        imported_count = FileManager._import_paths(db, FileManager.iter_folder_files(folder_path), conn)
+        logging.info(f"文件导入完成: {folder_path}, 共 {imported_count} 个文件")
+        return imported_count
+
+    @staticmethod
+    def import_manifest(db, manifest_path, base_dir=None, conn=None):
+        """
+        按文件服务器生成的文件清单全量导入（不遍历目录），替换原有文件记录，方式同 import_files。
+        :param manifest_path: 文件清单，见 iter_manifest_files
+        :param base_dir: 清单中相对路径的根目录，默认为清单文件所在目录
+        :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 db.conn
+        清单给出 size、mtime 时写入 manifest_signatures 表，导入后首次提取PDF元数据时不再逐个读取文件状态。
+        :return: 导入的文件数量
+        """
+        signatures = []
+
+        def iter_paths():
+            for file_path, mtime, file_size in FileManager.iter_manifest_records(manifest_path, base_dir):
+                if mtime is not None and file_size is not None:
+                    signatures.append((file_path, mtime, file_size))
+                yield file_path
+
+        def save_signatures(cursor):
+            # 与同一批文件记录一起提交
+            cursor.executemany('''
+                INSERT OR REPLACE INTO manifest_signatures (file_path, mtime, file_size) VALUES (?, ?, ?)
+            ''', signatures)
+            signatures.clear()
+
+        imported_count = FileManager._import_paths(db, iter_paths(), conn, on_batch=save_signatures)
+        logging.info(f"按文件清单导入完成: {manifest_path}, 共 {imported_count} 个文件")
+        return imported_count
+
+    @staticmethod
+    def iter_folder_files(folder_path):
+        """遍历目录，逐个返回文件的绝对路径"""
+        for root, _, files in os.walk(folder_path):
+            for file in files:
+                # 存储绝对路径，而不是相对路径
+                yield os.path.abspath(os.path.join(root, file))
+
+    @staticmethod
+    def iter_manifest_files(manifest_path, base_dir=None):
+        """
+        流式读取文件清单，逐个返回文件的绝对路径。
+        :param base_dir: 相对路径的根目录，默认为清单文件所在目录
+        """
+        for file_path, _, _ in FileManager.iter_manifest_records(manifest_path, base_dir):
+            yield file_path
+
+    @staticmethod
+    def iter_manifest_records(manifest_path, base_dir=None):
+        """
+        流式读取文件清单。
+        清单按扩展名区分格式：CSV（表头包含 path 列）、JSONL（.jsonl，每行一个对象）或 JSON（.json，对象数组），
+        对象包含 path 字段；可选的 size（字节）、mtime（时间戳或ISO时间）用于代替读取文件状态，hash 等其他列不使用。
+        :param base_dir: 相对路径的根目录，默认为清单文件所在目录
+        :return: 生成器，每项为 (文件绝对路径, mtime 或 None, size 或 None)
+        :raises ValueError: 清单中没有 path 列，或 JSON 清单不是对象数组
+        """
+        base_dir = base_dir or os.path.dirname(os.path.abspath(manifest_path))
+        with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+            if manifest_path.lower().endswith('.jsonl'):
+                records = (json.loads(line) for line in f if line.strip())
+            elif manifest_path.lower().endswith('.json'):
+                try:
+                    records = json.load(f)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"文件清单不是有效的JSON（每行一个对象的清单请使用 .jsonl 扩展名）: "
+                                     f"{manifest_path}, {str(e)}")
+                if not isinstance(records, list):
+                    raise ValueError(f"JSON文件清单应为对象数组: {manifest_path}")
+            else:
+                records = csv.DictReader(f)
+                if 'path' not in (records.fieldnames or []):
+                    raise ValueError(f"文件清单缺少 path 列: {manifest_path}")
+            for line_num, record in enumerate(records, 1):
+                path = str(record.get('path') or '').strip() if isinstance(record, dict) else ''
+                if not path:
+                    logging.warning(f"文件清单第 {line_num} 条记录没有路径，已跳过")
+                    continue
+                # 清单可能在其他系统上生成，统一路径分隔符
+                path = path.replace('\\', '/') if os.sep == '/' else path.replace('/', os.sep)
+                yield (os.path.abspath(os.path.join(base_dir, path)),
+                       FileManager._parse_manifest_mtime(record.get('mtime')),
+                       FileManager._parse_manifest_size(record.get('size')))
+
+    @staticmethod
+    def _parse_manifest_mtime(value):
+        """清单中的修改时间：时间戳（秒）或ISO格式时间，无法识别时返回 None"""
+        if value is None or value == '':
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+        try:
+            return datetime.fromisoformat(str(value).strip()).timestamp()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _parse_manifest_size(value):
+        """清单中的文件大小（字节），无法识别时返回 None"""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def iter_import_rows(paths):
+        """
+        把文件路径转换为文件记录（全量导入、导入预览共用），跳过隐藏文件和临时文件，编号和人名从所在目录名中提取。
+        :return: 生成器，每行为 (person_name, file_name, file_path, dir_name, file_id,
+                 main_category_num, sub_category_num)
+        """
+        dir_cache = {}
+        for abs_path in paths:
+            file = os.path.basename(abs_path)
+            if file.startswith('.') or file.startswith('~'):
+                continue
+
+            # 从目录名中提取编号和人名
+            dir_name = os.path.basename(os.path.dirname(abs_path))
+            if dir_name not in dir_cache:
+                dir_cache[dir_name] = FileManager.parse_dir_name(dir_name)
+                logging.debug(f"处理目录: {dir_name}, 编号: {dir_cache[dir_name][0]}, 人名: {dir_cache[dir_name][1]}")
+            file_id, person_name = dir_cache[dir_name]
+            yield (person_name, file, abs_path, dir_name, file_id, *parse_category_code(file))
+
+    @staticmethod
+    def _import_paths(db, paths, conn=None, on_batch=None):
+        """
+        把文件路径写入影子表并换入（import_files、import_manifest 共用）。
+        写入影子表时分批提交，遍历目录期间不长时间占用写锁，其他写入（访问记录、目录监控等）不受影响。
+        上次按文件清单导入的修改时间和大小同时清除，由本次导入重新提供。
+        :param on_batch: on_batch(cursor)，每批提交前调用，可在同一事务中写入其他数据
+        :return: 导入的文件数量
+        """
+        conn = conn or db.conn
+        shadow_table = db.create_person_files_shadow(conn)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM manifest_signatures')
+            rows = FileManager.iter_import_rows(paths)
+            imported_count = 0
+            while True:
+                batch = list(itertools.islice(rows, FileManager.IMPORT_BATCH_SIZE))
+                if not batch:
+                    break
+                cursor.executemany(f'''
+                    INSERT INTO {shadow_table}
+                        (person_name, file_name, file_path, dir_name, file_id, main_category_num, sub_category_num)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', batch)
+                if on_batch is not None:
+                    on_batch(cursor)
+                conn.commit()
+                imported_count += len(batch)
+            db.swap_person_files(conn)
+            return imported_count
+        except Exception:
+            db.drop_person_files_shadow(conn)
+            raise
+
+    @staticmethod
+    def find_duplicate_ids(db, person_name, conn=None):
+        """
+        查找同名人员的所有编号。
+        :param conn: 数据库连接（其他线程中需传入独立连接），默认使用 db.conn
+        :return: 编号列表
+        """
+        cursor = (conn or db.conn).cursor()
+        try:
+            cursor.execute('''
+                SELECT DISTINCT file_id
+                FROM person_files
+                WHERE person_name = ?
+                ORDER BY file_id
+            ''', (person_name,))
+            return [str(row[0]) for row in cursor.fetchall() if row[0]]
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def count_categories(db, person_name=None, file_id=None, conn=None):
+        """
+        一次查询统计人员各分类号的PDF文件数量（条件同 search_files）。
+        :return: [(main_category_num, sub_category_num, count), ...]
+        """
+        conditions = ["file_name LIKE '%.pdf'", "file_name NOT LIKE '~%'", "file_name NOT LIKE '.%'"]
+        params = []
+        if person_name:
+            conditions.append('person_name = ?')
+            params.append(person_name)
+        if file_id:
+            conditions.append('file_id = ?')
+            params.append(file_id)
+        cursor = (conn or db.conn).cursor()
+        try:
+            cursor.execute(f'''
+                SELECT main_category_num, sub_category_num, COUNT(DISTINCT file_path)
+                FROM person_files
+                WHERE {' AND '.join(conditions)} AND main_category_num IS NOT NULL
+                GROUP BY main_category_num, sub_category_num
+            ''', params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def search_files(db, person_name=None, file_id=None, name_patterns=None, conn=None):
+        """
+        按姓名和/或编号精确搜索PDF文件。
+        :param name_patterns: 文件名 LIKE 模式列表（按分类过滤时使用）
+        :return: [(file_name, file_path), ...]
+        """
+        return list(FileManager.iter_search_files(db, person_name, file_id, name_patterns, conn))
+
+    @staticmethod
+    def iter_search_files(db, person_name=None, file_id=None, name_patterns=None, conn=None):
+        """
+        分页读取搜索结果（按文件名排序），重复的 (文件名, 路径) 只返回一次。
+        :return: 生成器，每行为 (file_name, file_path)
+        """
+        logging.info(f"搜索文件: 姓名='{person_name}', 编号='{file_id}', 文件名模式={name_patterns}")
+        current_name = None
+        seen_paths = set()
+        for row in db.iter_person_files(order_by='file_name', person_name=person_name, file_id=file_id,
+                                        name_patterns=name_patterns, pdf_only=True, conn=conn):
+            file_name, file_path = row[4], row[5]
+            # 按文件名排序，重复记录只会出现在同一文件名内
+            if file_name != current_name:
+                current_name = file_name
+                seen_paths.clear()
+            if file_path in seen_paths:
+                continue
+            seen_paths.add(file_path)
+            yield file_name, file_path
+
+    @staticmethod
+    def iter_catalog(db, person_name=None, file_id=None, conn=None, pdf_only=False):
+        """
+        分页读取档案目录（含PDF页数），按目录名、文件名排序，内存占用固定。
+        :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 db.conn
+        :param pdf_only: 是否只返回PDF文件
+        :return: 生成器，每行为 dict
+        """
+        for row in db.iter_person_files(order_by='dir_name', person_name=person_name, file_id=file_id,
+                                        pdf_only=pdf_only, conn=conn):
+            yield FileManager._catalog_row(*row[1:])
+
+    @staticmethod
+    def _catalog_row(file_id, person_name, dir_name, file_name, file_path, page_count):
+        """转换为目录行 dict"""
+        return {
+            'file_id': file_id or '',
+            'person_name': person_name,
+            'dir_name': dir_name,
+            'class_code': os.path.splitext(file_name)[0],
+            'file_name': file_name,
+            'file_path': file_path,
+            'page_count': page_count if page_count is not None else '',
+        }
+
+    @staticmethod
+    def _fetch_catalog_rows(cursor):
+        """
+        分批读取目录查询结果并转换为 dict 行。
+        查询列须为 (file_id, person_name, dir_name, file_name, file_path, page_count)
+        """
+        while True:
+            rows = cursor.fetchmany(FileManager.FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield FileManager._catalog_row(*row)
+
+    @staticmethod
+    def parse_lookup_tokens(text):
+        """
+        解析粘贴的编号/姓名列表（换行、逗号、分号、空白分隔），去重并保持原顺序。
+        :return: 编号/姓名列表
+        """
+        tokens = []
+        seen = set()
+        for token in re.split(r'[\s,，;；、]+', text):
+            if token and token not in seen:
+                seen.add(token)
+                tokens.append(token)
+        return tokens
+
+    @staticmethod
+    def batch_lookup(db, tokens, conn=None, pdf_only=True):
+        """
+        批量查询多个编号或姓名：先写入本次查询的临时表，再用一次连接查询得到全部结果。
+        每个值同时按编号和姓名匹配。
+        :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 db.conn
+        :return: (rows, duplicate_names, unmatched)
+                 rows 为按输入顺序流式返回的 dict 行生成器（字段同 iter_catalog），读完后删除临时表；
+                 duplicate_names 为 {姓名: [编号, ...]}，仅包含对应多个编号的姓名；
+                 unmatched 为没有匹配任何文件的值列表
+        """
+        conn = conn or db.conn
+        table = f"lookup_tokens_{next(FileManager._lookup_counter)}"
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'''
+                CREATE TEMP TABLE {table} (
+                    token TEXT PRIMARY KEY,
+                    position INTEGER NOT NULL
+                )
+            ''')
+            cursor.executemany(
+                f'INSERT OR IGNORE INTO {table} (token, position) VALUES (?, ?)',
+                ((token, position) for position, token in enumerate(tokens))
+            )
+
+            # 重名汇总：一个姓名对应多个编号
+            cursor.execute(f'''
+                SELECT t.token, GROUP_CONCAT(DISTINCT f.file_id)
+                FROM {table} t
+                JOIN person_files f ON f.person_name = t.token
+                WHERE f.file_id IS NOT NULL AND f.file_id != ''
+                GROUP BY t.token
+                HAVING COUNT(DISTINCT f.file_id) > 1
+                ORDER BY MIN(t.position)
+            ''')
+            duplicate_names = {name: sorted(ids.split(',')) for name, ids in cursor.fetchall()}
+
+            # 没有匹配任何文件的值
+            cursor.execute(f'''
+                SELECT token FROM {table} t
+                WHERE NOT EXISTS (SELECT 1 FROM person_files WHERE file_id = t.token)
+                  AND NOT EXISTS (SELECT 1 FROM person_files WHERE person_name = t.token)
+                ORDER BY position
+            ''')
+            unmatched = [row[0] for row in cursor.fetchall()]
+        except Exception:
+            cursor.execute(f'DROP TABLE IF EXISTS temp.{table}')
+            raise
+        finally:
+            cursor.close()
+
+        logging.info(f"批量查询: {len(tokens)} 个值，重名 {len(duplicate_names)} 个，未匹配 {len(unmatched)} 个")
+        return FileManager._iter_lookup_rows(conn, table, pdf_only), duplicate_names, unmatched
+
+    @staticmethod
+    def _iter_lookup_rows(conn, table, pdf_only):
+        """流式读取批量查询结果（按输入顺序，同一人员内按文件名排序），读完后删除临时表"""
+        # 分别按编号、姓名连接临时表（各自走索引），再合并
+        query = f'''
+            SELECT f.id, f.file_id, f.person_name, f.dir_name, f.file_name, f.file_path, m.page_count
+            FROM (
+                SELECT f.id AS file_row, t.position
+                FROM {table} t
+                JOIN person_files f ON f.file_id = t.token
+                UNION ALL
+                SELECT f.id, t.position
+                FROM {table} t
+                JOIN person_files f ON f.person_name = t.token
+            ) matched
+            JOIN person_files f ON f.id = matched.file_row
+            LEFT JOIN pdf_metadata m ON m.file_path = f.file_path AND m.parse_error = 0
+            WHERE f.file_name NOT LIKE '~%' AND f.file_name NOT LIKE '.%'
+        '''
+        if pdf_only:
+            query += " AND f.file_name LIKE '%.pdf'"
+        query += '''
+            ORDER BY matched.position, f.dir_name, f.file_name, f.id
+        '''
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query)
+            # 编号和姓名同时匹配的文件只返回一次（保留最先匹配的位置），只记录已返回的行号
+            seen = set()
+            while True:
+                rows = cursor.fetchmany(FileManager.FETCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    if row[0] in seen:
+                        continue
+                    seen.add(row[0])
+                    yield FileManager._catalog_row(*row[1:])
+        finally:
+            cursor.close()
+            conn.execute(f'DROP TABLE IF EXISTS temp.{table}')
+
+    @staticmethod
+    def cleanup_database(db):
+        """
+        清理数据库中的重复记录和无效记录。
+        :return: (删除的重复记录数, 删除的无效记录数)
+        """
+        try:
+            # 删除重复记录
+            db.cursor.execute('''
+                DELETE FROM person_files
+                WHERE rowid NOT IN (
+                    SELECT MIN(rowid)
+                    FROM person_files
+                    GROUP BY person_name, file_name, file_path
+                )
+            ''')
+            duplicate_count = db.cursor.rowcount
+
+            # 删除不存在的文件记录（逐页检查，按id删除，不影响后续分页）
+            missing_count = 0
+            missing_ids = []
+            for row in db.iter_person_files(order_by='id', include_hidden=True):
+                if not os.path.exists(row[5]):
+                    missing_ids.append((row[0],))
+                    missing_count += 1
+                    if len(missing_ids) >= db.PAGE_SIZE:
+                        db.cursor.executemany('DELETE FROM person_files WHERE id = ?', missing_ids)
+                        missing_ids = []
+            db.cursor.executemany('DELETE FROM person_files WHERE id = ?', missing_ids)
+
+            db.conn.commit()
+            logging.info(f"数据库清理完成: 删除重复记录 {duplicate_count} 条，无效记录 {missing_count} 条")
+            return duplicate_count, missing_count
+        except Exception:
+            db.conn.rollback()
+            raise
@@ -0,0 +1,386 @@
+import os
+import sys
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+import time
+
+from src.controllers.file_manager import FileManager
+from src.models.taxonomy import parse_category_code
+from src.utils.excel_utils import invalidate_excel_cache
+
+# inotify 事件常量
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+# 路径前缀查询的上界字符
+_PATH_MAX_CHAR = '\U0010ffff'
+
+
+class _PollingBackend:
+    """轮询方式：比较目录的修改时间（目录中增删、改名文件时会变化）"""
+
+    def __init__(self, root_dir, interval):
+        self.root_dir = root_dir
+        self.interval = interval
+        self._dir_mtimes = self._scan()
+
+    def _scan(self):
+        """读取所有子目录的修改时间"""
+        mtimes = {}
+        stack = [self.root_dir]
+        while stack:
+            path = stack.pop()
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return mtimes
+
+    def wait_for_changes(self, timeout, stop_event):
+        """
+        等待变化（只能发现目录中增删、改名的文件，不能发现原地修改的文件）。
+        :return: (发生变化的目录集合, 已写入完成的文件集合)
+        """
+        if stop_event.wait(min(timeout, self.interval)):
+            return set(), set()
+        current = self._scan()
+        previous, self._dir_mtimes = self._dir_mtimes, current
+        changed = {path for path, mtime in current.items() if previous.get(path) != mtime}
+        # 已删除的目录
+        changed.update(path for path in previous if path not in current)
+        return changed, set()
+
+    def writing_paths(self):
+        """正在写入的文件（轮询方式无法判断）"""
+        return set()
+
+    def close(self):
+        pass
+
+
+class _InotifyBackend:
+    """
+    Linux inotify 方式：递归监控所有子目录。
+    文件在写入完成（关闭）后才作为变化返回，复制到一半的文件不会被导入、提取。
+    """
+
+    # 正在写入的文件超过该时间（秒）没有新的写入事件时视为已完成（例如建立硬链接只有创建事件）
+    WRITE_IDLE_TIMEOUT = 60
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._watches = {}
+        # 正在写入的文件 -> 最近一次写入事件的时间
+        self._writing = {}
+        self._add_tree(root_dir)
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"无法监控目录: {path}")
+        self._watches[wd] = path
+
+    def _add_tree(self, root):
+        for dir_path, _, _ in os.walk(root):
+            self._add_watch(dir_path)
+
+    def _remove_tree(self, root):
+        """移除已移走的子目录的监控"""
+        for wd, path in list(self._watches.items()):
+            if path == root or path.startswith(root + os.sep):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+
+    def writing_paths(self):
+        """正在写入（已创建或修改、尚未关闭）的文件"""
+        return set(self._writing)
+
+    def wait_for_changes(self, timeout, stop_event):
+        """
+        等待inotify事件。
+        :return: (发生变化的目录集合, 已写入完成的文件集合)
+        """
+        # 超时不超过1秒，以便及时响应停止请求
+        readable, _, _ = select.select([self._fd], [], [], min(timeout, 1.0))
+        changed = set()
+        changed_files = set()
+        if readable:
+            self._read_events(changed, changed_files)
+
+        # 长时间没有写入事件的文件视为已写入完成
+        now = time.time()
+        for path, last_event_time in list(self._writing.items()):
+            if now - last_event_time >= self.WRITE_IDLE_TIMEOUT:
+                del self._writing[path]
+                changed.add(os.path.dirname(path))
+                changed_files.add(path)
+        return changed, changed_files
+
+    def _read_events(self, changed, changed_files):
+        """读取一批inotify事件，把变化的目录、写入完成的文件加入 changed、changed_files"""
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b'\0'))
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出，整个目录树都需要重新比对
+                logging.warning("目录监控事件溢出，将重新检查全部目录")
+                changed.update(self._watches.values())
+                continue
+            dir_path = self._watches.get(wd)
+            if dir_path is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._watches[wd]
+                continue
+
+            if not mask & IN_ISDIR and name:
+                file_path = os.path.join(dir_path, name)
+                if mask & (IN_CREATE | IN_MODIFY):
+                    # 文件仍在写入，关闭后再处理
+                    self._writing[file_path] = time.time()
+                    continue
+                self._writing.pop(file_path, None)
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    changed_files.add(file_path)
+
+            changed.add(dir_path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # 新建的子目录需要加入监控，并检查其中已有的文件
+                sub_dir = os.path.join(dir_path, name)
+                try:
+                    self._add_tree(sub_dir)
+                    changed.update(path for path in self._watches.values()
+                                   if path == sub_dir or path.startswith(sub_dir + os.sep))
+                except OSError as e:
+                    logging.warning(f"添加目录监控失败: {str(e)}")
+            elif mask & IN_ISDIR and mask & (IN_DELETE | IN_MOVED_FROM):
+                sub_dir = os.path.join(dir_path, name)
+                changed.add(sub_dir)
+                if mask & IN_MOVED_FROM:
+                    self._remove_tree(sub_dir)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class FolderWatcher:
+    """
+    监控导入目录的变化，自动更新文件记录。
+    Linux 使用 inotify，其他系统轮询目录修改时间；
+    事件在静默 debounce 秒后合并处理，每批变化在一个事务中写入。
+    """
+
+    def __init__(self, db, root_dir, poll_interval=10, debounce=2.0, max_delay=30.0):
+        self.db = db
+        self.root_dir = os.path.abspath(root_dir)
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.listeners = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        # 是否正在进行启动时的全量比对
+        self.syncing = False
+
+    def add_listener(self, callback):
+        """
+        添加变化监听器（在监控线程中调用）。
+        :param callback: callback(added_rows, removed_paths)，added_rows 为
+                         [(person_name, file_name, file_path, dir_name, file_id), ...]
+        """
+        self.listeners.append(callback)
+
+    def start(self, initial_sync=True):
+        """启动后台监控"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(initial_sync,), name="FolderWatcher", daemon=True
+        )
+        self._thread.start()
+        logging.info(f"开始监控档案目录: {self.root_dir}")
+
+    def is_running(self):
+        """监控线程是否仍在运行（停止后可能还在完成当前的比对）"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        """
+        停止监控（最多等待5秒）。
+        :return: 监控线程是否已结束；未结束时不要启动新的监控，线程会在当前目录比对完成后退出，且不再写入
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            if self._thread.is_alive():
+                logging.warning("档案目录监控线程未能及时结束")
+                return False
+            self._thread = None
+            logging.info("已停止监控档案目录")
+        return True
+
+    def _create_backend(self):
+        if sys.platform.startswith('linux'):
+            try:
+                return _InotifyBackend(self.root_dir)
+            except Exception as e:
+                logging.warning(f"inotify 不可用，改用轮询方式: {str(e)}")
+        return _PollingBackend(self.root_dir, self.poll_interval)
+
+    def _run(self, initial_sync):
+        conn = None
+        backend = None
+        try:
+            conn = self.db.new_connection()
+            backend = self._create_backend()
+            if initial_sync:
+                # 程序未运行期间的变化：逐个目录比对一次
+                self.syncing = True
+                try:
+                    all_dirs = []
+                    for dir_path, _, _ in os.walk(self.root_dir):
+                        if self._stop_event.is_set():
+                            return
+                        all_dirs.append(dir_path)
+                    self.apply_changes(conn, all_dirs)
+                finally:
+                    self.syncing = False
+
+            pending = set()
+            pending_files = set()
+            first_event_time = None
+            last_event_time = None
+            while not self._stop_event.is_set():
+                changed, changed_files = backend.wait_for_changes(
+                    self.debounce if pending else self.poll_interval, self._stop_event)
+                now = time.time()
+                if changed or changed_files:
+                    pending.update(changed)
+                    pending_files.update(changed_files)
+                    last_event_time = now
+                    first_event_time = first_event_time or now
+
+                # 合并短时间内的连续事件，静默一段时间或等待过久后统一处理
+                if pending and (now - last_event_time >= self.debounce or now - first_event_time >= self.max_delay):
+                    self.apply_changes(conn, pending, pending_files, backend.writing_paths())
+                    pending = set()
+                    pending_files = set()
+                    first_event_time = None
+        except Exception as e:
+            logging.error(f"目录监控失败: {str(e)}", exc_info=True)
+        finally:
+            if backend is not None:
+                backend.close()
+            if conn is not None:
+                conn.close()
+
+    def apply_changes(self, conn, dir_paths, changed_files=(), writing_paths=()):
+        """
+        比对指定目录的文件和数据库记录，批量新增、删除。
+        :param changed_files: 写入完成的文件（原地修改的Excel目录需清除缓存）
+        :param writing_paths: 正在写入的文件，写入完成后再新增
+        :return: (新增数量, 删除数量)
+        """
+        writing_paths = set(writing_paths)
+        cursor = conn.cursor()
+        added_rows = []
+        removed_paths = []
+        for dir_path in sorted(set(dir_paths)):
+            # 已停止时不再比对（比对结果可能已过时，也不能与新的监控同时写入）
+            if self._stop_event.is_set():
+                return 0, 0
+            prefix = dir_path + os.sep
+            cursor.execute('''
+                SELECT file_path FROM person_files
+                WHERE file_path > ? AND file_path < ?
+            ''', (prefix, prefix + _PATH_MAX_CHAR))
+            known = {row[0] for row in cursor.fetchall()}
+
+            if not os.path.isdir(dir_path):
+                # 目录已删除，删除其下全部记录
+                removed_paths.extend(known)
+                continue
+
+            # 只比较本目录中的文件，子目录单独处理
+            known = {path for path in known if os.path.dirname(path) == dir_path}
+            current = set()
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        if entry.is_file() and not entry.name.startswith(('.', '~')):
+                            current.add(os.path.abspath(entry.path))
+            except OSError as e:
+                logging.warning(f"读取目录失败: {dir_path}, {str(e)}")
+                continue
+
+            dir_name = os.path.basename(dir_path)
+            file_id, person_name = FileManager.parse_dir_name(dir_name)
+            for file_path in sorted(current - known - writing_paths):
+                file_name = os.path.basename(file_path)
+                added_rows.append((person_name, file_name, file_path, dir_name, file_id,
+                                   *parse_category_code(file_name)))
+            removed_paths.extend(known - current)
+
+            # 目录中的Excel有变化时清除其缓存
+            for file_path in current ^ known:
+                if file_path.lower().endswith('.xlsx'):
+                    invalidate_excel_cache(file_path)
+
+        # 原地修改（或改名覆盖）的Excel目录
+        for file_path in changed_files:
+            if file_path.lower().endswith('.xlsx'):
+                invalidate_excel_cache(file_path)
+
+        if self._stop_event.is_set() or (not added_rows and not removed_paths):
+            return 0, 0
+
+        try:
+            cursor.executemany('''
+                INSERT INTO person_files
+                    (person_name, file_name, file_path, dir_name, file_id, main_category_num, sub_category_num)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', added_rows)
+            cursor.executemany('DELETE FROM person_files WHERE file_path = ?', [(path,) for path in removed_paths])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        logging.info(f"目录监控: 新增 {len(added_rows)} 个文件，删除 {len(removed_paths)} 个文件")
+        for callback in self.listeners:
+            try:
+                callback(added_rows, removed_paths)
+            except Exception as e:
+                logging.error(f"目录监控回调失败: {str(e)}", exc_info=True)
+        return len(added_rows), len(removed_paths)
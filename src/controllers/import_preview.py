@@ -0,0 +1,201 @@
+import os
+import csv
+import logging
+import time
+from datetime import datetime
+
+from src.controllers.file_manager import FileManager
+from src.utils.paths import get_exports_dir
+
+# 变化类型 -> 说明
+CHANGE_TYPES = {
+    'added': "新增文件",
+    'removed': "删除文件",
+    'moved': "移动文件",
+    'folder_renamed': "目录改名",
+    'duplicate_name': "新增重名",
+}
+
+# 预览报告的输出字段及表头
+PREVIEW_FIELDS = ['change_type', 'file_id', 'person_name', 'dir_name', 'file_name', 'old_path', 'new_path',
+                  'detail']
+PREVIEW_HEADERS = ['变化', '编号', '姓名', '目录名', '文件名', '原路径', '新路径', '说明']
+
+# 人员的标识：有编号时用编号，否则用姓名
+_PERSON_KEY = "COALESCE(NULLIF({row}.file_id, ''), {row}.person_name)"
+
+
+class ImportPreview:
+    """
+    导入预览（不修改数据）：把重新导入将得到的文件记录写入临时表，按集合与现有的 person_files 比对，
+    得出新增、删除、移动的文件，改名的目录和新出现的重名。
+    临时表只存在于传入的连接中，scan 之后在同一连接上读取结果，用完关闭连接即可。
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.stats = {}
+
+    def scan_folder(self, folder_path, conn):
+        """预览全量导入目录（同 FileManager.import_files）"""
+        return self.scan(FileManager.iter_folder_files(folder_path), conn)
+
+    def scan_manifest(self, manifest_path, conn, base_dir=None):
+        """预览按文件清单导入（同 FileManager.import_manifest）"""
+        return self.scan(FileManager.iter_manifest_files(manifest_path, base_dir), conn)
+
+    def scan(self, paths, conn):
+        """
+        比对导入结果与现有文件记录。
+        :param paths: 导入的文件路径
+        :param conn: 数据库连接（后台线程中需传入独立连接），结果保存在该连接的临时表中
+        :return: 汇总 {'scanned', 'unchanged', 变化说明: 数量, ...}
+        """
+        start_time = time.time()
+        cursor = conn.cursor()
+        for table in ('import_scan', 'import_added', 'import_removed', 'import_changes'):
+            cursor.execute(f'DROP TABLE IF EXISTS temp.{table}')
+
+        # 1. 导入将得到的文件记录
+        cursor.execute('''
+            CREATE TEMP TABLE import_scan (
+                person_name TEXT, file_name TEXT, file_path TEXT, dir_name TEXT, file_id TEXT,
+                main_category_num INTEGER, sub_category_num INTEGER
+            )
+        ''')
+        cursor.executemany('INSERT INTO import_scan VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           FileManager.iter_import_rows(paths))
+        scanned = cursor.rowcount
+        cursor.execute('CREATE INDEX temp.idx_import_scan_path ON import_scan(file_path)')
+        cursor.execute('CREATE INDEX temp.idx_import_scan_dir ON import_scan(dir_name)')
+
+        # 2. 只在一边出现的文件（路径相同视为未变化）
+        cursor.execute(f'''
+            CREATE TEMP TABLE import_added AS
+            SELECT s.*, {_PERSON_KEY.format(row='s')} AS person_key
+            FROM import_scan s
+            WHERE NOT EXISTS (SELECT 1 FROM person_files f WHERE f.file_path = s.file_path)
+        ''')
+        cursor.execute(f'''
+            CREATE TEMP TABLE import_removed AS
+            SELECT f.person_name, f.file_name, f.file_path, f.dir_name, f.file_id,
+                   {_PERSON_KEY.format(row='f')} AS person_key
+            FROM person_files f
+            WHERE NOT EXISTS (SELECT 1 FROM import_scan s WHERE s.file_path = f.file_path)
+        ''')
+        cursor.execute('CREATE INDEX temp.idx_import_removed_key ON import_removed(file_name, person_key)')
+
+        cursor.execute('''
+            CREATE TEMP TABLE import_changes (
+                change_type TEXT, file_id TEXT, person_name TEXT, dir_name TEXT, file_name TEXT,
+                old_path TEXT, new_path TEXT, detail TEXT
+            )
+        ''')
+        # 3. 同一人员的同名文件换了路径视为移动
+        cursor.execute('''
+            INSERT INTO import_changes (change_type, file_id, person_name, dir_name, file_name, old_path, new_path)
+            SELECT 'moved', a.file_id, a.person_name, a.dir_name, a.file_name, MIN(r.file_path), a.file_path
+            FROM import_added a
+            JOIN import_removed r ON r.file_name = a.file_name AND r.person_key = a.person_key
+            GROUP BY a.file_path
+        ''')
+        cursor.execute('CREATE INDEX temp.idx_import_changes_path ON import_changes(new_path)')
+        cursor.execute('CREATE INDEX temp.idx_import_changes_old ON import_changes(old_path)')
+        cursor.execute('''
+            INSERT INTO import_changes (change_type, file_id, person_name, dir_name, file_name, new_path)
+            SELECT 'added', file_id, person_name, dir_name, file_name, file_path
+            FROM import_added a
+            WHERE NOT EXISTS (
+                SELECT 1 FROM import_changes c WHERE c.new_path = a.file_path AND c.change_type = 'moved'
+            )
+        ''')
+        cursor.execute('''
+            INSERT INTO import_changes (change_type, file_id, person_name, dir_name, file_name, old_path)
+            SELECT 'removed', file_id, person_name, dir_name, file_name, file_path
+            FROM import_removed r
+            WHERE NOT EXISTS (
+                SELECT 1 FROM import_changes c WHERE c.old_path = r.file_path AND c.change_type = 'moved'
+            )
+        ''')
+
+        # 4. 编号相同、目录名变化的目录视为改名（原目录名不再出现，新目录名原来不存在）
+        cursor.execute('''
+            INSERT INTO import_changes (change_type, file_id, person_name, dir_name, detail)
+            SELECT 'folder_renamed', n.file_id, n.person_name, n.dir_name, '原目录名: ' || o.dir_name
+            FROM (
+                SELECT dir_name, MIN(file_id) AS file_id FROM import_removed
+                WHERE file_id != '' GROUP BY dir_name
+            ) o
+            JOIN (
+                SELECT dir_name, MIN(file_id) AS file_id, MIN(person_name) AS person_name FROM import_added
+                WHERE file_id != '' GROUP BY dir_name
+            ) n ON n.file_id = o.file_id
+            WHERE NOT EXISTS (SELECT 1 FROM import_scan s WHERE s.dir_name = o.dir_name)
+              AND NOT EXISTS (SELECT 1 FROM person_files f WHERE f.dir_name = n.dir_name)
+        ''')
+
+        # 5. 导入后新出现的重名（同一姓名对应多个编号）
+        cursor.execute('''
+            INSERT INTO import_changes (change_type, person_name, detail)
+            SELECT 'duplicate_name', person_name, '编号: ' || group_concat(DISTINCT file_id)
+            FROM import_scan
+            WHERE file_id != ''
+            GROUP BY person_name
+            HAVING COUNT(DISTINCT file_id) > 1
+               AND person_name NOT IN (
+                   SELECT person_name FROM person_files
+                   WHERE file_id != ''
+                   GROUP BY person_name
+                   HAVING COUNT(DISTINCT file_id) > 1
+               )
+        ''')
+
+        # 只写入了临时表，提交不影响现有数据
+        conn.commit()
+
+        cursor.execute('SELECT change_type, COUNT(*) FROM import_changes GROUP BY change_type')
+        counts = dict(cursor.fetchall())
+        cursor.execute('SELECT COUNT(*) FROM import_added')
+        added_total = cursor.fetchone()[0]
+        self.stats = {'scanned': scanned, 'unchanged': scanned - added_total}
+        self.stats.update({description: counts.get(change_type, 0)
+                           for change_type, description in CHANGE_TYPES.items()})
+        logging.info(f"导入预览完成: {self.stats}，用时 {time.time() - start_time:.1f} 秒")
+        return self.stats
+
+    def iter_changes(self, conn):
+        """
+        读取 scan 的比对结果（必须使用 scan 时的连接）。
+        :return: 生成器，每行为 dict，字段见 PREVIEW_FIELDS，change_type 为说明文字
+        """
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'''
+                SELECT {', '.join(PREVIEW_FIELDS)}
+                FROM import_changes
+                ORDER BY change_type, dir_name, file_name
+            ''')
+            for row in cursor:
+                change = dict(zip(PREVIEW_FIELDS, ('' if value is None else value for value in row)))
+                change['change_type'] = CHANGE_TYPES.get(change['change_type'], change['change_type'])
+                yield change
+        finally:
+            cursor.close()
+
+    def write_report(self, conn, output_path=None):
+        """
+        将比对结果写入CSV（必须使用 scan 时的连接）。
+        :return: (报告文件路径, 变化数量)
+        """
+        if output_path is None:
+            file_name = f"导入预览_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            output_path = os.path.join(get_exports_dir(), file_name)
+        count = 0
+        with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(PREVIEW_HEADERS)
+            for change in self.iter_changes(conn):
+                writer.writerow([change[field] for field in PREVIEW_FIELDS])
+                count += 1
+        logging.info(f"导入预览报告已保存: {output_path}")
+        return output_path, count
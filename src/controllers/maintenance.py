@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+
+
+class DatabaseMaintenance:
+    """
+    数据库维护：在空闲时回收空闲页（incremental_vacuum）、更新查询统计（ANALYZE / PRAGMA optimize）、
+    检查完整性（quick_check），每次执行的耗时和碎片情况记录在 maintenance_history 表中。
+    """
+
+    # 各任务的最小间隔（秒）
+    TASK_INTERVALS = {
+        'incremental_vacuum': 3600,
+        'optimize': 24 * 3600,
+        'quick_check': 7 * 24 * 3600,
+    }
+    # 空闲页占比达到该值时才回收
+    VACUUM_FREE_RATIO = 0.1
+    # 每步回收的页数（分步执行，每步之间不占用写锁）
+    VACUUM_PAGES_PER_STEP = 2048
+
+    def __init__(self, db):
+        self.db = db
+        self._thread = None
+        self._stop_event = threading.Event()
+        # 同一时间只执行一次维护（空闲时自动维护和手动维护不会同时进行）
+        self._run_lock = threading.Lock()
+        self.results = []
+
+    def is_running(self):
+        """是否正在维护"""
+        return self._run_lock.locked()
+
+    def start(self, force=False):
+        """
+        启动后台维护。
+        :param force: 忽略执行间隔，执行全部任务
+        :return: 是否成功启动
+        """
+        if self.is_running():
+            return False
+        self._thread = threading.Thread(target=self.run, args=(force,), name="DatabaseMaintenance", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """请求停止后台维护（当前步骤完成后停止）"""
+        self._stop_event.set()
+
+    def run(self, force=False):
+        """
+        执行到期的维护任务（后台线程主函数，也可在命令行中直接调用）。
+        :return: [(任务, 结果, 耗时秒), ...]，已有维护在进行时返回空列表
+        """
+        if not self._run_lock.acquire(blocking=False):
+            return []
+        self.results = []
+        self._stop_event.clear()
+        conn = None
+        try:
+            conn = self.db.new_connection()
+            due = self.get_due_tasks(conn, force)
+            for task in due:
+                if self._stop_event.is_set():
+                    logging.info("数据库维护已取消")
+                    break
+                self._run_task(conn, task)
+        except Exception as e:
+            logging.error(f"数据库维护失败: {str(e)}", exc_info=True)
+        finally:
+            if conn is not None:
+                conn.close()
+            self._run_lock.release()
+        return self.results
+
+    def get_due_tasks(self, conn, force=False):
+        """按上次执行时间和碎片情况确定需要执行的任务"""
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT task, MAX(finished_at) FROM maintenance_history WHERE result = 'ok' GROUP BY task
+        ''')
+        last_run = dict(cursor.fetchall())
+        now = time.time()
+        tasks = []
+
+        # 旧数据库需整体 VACUUM 一次后才能使用增量回收（VACUUM 同时回收了空闲页）
+        needs_conversion = cursor.execute('PRAGMA auto_vacuum').fetchone()[0] != 2
+        if needs_conversion:
+            tasks.append('enable_incremental_vacuum')
+        for task, interval in self.TASK_INTERVALS.items():
+            if task == 'incremental_vacuum':
+                if needs_conversion:
+                    continue
+                page_count, freelist_count = self.get_fragmentation(conn)
+                if not force and (not page_count or freelist_count / page_count < self.VACUUM_FREE_RATIO):
+                    continue
+            if not force and now - last_run.get(task, 0) < interval:
+                continue
+            tasks.append(task)
+        return tasks
+
+    @staticmethod
+    def get_fragmentation(conn):
+        """:return: (总页数, 空闲页数)"""
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        freelist_count = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        return page_count, freelist_count
+
+    def _run_task(self, conn, task):
+        start_time = time.time()
+        pages_before, free_before = self.get_fragmentation(conn)
+        try:
+            if task == 'enable_incremental_vacuum':
+                conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                conn.execute('VACUUM')
+                result = 'ok'
+            elif task == 'incremental_vacuum':
+                result = 'ok'
+                while self.get_fragmentation(conn)[1] > 0:
+                    if self._stop_event.is_set():
+                        result = 'cancelled'
+                        break
+                    conn.execute(f'PRAGMA incremental_vacuum({self.VACUUM_PAGES_PER_STEP})').fetchall()
+                    conn.commit()
+            elif task == 'optimize':
+                # 从未分析过时先完整 ANALYZE，之后由 PRAGMA optimize 只更新需要的表
+                has_stats = conn.execute(
+                    "SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()[0]
+                conn.execute('PRAGMA optimize' if has_stats else 'ANALYZE')
+                conn.commit()
+                result = 'ok'
+            elif task == 'quick_check':
+                rows = conn.execute('PRAGMA quick_check').fetchall()
+                result = '; '.join(row[0] for row in rows[:10])
+                if result != 'ok':
+                    logging.error(f"数据库完整性检查发现问题: {result}")
+            else:
+                raise ValueError(f"未知的维护任务: {task}")
+        except Exception as e:
+            logging.error(f"数据库维护任务失败: {task}, {str(e)}", exc_info=True)
+            result = f"error: {str(e)}"
+
+        duration = time.time() - start_time
+        pages_after, free_after = self.get_fragmentation(conn)
+        conn.execute('''
+            INSERT INTO maintenance_history
+                (task, started_at, finished_at, duration, page_count_before, freelist_count_before,
+                 page_count_after, freelist_count_after, result)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (task, start_time, time.time(), duration, pages_before, free_before, pages_after, free_after, result))
+        conn.commit()
+        self.results.append((task, result, duration))
+        logging.info(f"数据库维护: {task} {result}，用时 {duration:.1f} 秒，"
+                     f"页数 {pages_before} -> {pages_after}，空闲页 {free_before} -> {free_after}")
+
+    def get_history(self, limit=50, conn=None):
+        """
+        读取最近的维护记录。
+        :return: [(task, started_at, duration, page_count_before, freelist_count_before,
+                   page_count_after, freelist_count_after, result), ...]
+        """
+        cursor = (conn or self.db.conn).cursor()
+        try:
+            cursor.execute('''
+                SELECT task, started_at, duration, page_count_before, freelist_count_before,
+                       page_count_after, freelist_count_after, result
+                FROM maintenance_history
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (limit,))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
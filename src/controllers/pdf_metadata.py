@@ -0,0 +1,156 @@
+import json
+import logging
+import threading
+import time
+
+from src.utils.pdf_utils import extract_pdf_info, get_file_signature, is_pymupdf_available
+from src.utils.process_pool import get_process_pool
+
+
+class PdfMetadataExtractor:
+    """后台PDF元数据提取器：在进程池中读取页数和元数据，结果写入 pdf_metadata 表"""
+
+    # 每批处理的文件数量（每批提交一次事务）
+    BATCH_SIZE = 200
+
+    def __init__(self, db):
+        self.db = db
+        self._thread = None
+        self._stop_event = threading.Event()
+        # 提取进行中时收到的新请求排队，当前提取完成后接着处理（_active 表示后台线程仍会处理队列）
+        self._queue_lock = threading.Lock()
+        self._active = False
+        self._queued_paths = []
+        self._queued_all = False
+
+    def is_running(self):
+        """是否正在后台提取"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, file_paths=None):
+        """
+        启动后台提取；已在提取时加入队列，当前提取完成后处理。
+        :param file_paths: 需要检查的PDF路径列表；为None时检查数据库中的全部PDF
+        :return: 是否成功启动或加入队列
+        """
+        if not is_pymupdf_available():
+            logging.warning("未安装PyMuPDF，跳过PDF元数据提取")
+            return False
+
+        with self._queue_lock:
+            if self._active:
+                if file_paths is None:
+                    self._queued_all = True
+                else:
+                    self._queued_paths.extend(file_paths)
+                logging.info("PDF元数据提取正在进行中，新的请求将在当前提取完成后处理")
+                return True
+            self._active = True
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run_queued, args=(file_paths,), name="PdfMetadataExtractor", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def _run_queued(self, file_paths):
+        """后台线程主函数：执行提取，再依次处理排队的请求"""
+        while True:
+            self.run(file_paths)
+            with self._queue_lock:
+                if self._stop_event.is_set() or not (self._queued_all or self._queued_paths):
+                    self._queued_paths = []
+                    self._queued_all = False
+                    self._active = False
+                    return
+                # 排队的全量检查包含排队的单个文件
+                file_paths = None if self._queued_all else list(dict.fromkeys(self._queued_paths))
+                self._queued_paths = []
+                self._queued_all = False
+
+    def stop(self):
+        """请求停止后台提取"""
+        self._stop_event.set()
+
+    def run(self, file_paths=None):
+        """执行提取（后台线程主函数，也可在命令行中直接调用）"""
+        conn = None
+        start_time = time.time()
+        extracted = 0
+        try:
+            conn = self.db.new_connection()
+            cursor = conn.cursor()
+
+            if file_paths is None:
+                cursor.execute('''
+                    SELECT DISTINCT file_path FROM person_files
+                    WHERE file_name LIKE '%.pdf'
+                ''')
+                file_paths = [row[0] for row in cursor.fetchall()]
+
+            logging.info(f"开始检查PDF元数据，共 {len(file_paths)} 个文件")
+            for i in range(0, len(file_paths), self.BATCH_SIZE):
+                if self._stop_event.is_set():
+                    logging.info("PDF元数据提取已取消")
+                    break
+                extracted += self._process_batch(conn, file_paths[i:i + self.BATCH_SIZE])
+
+            logging.info(f"PDF元数据提取完成，新解析 {extracted} 个文件，用时 {time.time() - start_time:.1f} 秒")
+        except Exception as e:
+            logging.error(f"PDF元数据提取失败: {str(e)}", exc_info=True)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _process_batch(self, conn, batch):
+        """处理一批文件：只解析新增或已变化的文件"""
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(batch))
+        cursor.execute(f'''
+            SELECT file_path, mtime, file_size FROM pdf_metadata
+            WHERE file_path IN ({placeholders})
+        ''', batch)
+        known = {path: (mtime, size) for path, mtime, size in cursor.fetchall()}
+        # 按文件清单导入后的首次检查：使用清单给出的修改时间和大小，不再逐个读取文件状态；
+        # 清单的值只使用一次，之后的检查读取文件状态，导入后被替换的文件仍能发现
+        cursor.execute(f'''
+            SELECT file_path, mtime, file_size FROM manifest_signatures
+            WHERE file_path IN ({placeholders})
+        ''', batch)
+        manifest = {path: (mtime, size) for path, mtime, size in cursor.fetchall()}
+
+        # 路径+修改时间+大小均未变化的文件无需重新解析
+        pending = {}
+        for file_path in batch:
+            signature = manifest.get(file_path) or get_file_signature(file_path)
+            if signature is None:
+                continue
+            if known.get(file_path) != signature:
+                pending[file_path] = signature
+
+        if manifest:
+            cursor.executemany('DELETE FROM manifest_signatures WHERE file_path = ?',
+                               [(path,) for path in manifest])
+        if not pending:
+            conn.commit()
+            return 0
+
+        pool = get_process_pool()
+        rows = []
+        for info in pool.map(extract_pdf_info, list(pending), chunksize=8):
+            mtime, size = pending[info['file_path']]
+            rows.append((
+                info['file_path'], mtime, size, info['page_count'],
+                json.dumps(info['metadata'], ensure_ascii=False),
+                info['parse_error'], info['error_message']
+            ))
+            if info['parse_error']:
+                logging.warning(f"PDF解析失败: {info['file_path']}, {info['error_message']}")
+
+        cursor.executemany('''
+            INSERT OR REPLACE INTO pdf_metadata
+                (file_path, mtime, file_size, page_count, metadata, parse_error, error_message, extracted_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', rows)
+        conn.commit()
+        return len(rows)
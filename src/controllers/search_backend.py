@@ -0,0 +1,170 @@
+import os
+import json
+import logging
+import threading
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from src.controllers.file_manager import FileManager
+from src.utils.excel_utils import find_excel_file, get_sheet_name, list_excel_files, load_excel_catalog, lookup_catalog
+
+
+class LocalSearchBackend:
+    """
+    本进程内的检索：直接查询数据库和Excel目录。
+    搜索服务中固定数量的工作线程共用一个实例，此时每个工作线程使用各自的数据库连接（建立后一直复用）。
+    """
+
+    def __init__(self, db, suggestions, import_root_dir=None, per_thread_connections=False):
+        """
+        :param suggestions: SearchSuggestions 对象（姓名、编号输入提示）
+        :param per_thread_connections: 是否为每个线程创建独立连接（在多个线程中使用时）
+        """
+        self.db = db
+        self.suggestions = suggestions
+        self.import_root_dir = import_root_dir
+        self.per_thread_connections = per_thread_connections
+        self._local = threading.local()
+
+    def _get_conn(self):
+        if not self.per_thread_connections:
+            return self.db.conn
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self.db.new_connection()
+        return conn
+
+    def find_duplicate_ids(self, person_name):
+        """查找同名人员的所有编号"""
+        return FileManager.find_duplicate_ids(self.db, person_name, conn=self._get_conn())
+
+    def search_files(self, person_name=None, file_id=None, name_patterns=None):
+        """按姓名、编号（和分类的文件名模式）搜索PDF文件，返回 [(file_name, file_path), ...]"""
+        return FileManager.search_files(self.db, person_name, file_id, name_patterns, conn=self._get_conn())
+
+    def count_categories(self, person_name=None, file_id=None):
+        """统计各分类号的PDF文件数量，返回 [(main_category_num, sub_category_num, count), ...]"""
+        return FileManager.count_categories(self.db, person_name, file_id, conn=self._get_conn())
+
+    def suggest_names(self, prefix, limit=10):
+        return self.suggestions.suggest_names(prefix, limit)
+
+    def suggest_file_ids(self, prefix, limit=10):
+        return self.suggestions.suggest_file_ids(prefix, limit)
+
+    def get_file_details(self, files):
+        """
+        获取文件列表显示所需的信息（Excel中的材料名称、日期、页数，Excel中没有页数时使用PDF页数）。
+        :param files: [(file_name, file_path), ...]，只处理PDF文件
+        :return: {'rows': [dict, ...], 'warnings': [...], 'errors': [...]}
+                 rows 的字段与导出列一致；warnings 为未找到Excel文件的提示，errors 为读取失败的提示
+        """
+        pdf_files = [(file_name, file_path) for file_name, file_path in files if file_name.lower().endswith('.pdf')]
+        pdf_info = self.db.get_pdf_metadata((file_path for _, file_path in pdf_files), conn=self._get_conn())
+
+        rows = []
+        warnings = []
+        errors = []
+        excel_files = None
+        catalogs = {}
+        for file_name, file_path in pdf_files:
+            dir_name = os.path.basename(os.path.dirname(file_path))
+            file_id, person_name = FileManager.parse_dir_name(dir_name)
+            class_code = os.path.splitext(file_name)[0]
+
+            material_name, file_date, page_count = '', '', ''
+            if get_sheet_name(class_code):
+                try:
+                    # 同一人员的Excel只查找、读取一次
+                    if dir_name not in catalogs:
+                        if excel_files is None:
+                            excel_files = list_excel_files(self.import_root_dir) if self.import_root_dir else []
+                        excel_file = find_excel_file(self.import_root_dir, person_name, file_id, excel_files)
+                        catalogs[dir_name] = self._load_catalog(excel_file) if excel_file else None
+                        if excel_file is None:
+                            warnings.append(f"未找到匹配的Excel文件: {person_name}")
+                    if catalogs[dir_name]:
+                        material_name, file_date, page_count = lookup_catalog(catalogs[dir_name], class_code)
+                except Exception as e:
+                    logging.error(f"Excel信息读取失败: {str(e)}")
+                    catalogs[dir_name] = None
+                    errors.append(f"读取Excel信息时发生错误：{str(e)}")
+
+            # Excel中没有页数时，使用PDF实际页数
+            if not page_count and file_path in pdf_info:
+                pdf_page_count, _, parse_error = pdf_info[file_path]
+                if not parse_error and pdf_page_count is not None:
+                    page_count = str(pdf_page_count)
+
+            rows.append({
+                'file_id': file_id,
+                'person_name': person_name,
+                'class_code': class_code,
+                'material_name': material_name,
+                'file_name': file_name,
+                'file_date': file_date,
+                'page_count': page_count,
+                'file_path': file_path,
+            })
+        return {'rows': rows, 'warnings': warnings, 'errors': errors}
+
+    def _load_catalog(self, excel_file):
+        """优先使用已入库的Excel目录，未入库或文件已修改时再解析"""
+        return load_excel_catalog(excel_file, self.db, self._get_conn())
+
+
+class RemoteSearchBackend:
+    """通过本机或局域网的搜索服务（python -m src.server）检索，接口与 LocalSearchBackend 相同"""
+
+    # Excel目录由服务端设置决定，客户端设置的值不使用
+    import_root_dir = None
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, path, params=None, body=None):
+        url = f"{self.base_url}{path}"
+        if params:
+            url += '?' + urlencode(params, doseq=True)
+        data = None
+        headers = {}
+        if body is not None:
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            headers['Content-Type'] = 'application/json; charset=utf-8'
+        with urlopen(Request(url, data=data, headers=headers), timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def ping(self):
+        """检查搜索服务是否可用"""
+        return self._request('/api/ping')
+
+    def find_duplicate_ids(self, person_name):
+        return self._request('/api/duplicate_ids', {'name': person_name})['ids']
+
+    def search_files(self, person_name=None, file_id=None, name_patterns=None):
+        params = {'name': person_name or '', 'id': file_id or ''}
+        if name_patterns:
+            params['pattern'] = name_patterns
+        return [tuple(row) for row in self._request('/api/search', params)['files']]
+
+    def count_categories(self, person_name=None, file_id=None):
+        params = {'name': person_name or '', 'id': file_id or ''}
+        return [tuple(row) for row in self._request('/api/category_counts', params)['counts']]
+
+    def suggest_names(self, prefix, limit=10):
+        return self._suggest('name', prefix, limit)
+
+    def suggest_file_ids(self, prefix, limit=10):
+        return self._suggest('id', prefix, limit)
+
+    def _suggest(self, field, prefix, limit):
+        try:
+            return self._request('/api/suggest', {'field': field, 'prefix': prefix, 'limit': limit})['values']
+        except Exception as e:
+            # 输入提示失败不影响搜索
+            logging.warning(f"获取输入提示失败: {str(e)}")
+            return []
+
+    def get_file_details(self, files):
+        return self._request('/api/file_details', body={'files': [list(item) for item in files]})
@@ -0,0 +1,54 @@
+import logging
+import threading
+import time
+
+from src.utils.prefix_index import PrefixIndex
+
+
+class SearchSuggestions:
+    """姓名、编号输入提示：在后台从数据库读取不重复的姓名和编号，建立前缀索引"""
+
+    def __init__(self, db):
+        self.db = db
+        self.names = PrefixIndex()
+        self.file_ids = PrefixIndex()
+        self._thread = None
+
+    def rebuild(self):
+        """在后台线程中重新建立索引（启动后、全量导入后调用）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._build, name="SearchSuggestions", daemon=True)
+        self._thread.start()
+
+    def _build(self):
+        conn = None
+        start_time = time.time()
+        try:
+            conn = self.db.new_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT person_name FROM person_files WHERE person_name != ''")
+            self.names.replace(row[0] for row in cursor.fetchall())
+            cursor.execute("SELECT DISTINCT file_id FROM person_files WHERE file_id IS NOT NULL AND file_id != ''")
+            self.file_ids.replace(row[0] for row in cursor.fetchall())
+            logging.info(f"输入提示索引建立完成: {len(self.names)} 个姓名, {len(self.file_ids)} 个编号, "
+                         f"用时 {time.time() - start_time:.2f} 秒")
+        except Exception as e:
+            logging.error(f"建立输入提示索引失败: {str(e)}", exc_info=True)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def add_rows(self, rows):
+        """
+        增量添加新导入的文件记录。
+        :param rows: [(person_name, file_name, file_path, dir_name, file_id), ...]
+        """
+        self.names.add(row[0] for row in rows)
+        self.file_ids.add(row[4] for row in rows)
+
+    def suggest_names(self, prefix, limit=10):
+        return self.names.search(prefix, limit)
+
+    def suggest_file_ids(self, prefix, limit=10):
+        return self.file_ids.search(prefix, limit)
@@ -0,0 +1,97 @@
+import os
+import logging
+import threading
+import time
+
+from src.utils.pdf_utils import render_first_page, is_pymupdf_available
+from src.utils.process_pool import get_process_pool
+from src.utils.thumbnail_cache import ThumbnailCache, get_content_fingerprint
+
+
+class ThumbnailService:
+    """PDF首页缩略图服务：在工作进程中渲染，结果保存在磁盘缓存中"""
+
+    # 缩略图渲染分辨率（低分辨率，仅用于预览）
+    DEFAULT_DPI = 36
+
+    def __init__(self, cache=None, dpi=DEFAULT_DPI):
+        self.cache = cache or ThumbnailCache()
+        self.dpi = dpi
+        self._thread = None
+        self._pending = []
+        self._lock = threading.Lock()
+        # 后台线程仍会处理 _pending 中的请求（与 _pending 一起在 _lock 内读写）
+        self._active = False
+
+    def get_thumbnail(self, file_path):
+        """
+        获取已缓存的缩略图路径（不触发渲染）。
+        :return: 缩略图路径，未缓存返回 None
+        """
+        fingerprint = get_content_fingerprint(file_path)
+        if fingerprint is None:
+            return None
+        return self.cache.get(fingerprint, self.dpi)
+
+    def prefetch(self, file_paths):
+        """
+        在后台预先生成缩略图。
+        :param file_paths: PDF路径列表
+        """
+        if not is_pymupdf_available():
+            logging.debug("未安装PyMuPDF，跳过缩略图预取")
+            return
+
+        with self._lock:
+            # 后台任务运行中时，新请求排在前面，优先处理最新的请求
+            self._pending = list(file_paths) + self._pending
+            if self._active:
+                return
+            self._active = True
+            self._thread = threading.Thread(target=self._run, name="ThumbnailService", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """后台线程主函数：处理待处理的请求，直到没有新的请求"""
+        while True:
+            with self._lock:
+                file_paths, self._pending = self._pending, []
+                if not file_paths:
+                    # 与 prefetch 在同一把锁内判断，退出前加入的请求不会被遗漏
+                    self._active = False
+                    return
+            try:
+                self._render_missing(file_paths)
+                self.cache.evict_if_needed()
+            except Exception as e:
+                logging.error(f"缩略图预取失败: {str(e)}", exc_info=True)
+
+    def _render_missing(self, file_paths):
+        """渲染尚未缓存的缩略图"""
+        start_time = time.time()
+        jobs = {}
+        for file_path in dict.fromkeys(file_paths):
+            fingerprint = get_content_fingerprint(file_path)
+            if fingerprint is None or self.cache.get(fingerprint, self.dpi):
+                continue
+            output_path = self.cache.prepare_path(fingerprint, self.dpi)
+            # 指纹相同的文件只渲染一次
+            jobs.setdefault(output_path, file_path)
+
+        if not jobs:
+            return
+
+        pool = get_process_pool()
+        futures = {
+            output_path: pool.submit(render_first_page, file_path, output_path, self.dpi)
+            for output_path, file_path in jobs.items()
+        }
+        rendered = 0
+        for output_path, future in futures.items():
+            if future.result()[1]:
+                rendered += 1
+                try:
+                    self.cache.add_written(os.path.getsize(output_path))
+                except OSError:
+                    pass
+        logging.info(f"已生成 {rendered}/{len(jobs)} 个缩略图，用时 {time.time() - start_time:.1f} 秒")
@@ -0,0 +1,139 @@
+import os
+import logging
+import threading
+import time
+
+from src.utils.excel_utils import list_excel_files, parse_workbook_rows
+from src.utils.pdf_utils import get_file_signature
+from src.utils.process_pool import get_process_pool
+
+
+class WorkbookIngestor:
+    """
+    后台解析档案目录下的全部Excel目录文件：在进程池中并行解析，结果写入 excel_workbooks/excel_catalog 表。
+    只解析新增或已变化的文件，已删除的文件同时移除其记录。
+    """
+
+    # 每批处理的文件数量（每批提交一次事务）
+    BATCH_SIZE = 100
+
+    def __init__(self, db):
+        self.db = db
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.stats = {}
+
+    def is_running(self):
+        """是否正在后台解析"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, import_root_dir):
+        """
+        启动后台解析。
+        :return: 是否成功启动
+        """
+        if self.is_running():
+            logging.info("Excel目录解析正在进行中，忽略重复请求")
+            return False
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self.run, args=(import_root_dir,), name="WorkbookIngestor", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """请求停止后台解析"""
+        self._stop_event.set()
+
+    def run(self, import_root_dir):
+        """执行解析（后台线程主函数，也可在命令行中直接调用）"""
+        conn = None
+        start_time = time.time()
+        self.stats = {'workbooks': 0, 'parsed': 0, 'rows': 0, 'errors': 0, 'removed': 0}
+        try:
+            conn = self.db.new_connection()
+            workbook_paths = [os.path.abspath(path) for path in list_excel_files(import_root_dir)]
+            self.stats['workbooks'] = len(workbook_paths)
+            logging.info(f"开始检查Excel目录文件，共 {len(workbook_paths)} 个")
+
+            self.stats['removed'] = self._remove_missing(conn, import_root_dir, set(workbook_paths))
+            for i in range(0, len(workbook_paths), self.BATCH_SIZE):
+                if self._stop_event.is_set():
+                    logging.info("Excel目录解析已取消")
+                    break
+                self._process_batch(conn, workbook_paths[i:i + self.BATCH_SIZE])
+
+            elapsed = time.time() - start_time
+            throughput = self.stats['parsed'] / elapsed if elapsed > 0 else 0
+            logging.info(f"Excel目录解析完成: 新解析 {self.stats['parsed']} 个文件（{throughput:.1f} 个/秒），"
+                         f"{self.stats['rows']} 条目录，失败 {self.stats['errors']} 个，"
+                         f"移除 {self.stats['removed']} 个，用时 {elapsed:.1f} 秒")
+        except Exception as e:
+            logging.error(f"Excel目录解析失败: {str(e)}", exc_info=True)
+        finally:
+            if conn is not None:
+                conn.close()
+        return self.stats
+
+    def _remove_missing(self, conn, import_root_dir, existing_paths):
+        """移除档案目录下已删除的Excel文件的记录"""
+        prefix = os.path.join(os.path.abspath(import_root_dir), '')
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT workbook_path FROM excel_workbooks
+            WHERE workbook_path > ? AND workbook_path < ?
+        ''', (prefix, prefix + '\U0010ffff'))
+        missing = [(path,) for (path,) in cursor.fetchall() if path not in existing_paths]
+        if missing:
+            cursor.executemany('DELETE FROM excel_catalog WHERE workbook_path = ?', missing)
+            cursor.executemany('DELETE FROM excel_workbooks WHERE workbook_path = ?', missing)
+            conn.commit()
+        return len(missing)
+
+    def _process_batch(self, conn, batch):
+        """处理一批文件：只解析新增或已变化的文件"""
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(batch))
+        cursor.execute(f'''
+            SELECT workbook_path, mtime, file_size FROM excel_workbooks
+            WHERE workbook_path IN ({placeholders})
+        ''', batch)
+        known = {path: (mtime, size) for path, mtime, size in cursor.fetchall()}
+
+        # 路径+修改时间+大小均未变化的文件无需重新解析
+        pending = {}
+        for workbook_path in batch:
+            signature = get_file_signature(workbook_path)
+            if signature is not None and known.get(workbook_path) != signature:
+                pending[workbook_path] = signature
+        if not pending:
+            return
+
+        pool = get_process_pool()
+        workbook_rows = []
+        catalog_rows = []
+        for workbook_path, rows, error in pool.map(parse_workbook_rows, list(pending), chunksize=4):
+            mtime, size = pending[workbook_path]
+            if error:
+                # 单个文件解析失败不影响其他文件，记录错误后跳过
+                logging.warning(f"Excel目录解析失败: {workbook_path}, {error}")
+                self.stats['errors'] += 1
+            workbook_rows.append((workbook_path, mtime, size, len(rows), 1 if error else 0, error))
+            catalog_rows.extend((workbook_path, *row) for row in rows)
+
+        cursor.executemany('DELETE FROM excel_catalog WHERE workbook_path = ?', [(path,) for path in pending])
+        cursor.executemany('''
+            INSERT OR REPLACE INTO excel_catalog
+                (workbook_path, sheet_name, class_code, material_name, file_date, page_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', catalog_rows)
+        cursor.executemany('''
+            INSERT OR REPLACE INTO excel_workbooks
+                (workbook_path, mtime, file_size, row_count, parse_error, error_message, parsed_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', workbook_rows)
+        conn.commit()
+        self.stats['parsed'] += len(pending)
+        self.stats['rows'] += len(catalog_rows)
@@ -7,6 +7,7 @@ import tkinter as tk
 import logging
 from datetime import datetime
 import subprocess
+import multiprocessing
 
 # 添加项目根目录到 sys.path
 # 添加项目根目录到 sys.path
@@ -21,9 +22,11 @@ from src.utils.paths import (
 )
 
 # 正确的导入路径
-from src.models.database import Database
+from src.models.replica import open_database
+from src.config.user_settings import load_user_settings
 from src.ui.main_window import MainWindow
 from src.config.logger import setup_logger
+from src.utils.process_pool import shutdown_process_pool
 
 # 应用程序常量
 VERSION = "1.0(0518)"
@@ -39,8 +42,8 @@ def main():
         # 设置路径 - 使用路径管理模块
         app_dir = get_application_path()
         
-        # 初始化数据库
-        db = Database()
+        # 初始化数据库（订阅模式下使用从发布目录同步的只读副本）
+        db = open_database(load_user_settings())
         
         # 创建GUI
         root = tk.Tk()
@@ -65,6 +68,10 @@ def main():
         # 进入主循环
         root.mainloop()
         
+        # 停止后台任务
+        main_window.shutdown()
+        shutdown_process_pool()
+        
     except Exception as e:
         error_msg = f"程序启动失败: {str(e)}"
         logging.error(error_msg, exc_info=True)
@@ -72,4 +79,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # 打包后的程序使用进程池时需要
+    multiprocessing.freeze_support()
     main()
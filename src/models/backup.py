@@ -0,0 +1,226 @@
+import os
+import gzip
+import json
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+from urllib.request import pathname2url
+
+from src.models.database import ACCESS_LOG_COLUMNS, ACCESS_LOG_DDL
+from src.utils.paths import get_backup_dir
+
+BACKUP_PREFIX = 'archimgr_'
+BACKUP_SUFFIX = '.db.gz'
+# 恢复前自动备份当前数据库时使用的前缀（与普通备份分别轮换）
+PRE_RESTORE_PREFIX = 'before_restore_'
+
+# 备份时每步复制的页数，步与步之间短暂让出数据库锁，其他连接可继续读写
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP = 0.01
+# 默认保留的备份数量
+DEFAULT_KEEP_BACKUPS = 10
+
+
+def copy_database(source_conn, target_path, progress=None):
+    """
+    使用 SQLite 备份接口分步复制一致的数据库快照（复制期间源数据库仍可读写）。
+    :param source_conn: 源数据库连接（在调用线程中创建）
+    :param target_path: 目标文件路径（已存在时覆盖）
+    :param progress: 进度回调 progress(remaining, total)，单位为页
+    """
+    target_conn = sqlite3.connect(target_path)
+    try:
+        def on_progress(status, remaining, total):
+            if progress:
+                progress(remaining, total)
+
+        source_conn.backup(target_conn, pages=BACKUP_PAGES_PER_STEP, progress=on_progress,
+                           sleep=BACKUP_STEP_SLEEP)
+        # 备份文件单独保存，不使用 WAL 模式
+        target_conn.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        target_conn.close()
+
+
+def check_integrity(db_path, quick=False):
+    """
+    检查数据库文件的完整性。
+    :param quick: 使用 quick_check（较快，不检查索引内容）
+    :return: 'ok' 或错误信息
+    """
+    conn = sqlite3.connect(f"file:{pathname2url(db_path)}?mode=ro", uri=True)
+    try:
+        rows = conn.execute('PRAGMA quick_check' if quick else 'PRAGMA integrity_check').fetchall()
+    finally:
+        conn.close()
+    return '; '.join(row[0] for row in rows[:10])
+
+
+def _sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def create_backup(conn, backup_dir=None, keep=DEFAULT_KEEP_BACKUPS, prefix=BACKUP_PREFIX, progress=None):
+    """
+    在线备份数据库：分步复制、检查完整性后压缩保存到备份目录，并删除超出保留数量的旧备份。
+    :param conn: 数据库连接（后台线程中需传入独立连接）
+    :param backup_dir: 备份目录，默认见 get_backup_dir
+    :param keep: 保留的备份数量
+    :param progress: 进度回调 progress(remaining, total)
+    :return: 备份信息 dict（path, db_size, size, sha256, created_at）
+    :raises ValueError: 备份副本完整性检查失败
+    """
+    backup_dir = backup_dir or get_backup_dir()
+    os.makedirs(backup_dir, exist_ok=True)
+    created_at = datetime.now()
+    backup_name = f"{prefix}{created_at.strftime('%Y%m%d_%H%M%S_%f')}{BACKUP_SUFFIX}"
+    backup_path = os.path.join(backup_dir, backup_name)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_copy = os.path.join(temp_dir, 'backup.db')
+        copy_database(conn, db_copy, progress)
+        result = check_integrity(db_copy, quick=True)
+        if result != 'ok':
+            raise ValueError(f"备份副本完整性检查失败: {result}")
+
+        # 先写临时文件再改名，备份目录中不会出现写了一半的备份
+        with open(db_copy, 'rb') as src, gzip.open(f"{backup_path}.tmp", 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(f"{backup_path}.tmp", backup_path)
+        info = {
+            'path': backup_path,
+            'db_size': os.path.getsize(db_copy),
+            'size': os.path.getsize(backup_path),
+            'sha256': _sha256(backup_path),
+            'created_at': created_at.isoformat(timespec='seconds'),
+        }
+
+    with open(f"{backup_path}.json", 'w', encoding='utf-8') as f:
+        json.dump({key: value for key, value in info.items() if key != 'path'}, f, ensure_ascii=False, indent=2)
+    logging.info(f"数据库备份完成: {backup_path}, 压缩后 {info['size'] / 1024 / 1024:.1f} MB")
+
+    _remove_old_backups(backup_dir, keep, prefix)
+    return info
+
+
+def list_backups(backup_dir=None):
+    """
+    列出备份目录中的备份（包括恢复前的自动备份），最新的在前。
+    :return: [{'path', 'name', 'size', 'created_at'}, ...]
+    """
+    backup_dir = backup_dir or get_backup_dir()
+    backups = []
+    for name in os.listdir(backup_dir):
+        if not name.endswith(BACKUP_SUFFIX) or not name.startswith((BACKUP_PREFIX, PRE_RESTORE_PREFIX)):
+            continue
+        path = os.path.join(backup_dir, name)
+        stat = os.stat(path)
+        backups.append({
+            'path': path,
+            'name': name,
+            'size': stat.st_size,
+            'created_at': datetime.fromtimestamp(stat.st_mtime),
+        })
+    backups.sort(key=lambda backup: backup['created_at'], reverse=True)
+    return backups
+
+
+def _remove_old_backups(backup_dir, keep, prefix):
+    backups = sorted(name for name in os.listdir(backup_dir)
+                     if name.startswith(prefix) and name.endswith(BACKUP_SUFFIX))
+    for name in backups[:-keep] if keep > 0 else []:
+        for path in (os.path.join(backup_dir, name), os.path.join(backup_dir, f"{name}.json")):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                logging.warning(f"删除旧备份失败: {path}, {str(e)}")
+
+
+def prepare_restore(backup_path, work_dir):
+    """
+    校验并解压备份，检查完整性（可在后台线程中执行）。
+    :param work_dir: 解压目录（应与数据库在同一磁盘）
+    :return: 解压后的数据库文件路径
+    :raises ValueError: 校验值不符或数据库已损坏
+    """
+    info_path = f"{backup_path}.json"
+    if os.path.exists(info_path):
+        with open(info_path, 'r', encoding='utf-8') as f:
+            expected = json.load(f).get('sha256')
+        if expected and _sha256(backup_path) != expected:
+            raise ValueError(f"备份文件校验失败: {os.path.basename(backup_path)}")
+
+    restored_path = os.path.join(work_dir, 'restore.db')
+    if backup_path.endswith('.gz'):
+        with gzip.open(backup_path, 'rb') as src, open(restored_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    else:
+        shutil.copyfile(backup_path, restored_path)
+
+    result = check_integrity(restored_path)
+    if result != 'ok':
+        raise ValueError(f"备份数据库已损坏: {result}")
+    return restored_path
+
+
+def _keep_access_log(restore_conn, db_path):
+    """
+    访问记录只追加，不随恢复回退：把待恢复文件中的访问记录替换为当前数据库中的访问记录。
+    :param restore_conn: 待恢复文件（临时文件）的连接
+    """
+    restore_conn.execute('ATTACH DATABASE ? AS current_db', (db_path,))
+    try:
+        exists = restore_conn.execute(
+            "SELECT 1 FROM current_db.sqlite_master WHERE type = 'table' AND name = 'access_log'").fetchone()
+        if not exists:
+            return
+        for sql in ACCESS_LOG_DDL:
+            restore_conn.execute(sql)
+        columns = ', '.join(ACCESS_LOG_COLUMNS)
+        restore_conn.execute('DELETE FROM main.access_log')
+        restore_conn.execute(f'INSERT INTO main.access_log ({columns}) SELECT {columns} FROM current_db.access_log')
+        restore_conn.commit()
+    finally:
+        restore_conn.execute('DETACH DATABASE current_db')
+
+
+def restore_backup(db, backup_path, backup_dir=None, restored_path=None, conn=None):
+    """
+    从备份恢复数据库：先自动备份当前数据库，再用备份接口把备份内容整体写回当前数据库
+    （数据库文件不替换，已打开的连接继续可用），最后补齐新版本的表和列。
+    访问记录（access_log）只追加，保留当前数据库中的记录，不回退到备份时的内容。
+    :param db: Database 对象
+    :param restored_path: prepare_restore 已解压、检查过的文件，不传时在此处理
+    :param conn: 备份、写回使用的连接（后台线程中需传入独立连接），默认使用 db.conn；
+                 传入时不补齐表和列，由调用方在创建 db.conn 的线程中调用 db.ensure_schema()
+    :return: 恢复前自动备份的信息
+    """
+    if db.read_only:
+        raise ValueError("只读数据库副本不能恢复")
+
+    backup_dir = backup_dir or get_backup_dir()
+    target_conn = conn or db.conn
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(db.db_path)) as work_dir:
+        if restored_path is None:
+            restored_path = prepare_restore(backup_path, work_dir)
+        safety_backup = create_backup(target_conn, backup_dir, prefix=PRE_RESTORE_PREFIX)
+
+        source_conn = sqlite3.connect(restored_path)
+        try:
+            _keep_access_log(source_conn, db.db_path)
+            source_conn.backup(target_conn)
+        finally:
+            source_conn.close()
+
+    if conn is None:
+        db.ensure_schema()
+    logging.info(f"数据库已从备份恢复: {backup_path}（恢复前备份: {safety_backup['path']}）")
+    return safety_backup
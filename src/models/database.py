@@ -2,33 +2,204 @@ import sqlite3
 import logging
 import os
 import sys
+from urllib.request import pathname2url
+
+from src.models.taxonomy import parse_category_code
+
+# 人员文件表的列定义（建表和全量导入的影子表共用）
+PERSON_FILES_SCHEMA = '''
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    person_name TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    category_id INTEGER,
+    dir_name TEXT NOT NULL DEFAULT '',    -- 目录名称（包含编号和姓名），分页排序键，不能为NULL
+    file_id TEXT,     -- 编号
+    main_category_num INTEGER,  -- 文件名中的主分类号
+    sub_category_num INTEGER,   -- 文件名中的子分类号
+    FOREIGN KEY (person_name) REFERENCES persons(name),
+    FOREIGN KEY (category_id) REFERENCES categories(id)
+'''
+
+# 人员文件表的索引（全量导入时在数据写入影子表之后再建）
+PERSON_FILES_INDEXES = {
+    # 按路径查找文件记录（目录监控、清理时使用）
+    'idx_person_files_path': 'CREATE INDEX IF NOT EXISTS idx_person_files_path ON person_files(file_path)',
+    # 按姓名、编号查找；姓名+文件名、目录名+文件名索引同时用作分页查询的排序键
+    'idx_person_files_person':
+        'CREATE INDEX IF NOT EXISTS idx_person_files_person ON person_files(person_name, file_name)',
+    'idx_person_files_dir': 'CREATE INDEX IF NOT EXISTS idx_person_files_dir ON person_files(dir_name, file_name)',
+    'idx_person_files_file_id': 'CREATE INDEX IF NOT EXISTS idx_person_files_file_id ON person_files(file_id)',
+}
+
+# 全量导入时写入的影子表
+PERSON_FILES_SHADOW = 'person_files_new'
+
+# 访问记录表（AccessLog）：只追加，不允许修改；主数据库和只读副本工作站本机的访问记录库共用
+ACCESS_LOG_COLUMNS = ('id', 'created_at', 'user_name', 'action', 'person_name', 'file_id', 'file_path', 'detail')
+ACCESS_LOG_DDL = (
+    '''
+    CREATE TABLE IF NOT EXISTS access_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        created_at REAL NOT NULL,
+        user_name TEXT,
+        action TEXT NOT NULL,       -- 见 access_log.ACCESS_ACTIONS
+        person_name TEXT,
+        file_id TEXT,
+        file_path TEXT,
+        detail TEXT
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_access_log_time ON access_log(created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_access_log_user ON access_log(user_name, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_access_log_person ON access_log(person_name, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_access_log_file_id ON access_log(file_id, created_at)',
+    '''
+    CREATE TRIGGER IF NOT EXISTS access_log_no_update BEFORE UPDATE ON access_log
+    BEGIN
+        SELECT RAISE(ABORT, 'access_log is append-only');
+    END
+    ''',
+)
+
+# 统计表的维护触发器：person_files、pdf_metadata 变化时增量更新 person_stats、category_stats
+# pdf_metadata 使用 INSERT OR REPLACE 写入（不触发删除触发器），插入前先减去旧记录的页数
+_STATS_PERSON_KEY = 'COALESCE({row}.dir_name, {row}.person_name)'
+_STATS_PAGES = '''COALESCE((SELECT page_count FROM pdf_metadata
+                             WHERE file_path = {row}.file_path AND parse_error = 0), 0)'''
+STATS_TRIGGERS = {
+    'trg_person_files_stats_insert': f'''
+        CREATE TRIGGER trg_person_files_stats_insert AFTER INSERT ON person_files
+        BEGIN
+            INSERT OR IGNORE INTO person_stats (dir_name, person_name, file_id)
+            VALUES ({_STATS_PERSON_KEY.format(row='NEW')}, NEW.person_name, NEW.file_id);
+            UPDATE person_stats SET
+                file_count = file_count + 1,
+                pdf_count = pdf_count + (NEW.file_name LIKE '%.pdf'),
+                excel_count = excel_count + (NEW.file_name LIKE '%.xlsx'),
+                page_total = page_total + {_STATS_PAGES.format(row='NEW')},
+                last_modified = NULLIF(MAX(COALESCE(last_modified, 0),
+                    COALESCE((SELECT mtime FROM pdf_metadata WHERE file_path = NEW.file_path), 0)), 0),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE dir_name = {_STATS_PERSON_KEY.format(row='NEW')};
+            INSERT OR IGNORE INTO category_stats (main_category_num, sub_category_num)
+            SELECT NEW.main_category_num, COALESCE(NEW.sub_category_num, 0)
+            WHERE NEW.main_category_num IS NOT NULL AND NEW.file_name LIKE '%.pdf';
+            UPDATE category_stats SET file_count = file_count + 1
+            WHERE NEW.file_name LIKE '%.pdf' AND main_category_num = NEW.main_category_num
+                  AND sub_category_num = COALESCE(NEW.sub_category_num, 0);
+        END
+    ''',
+    'trg_person_files_stats_delete': f'''
+        CREATE TRIGGER trg_person_files_stats_delete AFTER DELETE ON person_files
+        BEGIN
+            UPDATE person_stats SET
+                file_count = file_count - 1,
+                pdf_count = pdf_count - (OLD.file_name LIKE '%.pdf'),
+                excel_count = excel_count - (OLD.file_name LIKE '%.xlsx'),
+                page_total = page_total - {_STATS_PAGES.format(row='OLD')},
+                updated_at = CURRENT_TIMESTAMP
+            WHERE dir_name = {_STATS_PERSON_KEY.format(row='OLD')};
+            DELETE FROM person_stats WHERE dir_name = {_STATS_PERSON_KEY.format(row='OLD')} AND file_count <= 0;
+            UPDATE category_stats SET file_count = file_count - 1
+            WHERE OLD.file_name LIKE '%.pdf' AND main_category_num = OLD.main_category_num
+                  AND sub_category_num = COALESCE(OLD.sub_category_num, 0);
+            DELETE FROM category_stats WHERE file_count <= 0;
+        END
+    ''',
+    'trg_pdf_metadata_stats_before_insert': f'''
+        CREATE TRIGGER trg_pdf_metadata_stats_before_insert BEFORE INSERT ON pdf_metadata
+        BEGIN
+            UPDATE person_stats SET page_total = page_total - {_STATS_PAGES.format(row='NEW')}
+            WHERE dir_name IN (SELECT {_STATS_PERSON_KEY.format(row='f')} FROM person_files f
+                               WHERE f.file_path = NEW.file_path);
+        END
+    ''',
+    'trg_pdf_metadata_stats_insert': f'''
+        CREATE TRIGGER trg_pdf_metadata_stats_insert AFTER INSERT ON pdf_metadata
+        BEGIN
+            UPDATE person_stats SET
+                page_total = page_total + (CASE WHEN NEW.parse_error = 0 THEN COALESCE(NEW.page_count, 0) ELSE 0 END),
+                last_modified = MAX(COALESCE(last_modified, 0), NEW.mtime)
+            WHERE dir_name IN (SELECT {_STATS_PERSON_KEY.format(row='f')} FROM person_files f
+                               WHERE f.file_path = NEW.file_path);
+        END
+    ''',
+    'trg_pdf_metadata_stats_delete': f'''
+        CREATE TRIGGER trg_pdf_metadata_stats_delete AFTER DELETE ON pdf_metadata
+        BEGIN
+            UPDATE person_stats SET
+                page_total = page_total - (CASE WHEN OLD.parse_error = 0 THEN COALESCE(OLD.page_count, 0) ELSE 0 END)
+            WHERE dir_name IN (SELECT {_STATS_PERSON_KEY.format(row='f')} FROM person_files f
+                               WHERE f.file_path = OLD.file_path);
+        END
+    ''',
+}
+
 
 class Database:
-    def __init__(self):
-        """初始化数据库连接"""
+    # 分页查询默认每页行数
+    PAGE_SIZE = 500
+    
+    # 分页排序方式 -> 排序键（都以id结尾，保证键唯一）
+    PAGE_ORDERS = {
+        'id': ('id',),
+        'file_name': ('file_name', 'id'),
+        'dir_name': ('dir_name', 'file_name', 'id'),
+    }
+    
+    # 分页查询返回的列
+    PAGE_COLUMNS = ('id', 'file_id', 'person_name', 'dir_name', 'file_name', 'file_path', 'page_count')
+    
+    def __init__(self, db_path=None, read_only=False):
+        """
+        初始化数据库连接。
+        :param db_path: 数据库路径，默认使用用户数据目录下的数据库
+        :param read_only: 是否以只读方式打开（从发布目录同步的本机副本）
+        """
         # 使用路径管理模块获取数据库路径
         from src.utils.paths import get_database_path
-        self.db_path = get_database_path()
+        self.db_path = db_path or get_database_path()
+        self.read_only = read_only
         
         # 确保数据库目录存在
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
         # 建立数据库连接
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = self.new_connection()
             self.cursor = self.conn.cursor()
             
-            # 创建必要的表
-            self._create_tables()
+            # 只读副本由发布机建好，不需要建表和迁移
+            if not self.read_only:
+                self.ensure_schema()
             
-            # 执行数据库迁移，添加新列
-            self._migrate_database()
-            
-            logging.info(f"数据库连接成功: {self.db_path}")
+            logging.info(f"数据库连接成功: {self.db_path}{'（只读）' if self.read_only else ''}")
         except Exception as e:
             logging.error(f"数据库连接失败: {str(e)}", exc_info=True)
             raise
     
+    def ensure_schema(self):
+        """创建缺少的表并执行迁移（打开数据库、从备份恢复后调用）"""
+        # 创建必要的表
+        self._create_tables()
+
+        # 执行数据库迁移，添加新列
+        self._migrate_database()
+
+    def new_connection(self):
+        """创建新的数据库连接（后台线程需使用各自独立的连接）"""
+        if self.read_only:
+            return sqlite3.connect(f"file:{pathname2url(self.db_path)}?mode=ro", uri=True, timeout=30)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        # 新建的数据库直接使用增量回收空闲页，须在写入文件头之前设置；
+        # 设置需要写锁，只对空文件执行（已有数据库由 DatabaseMaintenance 转换）
+        if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL模式下后台写入不会阻塞界面线程的查询
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+    
     def _create_tables(self):
         """创建数据库表"""
         try:
@@ -54,19 +225,7 @@ class Database:
             ''')
             
             # 人员文件表
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS person_files (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    person_name TEXT NOT NULL,
-                    file_name TEXT NOT NULL,
-                    file_path TEXT NOT NULL,
-                    category_id INTEGER,
-                    dir_name TEXT,    -- 目录名称（包含编号和姓名）
-                    file_id TEXT,     -- 编号
-                    FOREIGN KEY (person_name) REFERENCES persons(name),
-                    FOREIGN KEY (category_id) REFERENCES categories(id)
-                )
-            ''')
+            self.cursor.execute(f'CREATE TABLE IF NOT EXISTS person_files ({PERSON_FILES_SCHEMA})')
             
             # 文件表
             self.cursor.execute('''
@@ -81,6 +240,162 @@ class Database:
                 )
             ''')
             
+            # PDF元数据表（按路径+修改时间+大小判断是否需要重新解析）
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS pdf_metadata (
+                    file_path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    page_count INTEGER,
+                    metadata TEXT,              -- PDF元数据（JSON）
+                    parse_error INTEGER DEFAULT 0,
+                    error_message TEXT,
+                    extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # 文件内容哈希缓存（路径+修改时间+大小未变时复用）
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS file_hashes (
+                    file_path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    quick_hash TEXT,            -- 文件开头部分的哈希，用于快速排除
+                    full_hash TEXT,             -- 完整内容的SHA256
+                    hashed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # 按文件清单导入时清单给出的修改时间和大小（导入后首次提取PDF元数据时代替读取文件状态，用后删除）
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS manifest_signatures (
+                    file_path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    file_size INTEGER NOT NULL
+                )
+            ''')
+            
+            # 已解析的Excel目录文件（按路径+修改时间+大小判断是否需要重新解析）
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS excel_workbooks (
+                    workbook_path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    row_count INTEGER DEFAULT 0,
+                    parse_error INTEGER DEFAULT 0,
+                    error_message TEXT,
+                    parsed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # 档案统计（由触发器增量维护，见 STATS_TRIGGERS）
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS person_stats (
+                    dir_name TEXT PRIMARY KEY,
+                    person_name TEXT,
+                    file_id TEXT,
+                    file_count INTEGER NOT NULL DEFAULT 0,
+                    pdf_count INTEGER NOT NULL DEFAULT 0,
+                    excel_count INTEGER NOT NULL DEFAULT 0,
+                    page_total INTEGER NOT NULL DEFAULT 0,
+                    last_modified REAL,             -- PDF文件的最近修改时间
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS category_stats (
+                    main_category_num INTEGER NOT NULL,
+                    sub_category_num INTEGER NOT NULL DEFAULT 0,  -- 没有子分类号时为0
+                    file_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (main_category_num, sub_category_num)
+                )
+            ''')
+
+            # 档案检查（ArchiveAuditor）：每次检查一条记录，明细只保留最近一次
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS audit_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    import_root_dir TEXT,
+                    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    person_count INTEGER,
+                    issue_count INTEGER
+                )
+            ''')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS audit_issues (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id INTEGER NOT NULL,
+                    issue_type TEXT NOT NULL,   -- 见 audit.ISSUE_TYPES
+                    dir_name TEXT,
+                    person_name TEXT,
+                    file_id TEXT,
+                    class_code TEXT,
+                    file_path TEXT,
+                    workbook_path TEXT,
+                    detail TEXT
+                )
+            ''')
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_issues_run ON audit_issues(run_id, issue_type)')
+
+            # 增量导入档案的记录和检查点（ArchiveImporter），导入中断后从检查点继续
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS import_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    folder_path TEXT NOT NULL,
+                    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    status TEXT NOT NULL,       -- running / done / cancelled / failed / abandoned
+                    folder_count INTEGER DEFAULT 0,
+                    done_count INTEGER DEFAULT 0,
+                    file_count INTEGER DEFAULT 0
+                )
+            ''')
+            self.cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_import_runs_folder ON import_runs(folder_path, status)')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS import_run_folders (
+                    run_id INTEGER NOT NULL,
+                    folder_name TEXT NOT NULL,
+                    file_count INTEGER DEFAULT 0,
+                    finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (run_id, folder_name)
+                )
+            ''')
+
+            # 访问记录（AccessLog）：只追加，不允许修改，超过保留天数的记录按时间清理
+            for sql in ACCESS_LOG_DDL:
+                self.cursor.execute(sql)
+
+            # 数据库维护记录（DatabaseMaintenance）
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS maintenance_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    finished_at REAL NOT NULL,
+                    duration REAL,
+                    page_count_before INTEGER,
+                    freelist_count_before INTEGER,
+                    page_count_after INTEGER,
+                    freelist_count_after INTEGER,
+                    result TEXT
+                )
+            ''')
+
+            # Excel目录内容：每个sheet中每个类号一行
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS excel_catalog (
+                    workbook_path TEXT NOT NULL,
+                    sheet_name TEXT NOT NULL,
+                    class_code TEXT NOT NULL,
+                    material_name TEXT,
+                    file_date TEXT,
+                    page_count TEXT,
+                    PRIMARY KEY (workbook_path, sheet_name, class_code)
+                )
+            ''')
+            
             self.conn.commit()
             logging.info("数据库表创建成功")
         except Exception as e:
@@ -98,13 +413,14 @@ class Database:
             if 'dir_name' not in columns:
                 logging.info("添加dir_name列到person_files表")
                 self.cursor.execute("ALTER TABLE person_files ADD COLUMN dir_name TEXT")
-                
-                # 更新现有数据的dir_name列
-                self.cursor.execute('''
-                    UPDATE person_files
-                    SET dir_name = person_name
-                    WHERE dir_name IS NULL
-                ''')
+            
+            # 补齐没有目录名的记录（按目录名分页时行值比较遇到NULL会漏掉这些行；
+            # 旧数据库的列没有NOT NULL约束，下次全量导入换表后才有）
+            self.cursor.execute('''
+                UPDATE person_files
+                SET dir_name = person_name
+                WHERE dir_name IS NULL
+            ''')
             
             # 添加file_id列
             if 'file_id' not in columns:
@@ -129,9 +445,279 @@ class Database:
                             WHERE id = ?
                         ''', (file_id, row_id))
             
+            # 添加分类号列（由文件名中的类号得出，用于一次统计各分类的文件数量）
+            if 'main_category_num' not in columns:
+                logging.info("添加分类号列到person_files表")
+                self.cursor.execute("ALTER TABLE person_files ADD COLUMN main_category_num INTEGER")
+                self.cursor.execute("ALTER TABLE person_files ADD COLUMN sub_category_num INTEGER")
+                self._backfill_category_nums()
+
+            # 人员文件表的索引（旧数据库需先迁移出 file_id 列）
+            self.cursor.execute('DROP INDEX IF EXISTS idx_person_files_name')
+            for sql in PERSON_FILES_INDEXES.values():
+                self.cursor.execute(sql)
+
+            # 统计表触发器（分类号列迁移之后创建），首次创建时按现有数据重建统计
+            self.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            existing_triggers = {row[0] for row in self.cursor.fetchall()}
+            missing_triggers = [name for name in STATS_TRIGGERS if name not in existing_triggers]
+            for name in missing_triggers:
+                self.cursor.execute(STATS_TRIGGERS[name])
+            if missing_triggers:
+                logging.info("创建档案统计触发器并重建统计")
+                self.rebuild_archive_stats(commit=False)
+
             self.conn.commit()
             logging.info("数据库迁移成功")
         except Exception as e:
             self.conn.rollback()
             logging.error(f"数据库迁移失败: {str(e)}")
-            # 不抛出异常，允许程序继续运行
\ No newline at end of file
+            # 不抛出异常，允许程序继续运行
+    
+    def create_person_files_shadow(self, conn=None):
+        """
+        创建空的影子表（全量导入时写入，没有索引和触发器，写入较快），遗留的影子表（上次导入中断）先删除。
+        :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 self.conn
+        :return: 影子表名
+        """
+        conn = conn or self.conn
+        conn.execute(f'DROP TABLE IF EXISTS {PERSON_FILES_SHADOW}')
+        conn.execute(f'CREATE TABLE {PERSON_FILES_SHADOW} ({PERSON_FILES_SCHEMA})')
+        conn.commit()
+        return PERSON_FILES_SHADOW
+
+    def drop_person_files_shadow(self, conn=None):
+        """删除影子表（全量导入失败时调用）"""
+        conn = conn or self.conn
+        conn.rollback()
+        conn.execute(f'DROP TABLE IF EXISTS {PERSON_FILES_SHADOW}')
+        conn.commit()
+
+    def swap_person_files(self, conn=None):
+        """
+        在一个事务中用影子表替换 person_files：删除旧表、改名、建索引和统计触发器并重建统计。
+        提交前其他连接（WAL模式）仍读取旧数据，不会看到空表或导入了一半的数据。
+        :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 self.conn
+        """
+        conn = conn or self.conn
+        conn.commit()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 统计触发器引用 person_files，先删除，换表后重新创建
+            for name in STATS_TRIGGERS:
+                conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+            conn.execute('DROP TABLE person_files')
+            conn.execute(f'ALTER TABLE {PERSON_FILES_SHADOW} RENAME TO person_files')
+            for sql in PERSON_FILES_INDEXES.values():
+                conn.execute(sql)
+            for sql in STATS_TRIGGERS.values():
+                conn.execute(sql)
+            self.rebuild_archive_stats(conn, commit=False)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        # 新表没有查询统计信息，重新分析
+        conn.execute('ANALYZE person_files')
+        conn.commit()
+
+    def rebuild_archive_stats(self, conn=None, commit=True):
+        """
+        按现有数据全量重建统计表（首次迁移时使用，平时由触发器增量维护）。
+        :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 self.conn
+        """
+        conn = conn or self.conn
+        conn.execute('DELETE FROM person_stats')
+        conn.execute('DELETE FROM category_stats')
+        conn.execute('''
+            INSERT INTO person_stats
+                (dir_name, person_name, file_id, file_count, pdf_count, excel_count, page_total, last_modified)
+            SELECT COALESCE(f.dir_name, f.person_name), MIN(f.person_name), MIN(f.file_id), COUNT(*),
+                   SUM(f.file_name LIKE '%.pdf'), SUM(f.file_name LIKE '%.xlsx'),
+                   COALESCE(SUM(CASE WHEN m.parse_error = 0 THEN m.page_count END), 0), MAX(m.mtime)
+            FROM person_files f
+            LEFT JOIN pdf_metadata m ON m.file_path = f.file_path
+            GROUP BY COALESCE(f.dir_name, f.person_name)
+        ''')
+        conn.execute('''
+            INSERT INTO category_stats (main_category_num, sub_category_num, file_count)
+            SELECT main_category_num, COALESCE(sub_category_num, 0), COUNT(*)
+            FROM person_files
+            WHERE main_category_num IS NOT NULL AND file_name LIKE '%.pdf'
+            GROUP BY main_category_num, COALESCE(sub_category_num, 0)
+        ''')
+        if commit:
+            conn.commit()
+
+    def get_archive_stats(self, conn=None):
+        """
+        读取档案统计（只读统计表，不扫描文件表）。
+        :return: {'summary': {persons, files, pdfs, pages},
+                  'categories': [(main_category_num, sub_category_num, file_count), ...]（子分类号为0表示无子分类）,
+                  'persons': [(dir_name, person_name, file_id, file_count, pdf_count, excel_count,
+                               page_total, last_modified), ...]}
+        """
+        cursor = (conn or self.conn).cursor()
+        try:
+            cursor.execute('''
+                SELECT COUNT(*), COALESCE(SUM(file_count), 0), COALESCE(SUM(pdf_count), 0),
+                       COALESCE(SUM(page_total), 0)
+                FROM person_stats
+            ''')
+            persons, files, pdfs, pages = cursor.fetchone()
+            cursor.execute('''
+                SELECT main_category_num, sub_category_num, file_count FROM category_stats
+                ORDER BY main_category_num, sub_category_num
+            ''')
+            categories = cursor.fetchall()
+            cursor.execute('''
+                SELECT dir_name, person_name, file_id, file_count, pdf_count, excel_count, page_total, last_modified
+                FROM person_stats ORDER BY dir_name
+            ''')
+            return {
+                'summary': {'persons': persons, 'files': files, 'pdfs': pdfs, 'pages': pages},
+                'categories': categories,
+                'persons': cursor.fetchall(),
+            }
+        finally:
+            cursor.close()
+
+    def _backfill_category_nums(self):
+        """为已有的文件记录填写分类号列"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id, file_name FROM person_files')
+        while True:
+            rows = cursor.fetchmany(self.PAGE_SIZE)
+            if not rows:
+                break
+            self.cursor.executemany('''
+                UPDATE person_files SET main_category_num = ?, sub_category_num = ? WHERE id = ?
+            ''', [(*parse_category_code(file_name), row_id) for row_id, file_name in rows])
+
+    def get_pdf_metadata(self, file_paths, conn=None):
+        """
+        批量获取PDF元数据。
+        :param file_paths: 文件路径列表
+        :param conn: 数据库连接（其他线程中需传入独立连接），默认使用 self.conn
+        :return: {file_path: (page_count, file_size, parse_error)}
+        """
+        result = {}
+        paths = list(file_paths)
+        cursor = (conn or self.conn).cursor()
+        try:
+            # 分批查询，避免超过SQLite参数数量上限
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT file_path, page_count, file_size, parse_error
+                    FROM pdf_metadata
+                    WHERE file_path IN ({placeholders})
+                ''', chunk)
+                for file_path, page_count, file_size, parse_error in cursor.fetchall():
+                    result[file_path] = (page_count, file_size, parse_error)
+        finally:
+            cursor.close()
+        return result
+
+    def get_person_files_page(self, after=None, limit=None, order_by='id', person_name=None, file_id=None,
+                              name_patterns=None, pdf_only=False, include_hidden=False, conn=None):
+        """
+        分页查询文件记录（keyset分页）：按上一页最后一行的排序键定位，
+        不使用OFFSET，每页耗时与页码无关。
+        :param after: 上一页返回的 next_key，None 表示第一页
+        :param limit: 每页行数，默认 PAGE_SIZE
+        :param order_by: 排序方式，见 PAGE_ORDERS
+        :param name_patterns: 文件名 LIKE 模式列表（任一匹配即可），用于按分类过滤
+        :param pdf_only: 是否只返回PDF文件
+        :param include_hidden: 是否包含 ~ 和 . 开头的临时文件
+        :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 self.conn
+        :return: (rows, next_key)，rows 的列见 PAGE_COLUMNS；已是最后一页时 next_key 为 None
+        """
+        limit = limit or self.PAGE_SIZE
+        key_columns = self.PAGE_ORDERS[order_by]
+        conditions = []
+        params = []
+        if not include_hidden:
+            conditions.append("f.file_name NOT LIKE '~%' AND f.file_name NOT LIKE '.%'")
+        if pdf_only:
+            conditions.append("f.file_name LIKE '%.pdf'")
+        if person_name:
+            conditions.append('f.person_name = ?')
+            params.append(person_name)
+        if file_id:
+            conditions.append('f.file_id = ?')
+            params.append(file_id)
+        if name_patterns:
+            conditions.append('(' + ' OR '.join('f.file_name LIKE ?' for _ in name_patterns) + ')')
+            params.extend(name_patterns)
+        if after is not None:
+            # 行值比较：(a, b, id) > (?, ?, ?)
+            conditions.append(f"({', '.join('f.' + column for column in key_columns)}) > "
+                              f"({', '.join('?' for _ in key_columns)})")
+            params.extend(after)
+
+        query = f'''
+            SELECT f.id, f.file_id, f.person_name, f.dir_name, f.file_name, f.file_path, m.page_count
+            FROM person_files f
+            LEFT JOIN pdf_metadata m ON m.file_path = f.file_path AND m.parse_error = 0
+            WHERE {' AND '.join(conditions) or '1=1'}
+            ORDER BY {', '.join('f.' + column for column in key_columns)}
+            LIMIT ?
+        '''
+        params.append(limit)
+
+        cursor = (conn or self.conn).cursor()
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        next_key = None
+        if len(rows) == limit:
+            last_row = rows[-1]
+            next_key = tuple(last_row[self.PAGE_COLUMNS.index(column)] for column in key_columns)
+        return rows, next_key
+
+    def iter_person_files(self, page_size=None, **filters):
+        """
+        逐页读取文件记录的生成器，内存中只保留一页。
+        每页单独查询，页与页之间不占用读事务。
+        :param filters: 同 get_person_files_page 的过滤和排序参数
+        """
+        after = None
+        while True:
+            rows, after = self.get_person_files_page(after=after, limit=page_size, **filters)
+            yield from rows
+            if after is None:
+                break
+
+    def get_excel_catalog(self, workbook_path, conn=None):
+        """
+        读取已入库的Excel目录（文件修改过或未入库时返回 None，需重新解析）。
+        :return: {sheet_name: {class_code: (material_name, file_date, page_count)}}
+        """
+        workbook_path = os.path.abspath(workbook_path)
+        try:
+            stat = os.stat(workbook_path)
+        except OSError:
+            return None
+        cursor = (conn or self.conn).cursor()
+        try:
+            cursor.execute('''
+                SELECT mtime, file_size, parse_error FROM excel_workbooks WHERE workbook_path = ?
+            ''', (workbook_path,))
+            row = cursor.fetchone()
+            if row is None or row[2] or (row[0], row[1]) != (stat.st_mtime, stat.st_size):
+                return None
+            cursor.execute('''
+                SELECT sheet_name, class_code, material_name, file_date, page_count
+                FROM excel_catalog WHERE workbook_path = ?
+            ''', (workbook_path,))
+            catalog = {}
+            for sheet_name, class_code, material_name, file_date, page_count in cursor.fetchall():
+                catalog.setdefault(sheet_name, {})[class_code] = (material_name, file_date, page_count)
+            return catalog
+        finally:
+            cursor.close()
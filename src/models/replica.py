@@ -0,0 +1,210 @@
+import os
+import gzip
+import json
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+
+from src.models.backup import copy_database
+from src.models.database import Database
+from src.utils.paths import get_database_dir
+
+# 发布目录中的清单文件，记录当前快照的版本和校验值
+MANIFEST_NAME = 'manifest.json'
+SNAPSHOT_PREFIX = 'catalog_'
+SNAPSHOT_SUFFIX = '.db.gz'
+
+# 发布目录中保留的快照数量（保留上一版本，避免客户端正在复制时被删除）
+KEEP_SNAPSHOTS = 2
+
+# 不发布到共享目录的表（用户密码、访问记录、检查和维护记录），快照中保留表结构、清空内容
+PRIVATE_TABLES = ('users', 'access_log', 'audit_runs', 'audit_issues', 'maintenance_history')
+
+
+def get_replica_path():
+    """获取本机只读副本的路径"""
+    return os.path.join(get_database_dir(), 'replica.db')
+
+
+def _sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(file_path, data):
+    """先写临时文件再替换，读取方不会看到写了一半的文件"""
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, file_path)
+
+
+def read_manifest(publish_dir):
+    """
+    读取发布目录中的快照清单。
+    :return: 清单 dict，未发布过时返回 None
+    """
+    manifest_path = os.path.join(publish_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def publish_snapshot(db, publish_dir, conn=None):
+    """
+    发布数据库快照：使用 SQLite 备份接口复制一致的快照，压缩后写入发布目录并更新清单。
+    :param db: Database 对象（发布机上的可写数据库）
+    :param publish_dir: 发布目录（通常为共享目录）
+    :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 db.conn
+    :return: 清单 dict
+    """
+    os.makedirs(publish_dir, exist_ok=True)
+    version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    snapshot_name = f"{SNAPSHOT_PREFIX}{version}{SNAPSHOT_SUFFIX}"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 1. 备份到本地临时文件（备份期间其他连接仍可读写）
+        backup_path = os.path.join(temp_dir, 'snapshot.db')
+        # 副本以只读方式打开，不能使用 WAL 模式（copy_database 已切换为 DELETE 模式）
+        copy_database(conn or db.conn, backup_path)
+        backup_conn = sqlite3.connect(backup_path)
+        try:
+            _clear_private_tables(backup_conn)
+            # 清空后整理，删除的内容不会留在快照的空闲页中
+            backup_conn.execute('VACUUM')
+        finally:
+            backup_conn.close()
+
+        # 2. 压缩到本地，再整体复制到发布目录
+        compressed_path = os.path.join(temp_dir, snapshot_name)
+        with open(backup_path, 'rb') as src, gzip.open(compressed_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+        manifest = {
+            'version': version,
+            'file': snapshot_name,
+            'sha256': _sha256(compressed_path),
+            'size': os.path.getsize(compressed_path),
+            'db_size': os.path.getsize(backup_path),
+            'published_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        target_path = os.path.join(publish_dir, snapshot_name)
+        shutil.copyfile(compressed_path, f"{target_path}.tmp")
+        os.replace(f"{target_path}.tmp", target_path)
+
+    # 3. 快照文件就位后再更新清单
+    _write_json_atomic(os.path.join(publish_dir, MANIFEST_NAME), manifest)
+    _remove_old_snapshots(publish_dir)
+    logging.info(f"已发布数据库快照: {target_path}, 版本 {version}, "
+                 f"压缩后 {manifest['size'] / 1024 / 1024:.1f} MB")
+    return manifest
+
+
+def _clear_private_tables(conn):
+    """清空快照中不发布的表（只修改临时副本）"""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in PRIVATE_TABLES:
+        if table in existing:
+            conn.execute(f'DELETE FROM {table}')
+    conn.commit()
+
+
+def _remove_old_snapshots(publish_dir):
+    snapshots = sorted(
+        name for name in os.listdir(publish_dir)
+        if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)
+    )
+    for name in snapshots[:-KEEP_SNAPSHOTS]:
+        try:
+            os.remove(os.path.join(publish_dir, name))
+        except OSError as e:
+            logging.warning(f"删除旧快照失败: {name}, {str(e)}")
+
+
+def get_local_version(replica_path=None):
+    """获取本机副本的版本，没有副本时返回 None"""
+    replica_path = replica_path or get_replica_path()
+    version_path = f"{replica_path}.json"
+    if not os.path.exists(replica_path) or not os.path.exists(version_path):
+        return None
+    try:
+        with open(version_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('version')
+    except Exception:
+        return None
+
+
+def sync_replica(publish_dir, replica_path=None):
+    """
+    同步本机副本：版本与发布目录一致时不复制，否则下载、校验并解压后替换本机副本。
+    :return: (是否更新, 本机副本版本)
+    :raises FileNotFoundError: 发布目录中没有快照
+    :raises ValueError: 快照校验失败
+    """
+    replica_path = replica_path or get_replica_path()
+    manifest = read_manifest(publish_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"发布目录中没有数据库快照: {publish_dir}")
+
+    local_version = get_local_version(replica_path)
+    if local_version == manifest['version']:
+        logging.info(f"本机数据库副本已是最新版本: {local_version}")
+        return False, local_version
+
+    os.makedirs(os.path.dirname(replica_path), exist_ok=True)
+    compressed_path = f"{replica_path}.download"
+    temp_db_path = f"{replica_path}.new"
+    try:
+        # 先整体复制到本地再校验，避免通过网络逐页读取
+        shutil.copyfile(os.path.join(publish_dir, manifest['file']), compressed_path)
+        if _sha256(compressed_path) != manifest['sha256']:
+            raise ValueError(f"数据库快照校验失败: {manifest['file']}")
+
+        with gzip.open(compressed_path, 'rb') as src, open(temp_db_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+        conn = sqlite3.connect(temp_db_path)
+        try:
+            result = conn.execute('PRAGMA quick_check').fetchone()[0]
+        finally:
+            conn.close()
+        if result != 'ok':
+            raise ValueError(f"数据库快照已损坏: {result}")
+
+        os.replace(temp_db_path, replica_path)
+        _write_json_atomic(f"{replica_path}.json", manifest)
+        logging.info(f"本机数据库副本已更新: {local_version} -> {manifest['version']}")
+        return True, manifest['version']
+    finally:
+        for path in (compressed_path, temp_db_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def open_database(settings):
+    """
+    按设置打开数据库：订阅模式下先同步发布目录中的快照，再以只读方式打开本机副本；
+    同步失败时使用已有的本机副本，没有副本时使用本地数据库。
+    :param settings: 用户设置（replica_mode: publish/subscribe，replica_dir: 发布目录）
+    """
+    replica_dir = settings.get('replica_dir')
+    if settings.get('replica_mode') != 'subscribe' or not replica_dir:
+        return Database()
+
+    try:
+        sync_replica(replica_dir)
+    except Exception as e:
+        logging.warning(f"同步数据库副本失败: {str(e)}")
+
+    replica_path = get_replica_path()
+    if os.path.exists(replica_path):
+        return Database(replica_path, read_only=True)
+    logging.warning("没有可用的本机数据库副本，使用本地数据库")
+    return Database()
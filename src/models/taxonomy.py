@@ -0,0 +1,248 @@
+import re
+import logging
+import threading
+
+# 中文数字（一级分类的显示前缀和Excel目录的sheet名）
+CHINESE_NUMBERS = {
+    1: "一", 2: "二", 3: "三", 4: "四", 5: "五",
+    6: "六", 7: "七", 8: "八", 9: "九", 10: "十"
+}
+
+# 默认分类：(主分类号, 子分类号, 名称)，一级分类的子分类号为 None
+DEFAULT_CATEGORIES = [
+    (1, None, "履历材料"),
+    (2, None, "自传材料"),
+    (3, None, "鉴定、考核材料"),
+    (4, None, "学历学位、职称、学术、培训等材料"),
+    (4, 1, "学历学位材料"),
+    (4, 2, "专业技术职务材料"),
+    (4, 3, "科研学术材料"),
+    (4, 4, "培训材料"),
+    (5, None, "政审材料"),
+    (6, None, "党团材料"),
+    (7, None, "奖励材料"),
+    (8, None, "处分材料"),
+    (9, None, "工资、任免、出国、会议等材料"),
+    (9, 1, "工资材料"),
+    (9, 2, "任免材料"),
+    (9, 3, "出国（境）审批材料"),
+    (9, 4, "会议代表材料"),
+    (10, None, "其他材料"),
+]
+
+# 文件名中的类号：标准格式 4-1-2.pdf（二级分类号后还有分隔符）、点分格式 4.1.2.pdf
+_CLASS_MAIN_RE = re.compile(r'^(\d+)[-.]')
+_CLASS_SUB_RE = re.compile(r'^\d+(?:-(\d+)-|\.(\d+))')
+
+
+def parse_category_code(file_name):
+    """
+    从文件名中提取分类号，与分类的文件名匹配模式（见 CategoryNode.name_patterns）一致。
+    :return: (主分类号, 子分类号)，无法识别的部分为 None
+    """
+    match = _CLASS_MAIN_RE.match(file_name)
+    if not match:
+        return None, None
+    sub_match = _CLASS_SUB_RE.match(file_name)
+    sub_num = (sub_match.group(1) or sub_match.group(2)) if sub_match else None
+    return int(match.group(1)), int(sub_num) if sub_num else None
+
+
+class CategoryNode:
+    """分类树中的一个分类（一级或二级）"""
+
+    def __init__(self, main_num, sub_num, name):
+        self.main_num = main_num
+        self.sub_num = sub_num
+        self.name = name
+        # 类号：一级分类为 "4"，二级分类为 "4-1"
+        self.code = str(main_num) if sub_num is None else f"{main_num}-{sub_num}"
+        self.parent_code = None if sub_num is None else str(main_num)
+        self.children = []
+
+    @property
+    def display_text(self):
+        """分类树中显示的文本：一级分类用中文数字前缀，二级分类用阿拉伯数字前缀"""
+        if self.sub_num is None:
+            return f"{CHINESE_NUMBERS.get(self.main_num, str(self.main_num))}、{self.name}"
+        return f"{self.sub_num}、{self.name}"
+
+    @property
+    def sheet_name(self):
+        """Excel目录中对应的sheet名（例如 三、四-1）"""
+        chinese_num = CHINESE_NUMBERS.get(self.main_num, str(self.main_num))
+        return chinese_num if self.sub_num is None else f"{chinese_num}-{self.sub_num}"
+
+    @property
+    def name_patterns(self):
+        """文件名匹配模式：标准格式(4-%、4-1-%)和点分格式(4.%、4.1%)"""
+        if self.sub_num is None:
+            return [f'{self.code}-%', f'{self.code}.%']
+        return [f'{self.code}-%', f'{self.code.replace("-", ".")}%']
+
+    def __repr__(self):
+        return f"CategoryNode({self.code!r}, {self.name!r})"
+
+
+class CategoryTaxonomy:
+    """
+    档案分类体系：由分类表、分类Excel或默认分类构建，预先建立类号、显示文本到分类的映射，
+    分类树点击、Excel目录sheet名查找都通过它完成，不再解析显示文本。
+    """
+
+    def __init__(self, entries):
+        """
+        :param entries: [(主分类号, 子分类号或None, 名称), ...]
+        """
+        self.roots = []
+        self._by_code = {}
+        self._by_display = {}
+        subcategories = []
+        for main_num, sub_num, name in sorted(entries, key=lambda e: (e[0], e[1] or 0)):
+            node = CategoryNode(int(main_num), None if sub_num is None else int(sub_num), name)
+            if node.code in self._by_code:
+                logging.warning(f"分类编码重复，忽略: {node.code} {name}")
+                continue
+            self._by_code[node.code] = node
+            if node.sub_num is None:
+                self.roots.append(node)
+                self._by_display[(None, node.display_text)] = node.code
+            else:
+                subcategories.append(node)
+
+        for node in subcategories:
+            parent = self._by_code.get(node.parent_code)
+            if parent is None:
+                logging.warning(f"找不到父分类(编码 {node.parent_code})，忽略二级分类: {node.name}")
+                del self._by_code[node.code]
+                continue
+            parent.children.append(node)
+            self._by_display[(parent.code, node.display_text)] = node.code
+
+    @classmethod
+    def default(cls):
+        """默认分类体系"""
+        return cls(DEFAULT_CATEGORIES)
+
+    @classmethod
+    def from_db(cls, cursor):
+        """
+        从分类表读取分类体系，分类表为空时使用默认分类。
+        :param cursor: 数据库游标
+        """
+        cursor.execute('''
+            SELECT main_category_num, sub_category_num, category FROM categories
+            WHERE main_category_num IS NOT NULL
+        ''')
+        entries = cursor.fetchall()
+        return cls(entries) if entries else cls.default()
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """
+        从分类Excel读取分类体系：第一列为类号（例如 4 或 4-1），第二列为分类名称，
+        名称前的序号前缀（例如 "一、"、"1、"）会被去掉。
+        :raises ValueError: 没有可识别的分类行
+        """
+        entries = []
+        for code, name in df.iloc[:, :2].itertuples(index=False):
+            if isinstance(code, float) and code.is_integer():
+                code = int(code)
+            match = re.match(r'^\s*(\d+)(?:\s*[-.]\s*(\d+))?\s*$', str(code))
+            if not match or not isinstance(name, str) or not name.strip():
+                continue
+            name = re.sub(r'^\s*[\d一二三四五六七八九十]+\s*、', '', name).strip()
+            sub_num = int(match.group(2)) if match.group(2) else None
+            entries.append((int(match.group(1)), sub_num, name))
+        if not entries:
+            raise ValueError("分类文件中没有可识别的分类（第一列应为类号，第二列为分类名称）")
+        return cls(entries)
+
+    def save_to_db(self, cursor):
+        """用当前分类体系替换分类表的内容（不提交事务）"""
+        cursor.execute('DELETE FROM categories')
+        cursor.executemany('''
+            INSERT INTO categories (category, parent_category, main_category_num, sub_category_num)
+            VALUES (?, ?, ?, ?)
+        ''', [
+            (node.name, self._by_code[node.parent_code].name if node.parent_code else None,
+             node.main_num, node.sub_num)
+            for node in self
+        ])
+
+    def __iter__(self):
+        """按树的顺序遍历所有分类（一级分类后紧跟其子分类）"""
+        for root in self.roots:
+            yield root
+            yield from root.children
+
+    def __len__(self):
+        return len(self._by_code)
+
+    def get(self, code):
+        """按类号获取分类，不存在时返回 None"""
+        return self._by_code.get(code)
+
+    def code_for_display(self, display_text, parent_code=None):
+        """按显示文本（和父分类类号）获取类号，不存在时返回 None"""
+        return self._by_display.get((parent_code, display_text))
+
+    def find(self, class_code):
+        """
+        获取文件类号所属的最具体的分类（例如 4-1-2 -> 4-1，3-1 -> 3）。
+        :return: CategoryNode，不属于任何分类时返回 None
+        """
+        parts = class_code.split('-')
+        if len(parts) >= 2:
+            node = self._by_code.get(f"{parts[0]}-{parts[1]}")
+            if node is not None:
+                return node
+        return self._by_code.get(parts[0])
+
+    def count_by_code(self, grouped_counts):
+        """
+        把按分类号分组的文件数量汇总到分类树的每个分类。
+        :param grouped_counts: [(主分类号, 子分类号, 数量), ...]
+        :return: {类号: 数量}，一级分类为其下全部文件数量，没有文件的分类不包含在内
+        """
+        counts = {}
+        for main_num, sub_num, count in grouped_counts:
+            if main_num is None:
+                continue
+            main_code = str(main_num)
+            if main_code in self._by_code:
+                counts[main_code] = counts.get(main_code, 0) + count
+            sub_code = f"{main_num}-{sub_num}"
+            if sub_num is not None and sub_code in self._by_code:
+                counts[sub_code] = counts.get(sub_code, 0) + count
+        return counts
+
+    def sheet_name_for(self, class_code):
+        """
+        根据文件类号获取Excel目录中对应的sheet名。
+        有子分类的一级分类没有自己的sheet，此时返回 None。
+        """
+        node = self.find(class_code)
+        if node is None or node.children:
+            return None
+        return node.sheet_name
+
+
+_taxonomy = None
+_taxonomy_lock = threading.Lock()
+
+
+def get_taxonomy():
+    """获取当前使用的分类体系（未设置时为默认分类）"""
+    global _taxonomy
+    with _taxonomy_lock:
+        if _taxonomy is None:
+            _taxonomy = CategoryTaxonomy.default()
+        return _taxonomy
+
+
+def set_taxonomy(taxonomy):
+    """设置当前使用的分类体系（加载或导入分类后调用）"""
+    global _taxonomy
+    with _taxonomy_lock:
+        _taxonomy = taxonomy
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+搜索服务：在一个常驻进程中持有数据库、Excel目录缓存和输入提示索引，
+多个界面客户端通过 HTTP/JSON 共用，缓存在会话之间保持有效。
+
+用法:
+    python -m src.server [--host 127.0.0.1] [--port 8765] [--workers 8]
+
+客户端在用户设置中配置 "search_server_url": "http://127.0.0.1:8765" 即以瘦客户端方式运行。
+
+接口:
+    GET  /api/ping
+    GET  /api/search?name=姓名&id=编号[&pattern=4-1-%&pattern=4.1%]
+    GET  /api/duplicate_ids?name=姓名
+    GET  /api/category_counts?name=姓名&id=编号
+    GET  /api/suggest?field=name|id&prefix=前缀[&limit=10]
+    POST /api/file_details   {"files": [[文件名, 路径], ...]}
+"""
+
+import sys
+import json
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from src.config.logger import setup_logger
+from src.config.user_settings import load_user_settings
+from src.models.replica import open_database
+from src.models.taxonomy import CategoryTaxonomy, set_taxonomy
+from src.controllers.search_backend import LocalSearchBackend
+from src.controllers.search_suggestions import SearchSuggestions
+
+DEFAULT_PORT = 8765
+# 请求体大小上限
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """处理检索请求，backend 由服务器对象提供"""
+
+    # 客户端长时间不发送数据时断开，避免占用工作线程
+    timeout = 30
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        backend = self.server.backend
+
+        def param(name, default=''):
+            return params.get(name, [default])[0]
+
+        try:
+            if url.path == '/api/ping':
+                self._send_json({'status': 'ok'})
+            elif url.path == '/api/search':
+                files = backend.search_files(param('name') or None, param('id') or None, params.get('pattern'))
+                self._send_json({'files': files})
+            elif url.path == '/api/category_counts':
+                counts = backend.count_categories(param('name') or None, param('id') or None)
+                self._send_json({'counts': counts})
+            elif url.path == '/api/duplicate_ids':
+                self._send_json({'ids': backend.find_duplicate_ids(param('name'))})
+            elif url.path == '/api/suggest':
+                limit = min(int(param('limit', '10')), 100)
+                suggest = backend.suggest_file_ids if param('field') == 'id' else backend.suggest_names
+                self._send_json({'values': suggest(param('prefix'), limit)})
+            else:
+                self._send_json({'error': f"未知接口: {url.path}"}, status=404)
+        except Exception as e:
+            logging.error(f"处理请求失败: {self.path}, {str(e)}", exc_info=True)
+            self._send_json({'error': str(e)}, status=500)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length > MAX_BODY_SIZE:
+                self._send_json({'error': "请求过大"}, status=413)
+                return
+            body = json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+
+            if url.path == '/api/file_details':
+                files = [(file_name, file_path) for file_name, file_path in body.get('files', [])]
+                self._send_json(self.server.backend.get_file_details(files))
+            else:
+                self._send_json({'error': f"未知接口: {url.path}"}, status=404)
+        except Exception as e:
+            logging.error(f"处理请求失败: {self.path}, {str(e)}", exc_info=True)
+            self._send_json({'error': str(e)}, status=500)
+
+    def _send_json(self, data, status=200):
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} - {format % args}")
+
+
+class SearchServer(HTTPServer):
+    """
+    HTTP搜索服务：请求交给固定数量的工作线程处理。
+    工作线程一直存在，各自的数据库连接建立一次后持续复用，连接数量不随请求数增长。
+    """
+
+    # 默认工作线程数
+    WORKER_COUNT = 8
+
+    def __init__(self, address, backend, worker_count=WORKER_COUNT):
+        super().__init__(address, SearchRequestHandler)
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="SearchWorker")
+
+    def process_request(self, request, client_address):
+        """放入工作线程池处理（工作线程都忙时排队等待）"""
+        self._executor.submit(self._process_request_in_worker, request, client_address)
+
+    def _process_request_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_server(db, host='127.0.0.1', port=DEFAULT_PORT, import_root_dir=None,
+                  worker_count=SearchServer.WORKER_COUNT):
+    """
+    创建搜索服务（不启动）。
+    :param worker_count: 处理请求的工作线程数（即搜索服务使用的数据库连接数）
+    :return: SearchServer，调用 serve_forever() 开始处理请求
+    """
+    set_taxonomy(CategoryTaxonomy.from_db(db.conn.cursor()))
+    suggestions = SearchSuggestions(db)
+    suggestions.rebuild()
+    backend = LocalSearchBackend(db, suggestions, import_root_dir, per_thread_connections=True)
+    return SearchServer((host, port), backend, worker_count)
+
+
+def main(argv=None):
+    """搜索服务入口"""
+    parser = argparse.ArgumentParser(prog='python -m src.server', description='档案检索系统搜索服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认只允许本机访问）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='监听端口')
+    parser.add_argument('--workers', type=int, default=SearchServer.WORKER_COUNT,
+                        help='处理请求的工作线程数（每个线程使用一个数据库连接）')
+    parser.add_argument('--excel-root', help='Excel目录文件所在根目录，默认使用界面中设置的导入目录')
+    args = parser.parse_args(argv)
+    setup_logger()
+
+    settings = load_user_settings()
+    db = open_database(settings)
+    server = create_server(db, args.host, args.port, args.excel_root or settings.get('import_root_dir'),
+                           max(1, args.workers))
+    if args.host not in ('127.0.0.1', 'localhost'):
+        logging.warning("搜索服务没有访问控制，请只在可信网络中对外开放")
+    logging.info(f"搜索服务已启动: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("搜索服务已停止")
+    finally:
+        server.server_close()
+        db.conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import tkinter as tk
+
+
+class AutocompleteDropdown:
+    """
+    输入框下方的自动完成下拉列表。
+    按键停顿 delay 毫秒后才查询，上下键选择，回车/双击确认，Esc关闭。
+    """
+
+    def __init__(self, entry, variable, suggest, on_confirm=None, delay=150, max_items=10):
+        """
+        :param entry: 输入框
+        :param variable: 输入框绑定的 StringVar
+        :param suggest: suggest(prefix, limit) -> 候选列表
+        :param on_confirm: 选中候选后回调（例如直接搜索）
+        """
+        self.entry = entry
+        self.variable = variable
+        self.suggest = suggest
+        self.on_confirm = on_confirm
+        self.delay = delay
+        self.max_items = max_items
+        self._after_id = None
+        self._popup = None
+        self._listbox = None
+
+        entry.bind('<KeyRelease>', self._on_key_release, add='+')
+        entry.bind('<Down>', self._on_down, add='+')
+        entry.bind('<Up>', self._on_up, add='+')
+        entry.bind('<Return>', self._on_return, add='+')
+        entry.bind('<Escape>', lambda event: self.hide(), add='+')
+        entry.bind('<FocusOut>', lambda event: entry.after(100, self._hide_if_unfocused), add='+')
+
+    def _on_key_release(self, event):
+        if event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        # 去抖：连续输入时只在停顿后查询一次
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+        self._after_id = self.entry.after(self.delay, self._update)
+
+    def _update(self):
+        self._after_id = None
+        prefix = self.variable.get().strip()
+        suggestions = self.suggest(prefix, self.max_items) if prefix else []
+        # 已完整输入唯一候选时不再提示
+        if not suggestions or suggestions == [prefix]:
+            self.hide()
+            return
+        self._show(suggestions)
+
+    def _show(self, suggestions):
+        if self._popup is None:
+            self._popup = tk.Toplevel(self.entry)
+            self._popup.overrideredirect(True)
+            self._listbox = tk.Listbox(self._popup, exportselection=False, activestyle='none')
+            self._listbox.pack(fill=tk.BOTH, expand=True)
+            self._listbox.bind('<ButtonRelease-1>', lambda event: self._confirm())
+
+        self._listbox.delete(0, tk.END)
+        for value in suggestions:
+            self._listbox.insert(tk.END, value)
+        self._listbox.configure(height=len(suggestions))
+
+        x = self.entry.winfo_rootx()
+        y = self.entry.winfo_rooty() + self.entry.winfo_height()
+        width = max(self.entry.winfo_width(), 120)
+        self._popup.geometry(f"{width}x{self._listbox.winfo_reqheight()}+{x}+{y}")
+        self._popup.deiconify()
+        self._popup.lift()
+
+    def hide(self):
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+            self._after_id = None
+        if self._popup is not None:
+            self._popup.withdraw()
+
+    def _is_visible(self):
+        return self._popup is not None and self._popup.winfo_viewable()
+
+    def _hide_if_unfocused(self):
+        focus = self.entry.focus_get()
+        if focus is not self.entry and focus is not self._listbox:
+            self.hide()
+
+    def _move_selection(self, step):
+        if not self._is_visible():
+            return
+        size = self._listbox.size()
+        current = self._listbox.curselection()
+        index = (current[0] + step) % size if current else (0 if step > 0 else size - 1)
+        self._listbox.selection_clear(0, tk.END)
+        self._listbox.selection_set(index)
+        self._listbox.see(index)
+
+    def _on_down(self, event):
+        self._move_selection(1)
+        return 'break'
+
+    def _on_up(self, event):
+        self._move_selection(-1)
+        return 'break'
+
+    def _on_return(self, event):
+        if self._is_visible() and self._listbox.curselection():
+            self._confirm()
+            return 'break'
+        self.hide()
+
+    def _confirm(self):
+        selection = self._listbox.curselection()
+        if not selection:
+            return
+        self.variable.set(self._listbox.get(selection[0]))
+        self.entry.icursor(tk.END)
+        self.hide()
+        self.entry.focus_set()
+        if self.on_confirm:
+            self.on_confirm()
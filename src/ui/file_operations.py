@@ -6,7 +6,7 @@ import subprocess
 from tkinter import filedialog, messagebox
 import pandas as pd
 
-from utils.excel_utils import get_excel_info, ExcelFileNotFound
+from src.utils.excel_utils import get_excel_info, ExcelFileNotFound
 
 class FileOperationManager:
     """文件操作管理类，包含所有文件操作相关的功能"""
@@ -155,7 +155,7 @@ class FileOperationManager:
                     else:
                         file_id = ''
                         person_name = dir_name
-                    material_name, file_date, page_count = get_excel_info(self.import_root_dir, person_name, file_id, class_code)
+                    material_name, file_date, page_count = get_excel_info(self.import_root_dir, person_name, file_id, class_code, self.db)
                 except ExcelFileNotFound as e:
                     logging.warning(str(e))
                     material_name, file_date, page_count = '', '', ''
@@ -4,17 +4,56 @@ import logging
 import shutil
 import os
 from tkinter import filedialog, messagebox, simpledialog
-import pandas as pd
 import subprocess
 import sys
-import re
 import time
-import json
 import hashlib
+import queue
+import tempfile
+import threading
+import itertools
+from datetime import datetime
 
-from utils.excel_utils import get_excel_info, ExcelFileNotFound
+from src.models.replica import publish_snapshot
+from src.models.backup import create_backup, list_backups, prepare_restore, restore_backup, DEFAULT_KEEP_BACKUPS
+from src.utils.paths import get_backup_dir
+from src.models.taxonomy import CategoryTaxonomy, set_taxonomy
+from src.controllers.pdf_metadata import PdfMetadataExtractor
+from src.controllers.workbook_ingest import WorkbookIngestor
+from src.controllers.thumbnails import ThumbnailService
+from src.ui.pdf_preview import PdfPreviewPane
+from src.controllers.duplicate_finder import DuplicateFinder
+from src.controllers.file_manager import FileManager
+from src.config.user_settings import load_user_settings, save_user_settings
+from src.controllers.exporter import CatalogExporter, EXPORT_COLUMNS, get_default_export_path
+from src.controllers.archive_stats import iter_person_stats, get_category_counts
+from src.controllers.audit import ArchiveAuditor, AUDIT_FIELDS, AUDIT_HEADERS
+from src.controllers.maintenance import DatabaseMaintenance
+from src.controllers.access_log import AccessLog, ACCESS_LOG_FIELDS, ACCESS_LOG_HEADERS
+from src.controllers.archive_import import ArchiveImporter
+from src.controllers.import_preview import ImportPreview, PREVIEW_FIELDS, PREVIEW_HEADERS
+from src.controllers.folder_watcher import FolderWatcher
+from src.controllers.search_suggestions import SearchSuggestions
+from src.controllers.search_backend import LocalSearchBackend, RemoteSearchBackend
+from src.ui.autocomplete import AutocompleteDropdown
 
 class MainWindow:
+    # 仅管理员可用的工具菜单项
+    ADMIN_TOOLS = ("导入预览", "增量导入档案", "按文件清单导入", "清理数据库", "查找重复文件", "档案检查",
+                   "发布数据库快照", "备份数据库", "恢复数据库", "数据库维护", "访问记录", "导出全部档案目录")
+    # 需要写数据库的工具菜单项（只读副本中不可用）
+    WRITE_TOOLS = ("导入预览", "增量导入档案", "按文件清单导入", "清理数据库", "查找重复文件", "档案检查",
+                   "发布数据库快照", "恢复数据库", "数据库维护")
+    # 导入类菜单项（同一时间只允许一个导入，导入进行中时禁用）
+    IMPORT_TOOLS = ("导入预览", "增量导入档案", "按文件清单导入")
+    # 自动备份的间隔（秒）
+    AUTO_BACKUP_INTERVAL = 24 * 3600
+    # 无操作超过该时间（秒）视为空闲，开始数据库维护；空闲检查的间隔（毫秒）
+    MAINTENANCE_IDLE_SECONDS = 5 * 60
+    MAINTENANCE_CHECK_MS = 60 * 1000
+    # 导入预览窗口中最多显示的变化明细（完整明细见报告文件）
+    PREVIEW_MAX_ROWS = 5000
+
     def __init__(self, root, db=None, version="1.0"):
         self.root = root
         self.db = db
@@ -53,9 +92,11 @@ class MainWindow:
         
         logging.info(f"系统版本: {self.version}")
         
-        # 初始化文件列表和分类映射
-        self.all_files = []
-        self.category_mapping = {}
+        # 初始化文件列表和分类体系
+        self.files_count = 0
+        self.taxonomy = CategoryTaxonomy.default()
+        # 分类树节点 -> 类号
+        self.category_items = {}
         
         # 用户设置文件路径
         self.config_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config')
@@ -87,6 +128,47 @@ class MainWindow:
         # 工具菜单引用，用于权限控制
         self.tools_menu = None
         
+        # 后台PDF元数据提取器
+        self.pdf_extractor = PdfMetadataExtractor(self.db)
+        
+        # 后台Excel目录解析（解析结果入库，检索时不再逐个读取Excel）
+        self.workbook_ingestor = WorkbookIngestor(self.db)
+        
+        # 增量导入档案（按目录记录检查点，中断后可继续）
+        self.archive_importer = ArchiveImporter(self.db)
+        
+        # 数据库维护（空闲时回收空闲页、更新统计信息、检查完整性）
+        self.maintenance = DatabaseMaintenance(self.db)
+        self.last_activity = time.time()
+        # 正在执行的后台任务数（run_in_background 启动的导入、检查、备份等，只在界面线程中修改）
+        self.background_jobs = 0
+        
+        # 访问记录（搜索、打开文件先放入内存缓冲区，由后台线程批量写入）
+        self.access_log = AccessLog(self.db, self.settings.get('access_log_retention_days',
+                                                               AccessLog.DEFAULT_RETENTION_DAYS))
+        
+        # 缩略图服务（搜索后预取当前人员的PDF首页）
+        self.thumbnail_service = ThumbnailService()
+        
+        # 姓名、编号输入提示（启动后在后台建立索引）
+        self.search_suggestions = SearchSuggestions(self.db)
+        
+        # 检索后端：设置了搜索服务地址时以瘦客户端方式运行
+        server_url = self.settings.get('search_server_url')
+        if server_url:
+            logging.info(f"使用搜索服务: {server_url}")
+            self.search_backend = RemoteSearchBackend(server_url)
+        else:
+            self.search_backend = LocalSearchBackend(self.db, self.search_suggestions, self.import_root_dir)
+        
+        # 正在进行的导入（说明文字），没有导入时为 None
+        self.import_running = None
+        
+        # 档案目录监控（可选）
+        self.folder_watcher = None
+        self.watcher_restart_pending = False
+        self.watch_enabled_var = tk.BooleanVar(value=bool(self.settings.get('watch_import_dir')))
+        
         # 设置UI
         self.setup_ui()
         
@@ -106,6 +188,11 @@ class MainWindow:
         # 根据注册状态更新界面
         self.update_ui_by_registration()
         
+        # 记录用户操作时间，空闲时执行数据库维护
+        for sequence in ('<Key>', '<Button>', '<MouseWheel>'):
+            self.root.bind_all(sequence, self.on_user_activity, add='+')
+        self.root.after(self.MAINTENANCE_CHECK_MS, self.check_idle_maintenance)
+        
     def init_users_table(self):
         """初始化用户表"""
         try:
@@ -185,8 +272,9 @@ class MainWindow:
                 # 启用搜索按钮
                 if hasattr(self, 'search_button'):
                     self.search_button.config(state=tk.NORMAL)
-                # 启用导入文件按钮
-                self.import_file_btn.config(state=tk.NORMAL)
+                # 启用导入文件按钮（只读副本不能导入，导入进行中时不能再次导入）
+                self.import_file_btn.config(
+                    state=tk.DISABLED if self.db.read_only or self.import_running else tk.NORMAL)
             else:  # 未登录
                 # 禁用搜索按钮
                 if hasattr(self, 'search_button'):
@@ -195,12 +283,14 @@ class MainWindow:
                 self.import_file_btn.config(state=tk.DISABLED)
             
             # 管理员特有权限
-            if is_admin:
-                # 启用清理数据库菜单
-                self.tools_menu.entryconfigure("清理数据库", state=tk.NORMAL)
-            else:
-                # 禁用清理数据库菜单
-                self.tools_menu.entryconfigure("清理数据库", state=tk.DISABLED)
+            for label in self.ADMIN_TOOLS:
+                if (is_admin and not (self.db.read_only and label in self.WRITE_TOOLS)
+                        and not (self.import_running and label in self.IMPORT_TOOLS)):
+                    # 启用管理员菜单
+                    self.tools_menu.entryconfigure(label, state=tk.NORMAL)
+                else:
+                    # 禁用管理员菜单
+                    self.tools_menu.entryconfigure(label, state=tk.DISABLED)
 
     def setup_ui(self):
         """设置用户界面"""
@@ -260,8 +350,28 @@ class MainWindow:
         self.tools_menu.add_command(label="打开程序安装目录", command=self.open_install_directory)
         self.tools_menu.add_command(label="打开档案文件目录", command=self.open_archive_directory)
         self.tools_menu.add_command(label="打开数据库位置", command=self.open_database_location)
+        self.tools_menu.add_checkbutton(label="自动监控档案目录", variable=self.watch_enabled_var,
+                                        command=self.toggle_folder_watcher)
         self.tools_menu.add_separator()
+        self.tools_menu.add_command(label="导入预览", command=self.preview_import)
+        self.tools_menu.add_command(label="增量导入档案", command=self.import_archives)
+        self.tools_menu.add_command(label="停止增量导入", command=self.stop_archive_import, state=tk.DISABLED)
+        self.tools_menu.add_command(label="按文件清单导入", command=self.import_manifest)
         self.tools_menu.add_command(label="清理数据库", command=self.cleanup_database)
+        self.tools_menu.add_command(label="查找重复文件", command=self.find_duplicate_files)
+        self.tools_menu.add_command(label="档案检查", command=self.run_archive_audit)
+        self.tools_menu.add_command(label="发布数据库快照", command=self.publish_database_snapshot)
+        self.tools_menu.add_command(label="备份数据库", command=self.backup_database)
+        self.tools_menu.add_command(label="恢复数据库", command=self.restore_database)
+        self.tools_menu.add_command(label="数据库维护", command=self.run_database_maintenance)
+        self.tools_menu.add_command(label="访问记录", command=self.show_access_log)
+        self.tools_menu.add_separator()
+        self.tools_menu.add_command(label="批量查询", command=self.show_batch_lookup_dialog)
+        self.tools_menu.add_command(label="导出当前结果", command=self.export_current_results)
+        self.tools_menu.add_command(label="导出当前人员目录", command=self.export_person_catalog)
+        self.tools_menu.add_command(label="导出全部档案目录", command=self.export_archive_catalog)
+        self.tools_menu.add_separator()
+        self.tools_menu.add_command(label="档案统计", command=self.show_archive_statistics)
         
         # 用户管理菜单（初始时不显示，管理员登录后再添加）
         self.user_menu = tk.Menu(menubar, tearoff=0)
@@ -300,6 +410,8 @@ class MainWindow:
         self.search_name_var = tk.StringVar()
         name_entry = ttk.Entry(search_frame, textvariable=self.search_name_var, width=10)
         name_entry.pack(side=tk.LEFT, padx=(0, 10))
+        self.name_autocomplete = AutocompleteDropdown(name_entry, self.search_name_var,
+                                                      self.search_backend.suggest_names)
         
         # 编号搜索框
         id_label = ttk.Label(search_frame, text="编号:")
@@ -307,6 +419,8 @@ class MainWindow:
         self.search_id_var = tk.StringVar()
         id_entry = ttk.Entry(search_frame, textvariable=self.search_id_var, width=10)
         id_entry.pack(side=tk.LEFT, padx=(0, 10))
+        self.id_autocomplete = AutocompleteDropdown(id_entry, self.search_id_var,
+                                                    self.search_backend.suggest_file_ids)
         
         # 搜索按钮
         self.search_button = ttk.Button(search_frame, text="搜索", command=self.search_person)
@@ -377,9 +491,13 @@ class MainWindow:
         
     def setup_file_list(self):
         """设置文件列表"""
+        # 文件列表和预览面板左右分隔
+        self.right_paned = ttk.PanedWindow(self.right_frame, orient=tk.HORIZONTAL)
+        self.right_paned.pack(fill=tk.BOTH, expand=True)
+        
         # 创建文件列表框架
-        list_frame = ttk.Frame(self.right_frame)
-        list_frame.pack(fill=tk.BOTH, expand=True)
+        list_frame = ttk.Frame(self.right_paned)
+        self.right_paned.add(list_frame, weight=3)
         
         # 创建Treeview，添加新的列（编号、姓名、类号、材料名称、文件名、日期、页数）
         self.file_list = ttk.Treeview(
@@ -420,11 +538,25 @@ class MainWindow:
         
         # 绑定双击事件
         self.file_list.bind('<Double-1>', self.on_file_double_click)
+        
+        # 预览面板，选中文件时显示
+        self.preview_pane = PdfPreviewPane(self.right_paned)
+        self.right_paned.add(self.preview_pane, weight=2)
+        self.file_list.bind('<<TreeviewSelect>>', self.on_file_selected)
+
+    def on_file_selected(self, event):
+        """选中文件时在预览面板中显示"""
+        selected_items = self.file_list.selection()
+        if not selected_items:
+            return
+        file_path = str(self.file_list.item(selected_items[0])['values'][7])  # 第8列是路径
+        self.preview_pane.show_file(file_path, self.thumbnail_service.get_thumbnail(file_path))
 
     def update_file_list(self, files):
         """更新文件列表"""
-        # 清空现有列表
+        # 清空现有列表和预览
         self.file_list.delete(*self.file_list.get_children())
+        self.preview_pane.clear()
         
         logging.debug(f"要更新的文件列表数量: {len(files)}")
         if files:
@@ -432,67 +564,19 @@ class MainWindow:
             logging.debug(f"文件样本: {sample_files}")
         
         try:
-            # 筛选只显示PDF文件
-            pdf_files = []
-            for file_name, file_path in files:
-                # 将文件名转为小写进行判断
-                if file_name.lower().endswith('.pdf'):
-                    pdf_files.append((file_name, file_path))
-                    
-            logging.debug(f"筛选后的PDF文件数量: {len(pdf_files)}")
-            
-            # 插入新的文件记录
-            for file_name, file_path in pdf_files:
-                # 从文件路径中提取人名和文件夹名
-                dir_name = os.path.basename(os.path.dirname(file_path))
-                
-                # 提取编号 - 获取文件夹名中的数字前缀
-                # 正则表达式提取开头的连续数字
-                match = re.match(r'^(\d+)(.*)', dir_name)
-                file_id = ""
-                person_name = dir_name
-                
-                if match:
-                    file_id = match.group(1)
-                    # 处理姓名，去掉数字部分只保留人名
-                    person_name = match.group(2).strip()
-                
-                # 文件名就是类号（例如 3-1.pdf 的类号就是 3-1）
-                class_code = os.path.splitext(file_name)[0]
-                
-                logging.debug(f"处理文件: {file_name}, 类号: {class_code}, 编号: {file_id}, 人名: {person_name}, 目录名: {dir_name}")
-                
-                # 从Excel获取文件信息（材料名称、日期、页数）
-                try:
-                    # dir_name = 文件夹名（如 123张三），需分解为编号和姓名
-                    match = re.match(r'^(\d+)(.+)$', dir_name)
-                    if match:
-                        file_id = match.group(1)
-                        person_name = match.group(2).strip()
-                    else:
-                        file_id = ''
-                        person_name = dir_name
-                    material_name, file_date, page_count = get_excel_info(self.import_root_dir, person_name, file_id, class_code)
-                except ExcelFileNotFound as e:
-                    logging.warning(str(e))
-                    material_name, file_date, page_count = '', '', ''
-                    messagebox.showwarning("未找到Excel文件", str(e))
-                except Exception as e:
-                    logging.error(f"Excel信息读取失败: {str(e)}")
-                    material_name, file_date, page_count = '', '', ''
-                    messagebox.showerror("Excel读取错误", f"读取Excel信息时发生错误：{str(e)}")
-                
-                # 插入到列表
-                self.file_list.insert('', 'end', values=(
-                    file_id,
-                    person_name,
-                    class_code,
-                    material_name,
-                    file_name,
-                    file_date,
-                    page_count,
-                    file_path
-                ))
+            # Excel中的材料名称、日期、页数（瘦客户端模式下由搜索服务读取）
+            details = self.search_backend.get_file_details(files)
+            
+            # 插入到列表（列顺序与导出列一致）
+            for row in details['rows']:
+                self.file_list.insert('', 'end', values=[row.get(field, '') for field, _ in EXPORT_COLUMNS])
+            
+            # 同一提示只显示一次
+            for message in dict.fromkeys(details['warnings']):
+                logging.warning(message)
+                messagebox.showwarning("未找到Excel文件", message)
+            for message in dict.fromkeys(details['errors']):
+                messagebox.showerror("Excel读取错误", message)
                 
         except Exception as e:
             logging.error(f"更新文件列表失败: {str(e)}")
@@ -730,6 +814,8 @@ class MainWindow:
         self.current_search_id = None
         if hasattr(self, 'file_list'):
             self.file_list.delete(*self.file_list.get_children())
+            self.preview_pane.clear()
+            self.update_category_counts(show=False)
 
         # 更新菜单和权限
         self.update_menu_by_role(None)
@@ -904,140 +990,10 @@ class MainWindow:
                 return
             
             logging.info(f"开始导入分类文件: {file_path}")
-            
-            # 读取Excel文件的所有列
-            df = pd.read_excel(file_path, engine='openpyxl')
-            
-            # 清空现有分类
-            self.tree.delete(*self.tree.get_children())
-            self.db.cursor.execute('DELETE FROM categories')
-            
-            # 清空映射
-            self.category_mapping = {}
-            
-            # 中文数字映射
-            chinese_numbers = {
-                1: "一", 2: "二", 3: "三", 4: "四", 5: "五",
-                6: "六", 7: "七", 8: "八", 9: "九", 10: "十"
-            }
-            
-            # 用于存储一级分类节点的字典
-            parent_nodes = {}
-            
-            # 手动添加所有一级分类
-            all_main_categories = [
-                (1, "履历材料"),
-                (2, "自传材料"),
-                (3, "鉴定、考核材料"),
-                (4, "学历学位、职称、学术、培训等材料"),
-                (5, "政审材料"),
-                (6, "党团材料"),
-                (7, "奖励材料"),
-                (8, "处分材料"),
-                (9, "工资、任免、出国、会议等材料"),
-                (10, "其他材料")
-            ]
-            
-            # 创建一级分类
-            for main_num, category_name in all_main_categories:
-                # 添加中文数字前缀，使用中文顿号"、"
-                chinese_num = chinese_numbers.get(main_num, str(main_num))
-                display_text = f"{chinese_num}、{category_name}"
-                
-                # 创建树节点
-                node_id = self.tree.insert('', 'end', text=display_text)
-                parent_nodes[category_name] = node_id
-                
-                # 存入数据库
-                self.db.cursor.execute(
-                    'INSERT INTO categories (category, parent_category, main_category_num, sub_category_num) VALUES (?, ?, ?, ?)',
-                    (category_name, None, main_num, None)
-                )
-                
-                # 添加到映射
-                self.category_mapping[category_name] = str(main_num)
-                logging.debug(f"插入一级分类: {category_name}, 主分类号: {main_num}")
-            
-            # 第4类的二级分类
-            subcategories_4 = [
-                (4, 1, "学历学位材料"),
-                (4, 2, "专业技术职务材料"),
-                (4, 3, "科研学术材料"),
-                (4, 4, "培训材料")
-            ]
-            
-            # 第9类的二级分类
-            subcategories_9 = [
-                (9, 1, "工资材料"),
-                (9, 2, "任免材料"),
-                (9, 3, "出国（境）审批材料"),
-                (9, 4, "会议代表材料")
-            ]
-            
-            # 合并所有二级分类
-            all_subcategories = subcategories_4 + subcategories_9
-            
-            # 创建二级分类
-            for main_num, sub_num, subcat_name in all_subcategories:
-                # 查找父分类
-                parent_category = None
-                for name, code in self.category_mapping.items():
-                    if code == str(main_num) and not isinstance(name, tuple):
-                        parent_category = name
-                        break
-                
-                if parent_category and parent_category in parent_nodes:
-                    # 添加阿拉伯数字前缀，使用中文顿号"、"
-                    display_text = f"{sub_num}、{subcat_name}"
-                    
-                    # 创建树节点
-                    child_id = self.tree.insert(parent_nodes[parent_category], 'end', text=display_text)
-                    
-                    # 存入数据库
-                    self.db.cursor.execute(
-                        'INSERT INTO categories (category, parent_category, main_category_num, sub_category_num) VALUES (?, ?, ?, ?)',
-                        (subcat_name, parent_category, main_num, sub_num)
-                    )
-                    
-                    # 添加到映射
-                    key = (parent_category, subcat_name)
-                    value = f"{main_num}-{sub_num}"
-                    self.category_mapping[key] = value
-                    logging.debug(f"插入二级分类映射: {key} -> {value}")
-                else:
-                    logging.warning(f"找不到父分类(编码 {main_num})，无法创建二级分类: {subcat_name}")
-            
-            self.db.conn.commit()
-            
-            # 验证数据库中的记录并记录日志
-            self.db.cursor.execute('SELECT category, parent_category, main_category_num, sub_category_num FROM categories')
-            all_categories = self.db.cursor.fetchall()
-            logging.info(f"数据库中的分类记录: {len(all_categories)} 条")
-            
-            # 检查分类（输出到日志）
-            self.db.cursor.execute('SELECT category, main_category_num FROM categories WHERE parent_category IS NULL ORDER BY main_category_num')
-            main_categories = self.db.cursor.fetchall()
-            
-            logging.info(f"共导入 {len(main_categories)} 个一级分类:")
-            for cat, num in main_categories:
-                chinese_num = chinese_numbers.get(num, str(num))
-                logging.info(f"  一级分类: {chinese_num}、{cat}, 编码: {num}")
-                
-                # 检查其子分类
-                self.db.cursor.execute('SELECT category, sub_category_num FROM categories WHERE parent_category = ? ORDER BY sub_category_num', (cat,))
-                subcats = self.db.cursor.fetchall()
-                for subcat, subnum in subcats:
-                    logging.info(f"    子分类: {subnum}、{subcat}, 子编码: {num}-{subnum}")
-            
-            # 打印完整的映射字典
-            logging.debug("完整的分类映射字典:")
-            for k, v in self.category_mapping.items():
-                if isinstance(k, tuple):
-                    logging.debug(f"  二级分类: {k[0]} -> {k[1]} = {v}")
-                else:
-                    logging.debug(f"  一级分类: {k} = {v}")
-            
-            logging.info("分类导入完成")
+            self.taxonomy = FileManager.import_categories(file_path, self.db)
+            set_taxonomy(self.taxonomy)
+            self.populate_category_tree()
+            self.update_category_counts()
             messagebox.showinfo("成功", "分类导入成功！")
             
         except Exception as e:
@@ -1046,68 +1002,179 @@ class MainWindow:
 
     def import_files(self):
         """导入文件"""
+        # 选择文件夹，使用上次的路径作为初始目录
+        initial_dir = self.import_root_dir if self.import_root_dir and os.path.exists(self.import_root_dir) else None
+        folder_path = filedialog.askdirectory(title="选择人员档案文件夹", initialdir=initial_dir)
+        if folder_path:
+            self.start_import_files(folder_path)
+
+    def start_import_files(self, folder_path):
+        """保存导入目录并在后台全量导入"""
+        if not self.begin_import("导入文件"):
+            return
         try:
-            # 选择文件夹，使用上次的路径作为初始目录
-            initial_dir = self.import_root_dir if self.import_root_dir and os.path.exists(self.import_root_dir) else None
-            folder_path = filedialog.askdirectory(title="选择人员档案文件夹", initialdir=initial_dir)
-            if not folder_path:
-                return
-            
             # 保存导入目录
             self.import_root_dir = folder_path
+            self.search_backend.import_root_dir = folder_path
             logging.info(f"设置导入文件根目录: {self.import_root_dir}")
             
             # 保存设置
             self.save_settings()
+        except Exception as e:
+            self.end_import()
+            logging.error(f"导入文件失败: {str(e)}")
+            messagebox.showerror("错误", f"导入文件失败：{str(e)}")
+            return
+        
+        # 全量导入文件记录（后台写入影子表，完成后换入，导入期间仍可搜索原有记录）
+        def task():
+            conn = self.db.new_connection()
+            try:
+                return FileManager.import_files(self.db, folder_path, conn)
+            finally:
+                conn.close()
+        
+        self.run_in_background(task, self.on_files_imported, "正在导入文件", on_finish=self.end_import)
+
+    def preview_import(self):
+        """导入预览：比对重新导入目录后的变化（不修改数据），确认后再导入"""
+        initial_dir = self.import_root_dir if self.import_root_dir and os.path.exists(self.import_root_dir) else None
+        folder_path = filedialog.askdirectory(title="选择要预览导入的人员档案文件夹", initialdir=initial_dir)
+        if not folder_path:
+            return
+        preview = ImportPreview(self.db)
+
+        def task():
+            conn = self.db.new_connection()
+            try:
+                preview.scan_folder(folder_path, conn)
+                report_path, count = preview.write_report(conn)
+                changes = list(itertools.islice(preview.iter_changes(conn), self.PREVIEW_MAX_ROWS))
+                return report_path, count, changes
+            finally:
+                conn.close()
+
+        def on_success(result):
+            report_path, count, changes = result
+            self.show_import_preview(folder_path, preview.stats, report_path, count, changes)
+
+        self.run_in_background(task, on_success, "正在预览导入")
+
+    def show_import_preview(self, folder_path, stats, report_path, count, changes):
+        """显示导入预览的汇总和变化明细（按变化类型分组）"""
+        stats = dict(stats)
+        summary = (f"扫描 {stats.pop('scanned')} 个文件，未变化 {stats.pop('unchanged')} 个：" +
+                   "，".join(f"{description} {number}" for description, number in stats.items()))
+        self.search_result_var.set("导入预览完成")
+
+        window = tk.Toplevel(self.root)
+        window.title(f"导入预览 - {folder_path}")
+        window.geometry("1000x500")
+        detail_note = f"（只显示前 {len(changes)} 条）" if count > len(changes) else ""
+        ttk.Label(window, text=f"{summary}\n变化明细已保存: {report_path}{detail_note}", padding=5).pack(fill=tk.X)
+
+        def confirm_import():
+            if messagebox.askyesno("导入", f"确定重新导入以下目录吗？\n{folder_path}", parent=window):
+                window.destroy()
+                self.start_import_files(folder_path)
+
+        button_frame = ttk.Frame(window, padding=5)
+        button_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        ttk.Button(button_frame, text="导入此目录", command=confirm_import).pack(side=tk.RIGHT)
+        ttk.Button(button_frame, text="关闭", command=window.destroy).pack(side=tk.RIGHT, padx=5)
+
+        columns = PREVIEW_FIELDS[1:]
+        tree = ttk.Treeview(window, columns=columns, show='tree headings')
+        tree.heading('#0', text='变化')
+        tree.column('#0', width=150)
+        for field, heading in zip(columns, PREVIEW_HEADERS[1:]):
+            tree.heading(field, text=heading)
+            tree.column(field, width=250 if field.endswith('path') else 90)
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True)
+
+        groups = {}
+        for change in changes:
+            if change['change_type'] not in groups:
+                groups[change['change_type']] = tree.insert('', 'end', text=change['change_type'])
+            tree.insert(groups[change['change_type']], 'end', values=[change[field] for field in columns])
+        for change_type, group_id in groups.items():
+            tree.item(group_id, text=f"{change_type} ({stats.get(change_type, len(tree.get_children(group_id)))})")
+
+    def import_manifest(self):
+        """按文件服务器生成的文件清单全量导入（不遍历档案目录）"""
+        manifest_path = filedialog.askopenfilename(
+            title="选择文件清单",
+            filetypes=[("文件清单", "*.csv *.jsonl *.json"), ("All files", "*.*")]
+        )
+        if not manifest_path or not self.begin_import("按文件清单导入"):
+            return
+        
+        # 清单中的相对路径相对于清单文件所在目录
+        def task():
+            conn = self.db.new_connection()
+            try:
+                return FileManager.import_manifest(self.db, manifest_path, conn=conn)
+            finally:
+                conn.close()
+        
+        self.run_in_background(task, self.on_files_imported, "正在按文件清单导入", on_finish=self.end_import)
+
+    def begin_import(self, description):
+        """
+        开始导入：同一时间只允许一个导入（全量导入共用影子表），导入期间禁用导入按钮和菜单项，
+        并暂停目录监控（换表时监控写入的记录会丢失），导入结束后调用 end_import。
+        :param description: 导入的说明文字
+        :return: 是否可以开始导入
+        """
+        if self.import_running:
+            messagebox.showinfo("提示", f"{self.import_running}正在进行中，请完成后再导入")
+            return False
+        self.import_running = description
+        self.restart_folder_watcher()
+        self.import_file_btn.config(state=tk.DISABLED)
+        for label in self.IMPORT_TOOLS:
+            self.tools_menu.entryconfigure(label, state=tk.DISABLED)
+        return True
+
+    def end_import(self, restart_watcher=True):
+        """
+        导入结束（成功或失败）：恢复导入按钮和菜单项，重新启动目录监控（重新比对导入期间的变化）。
+        :param restart_watcher: 是否重新启动目录监控（调用方随后自行启动时传 False）
+        """
+        self.import_running = None
+        self.tools_menu.entryconfigure("停止增量导入", state=tk.DISABLED)
+        self.update_tools_permission(bool(self.current_user) and self.current_user[3] == 'admin')
+        if restart_watcher:
+            self.restart_folder_watcher()
+
+    def on_files_imported(self, imported_count):
+        """全量导入完成后：提示结果，启动后台提取和解析，刷新监控、输入提示和文件列表"""
+        try:
+            messagebox.showinfo("成功", f"文件导入成功，共导入 {imported_count} 个文件")
             
-            # 清空现有文件记录
-            self.db.cursor.execute('DELETE FROM person_files')
+            # 后台提取新导入PDF的页数和元数据，解析Excel目录
+            self.pdf_extractor.start()
+            if self.import_root_dir and os.path.isdir(self.import_root_dir):
+                self.workbook_ingestor.start(self.import_root_dir)
             
-            # 遍历文件夹
-            imported_count = 0
-            for root, _, files in os.walk(folder_path):
-                dir_name = os.path.basename(root)
-                
-                # 从目录名中提取编号和人名
-                # 正则表达式提取开头的连续数字作为编号
-                match = re.match(r'^(\d+)(.*)', dir_name)
-                file_id = ""
-                person_name = dir_name
-                
-                if match:
-                    file_id = match.group(1)
-                    # 处理姓名，去掉数字部分只保留人名
-                    person_name = match.group(2).strip()
-                
-                logging.debug(f"处理目录: {dir_name}, 编号: {file_id}, 人名: {person_name}")
-                
-                for file in files:
-                    if file.startswith('.') or file.startswith('~'):
-                        continue
-                    
-                    file_path = os.path.join(root, file)
-                    # 存储绝对路径，而不是相对路径
-                    abs_path = os.path.abspath(file_path)
-                    
-                    self.db.cursor.execute('''
-                        INSERT INTO person_files (person_name, file_name, file_path, dir_name, file_id)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (person_name, file, abs_path, dir_name, file_id))
-                    imported_count += 1
+            # 重新建立输入提示索引
+            self.search_suggestions.rebuild()
             
-            self.db.conn.commit()
-            messagebox.showinfo("成功", f"文件导入成功，共导入 {imported_count} 个文件")
+            # 发布模式下导入后自动发布快照
+            if self.settings.get('replica_mode') == 'publish' and self.settings.get('replica_dir'):
+                self.publish_database_snapshot()
             
             # 刷新文件列表
             self.search_person()
-            
         except Exception as e:
-            self.db.conn.rollback()
             logging.error(f"导入文件失败: {str(e)}")
             messagebox.showerror("错误", f"导入文件失败：{str(e)}")
 
     def import_archives(self):
-        """导入档案"""
+        """增量导入档案（每个子目录为一个人员），按目录提交检查点，中断后可从上次完成的目录继续"""
         try:
             # 使用上次的路径作为初始目录
             initial_dir = self.import_root_dir if self.import_root_dir and os.path.exists(self.import_root_dir) else os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'archives')
@@ -1116,84 +1183,58 @@ class MainWindow:
                 initialdir=initial_dir
             )
             
-            if not folder_path:
+            if not folder_path or not self.begin_import("增量导入档案"):
                 return
             
             # 保存导入目录
             self.import_root_dir = folder_path
+            self.search_backend.import_root_dir = folder_path
             logging.info(f"设置导入档案根目录: {self.import_root_dir}")
             
             # 保存设置
             self.save_settings()
             
-            # 先清理数据库中的重复记录
-            self.db.cursor.execute('''
-                DELETE FROM person_files 
-                WHERE rowid NOT IN (
-                    SELECT MIN(rowid)
-                    FROM person_files
-                    GROUP BY person_name, file_name, file_path
-                )
-            ''')
-            
-            # 遍历选择的目录
-            imported_count = 0
-            file_count = 0
-            for person_folder in os.listdir(folder_path):
-                person_path = os.path.join(folder_path, person_folder)
-                if os.path.isdir(person_path):
-                    person_name = person_folder  # 文件夹名即为人名
-                    
-                    # 在数据库中记录人员信息
-                    self.db.cursor.execute('''
-                        INSERT OR REPLACE INTO persons (name, folder_path)
-                        VALUES (?, ?)
-                    ''', (person_name, os.path.abspath(person_path)))
-                    
-                    # 记录该人下的所有文件
-                    for root, _, files in os.walk(person_path):
-                        for file in files:
-                            # 跳过临时文件和隐藏文件
-                            if file.startswith('~') or file.startswith('.'):
-                                continue
-                            
-                            file_path = os.path.join(root, file)
-                            abs_path = os.path.abspath(file_path)
-                            
-                            # 从目录名中提取编号和人名
-                            match = re.match(r'^(\d+)(.*)', person_folder)
-                            file_id = ""
-                            dir_name = person_folder
-                            
-                            if match:
-                                file_id = match.group(1)
-                                # 如果人名不是从目录名提取的，则保持原来的人名
-                                # person_name = match.group(2).strip()
-                            
-                            # 检查文件是否已存在
-                            self.db.cursor.execute('''
-                                SELECT COUNT(*) FROM person_files 
-                                WHERE person_name = ? AND file_name = ? AND file_path = ?
-                            ''', (person_name, file, abs_path))
-                            
-                            if self.db.cursor.fetchone()[0] == 0:
-                                self.db.cursor.execute('''
-                                    INSERT INTO person_files (person_name, file_name, file_path, dir_name, file_id)
-                                    VALUES (?, ?, ?, ?, ?)
-                                ''', (person_name, file, abs_path, dir_name, file_id))
-                                file_count += 1
-                        
-                    imported_count += 1
-            
-            self.db.conn.commit()
-            messagebox.showinfo("成功", f"成功导入 {imported_count} 个人员的档案，共 {file_count} 个文件！")
-            
-            # 刷新文件列表
-            self.search_person()
-            
+            # 同一目录有未完成的导入时询问是否继续
+            resume_run_id = None
+            unfinished = self.archive_importer.find_resumable_run(folder_path)
+            if unfinished:
+                if messagebox.askyesno("继续导入", f"该目录上次的导入未完成（已完成 {unfinished['done_count']}/"
+                                                   f"{unfinished['folder_count']} 个目录）。\n\n"
+                                                   "是否从上次完成的目录继续导入？\n选择「否」将重新开始导入。"):
+                    resume_run_id = unfinished['id']
         except Exception as e:
+            self.end_import()
             logging.error(f"导入档案失败: {str(e)}")
             messagebox.showerror("错误", f"导入失败：{str(e)}")
+            return
+        
+        def task():
+            self.archive_importer.run(folder_path, resume_run_id)
+            return self.archive_importer.stats
+        
+        def on_success(stats):
+            if stats['status'] == 'cancelled':
+                self.search_result_var.set("增量导入已停止")
+                messagebox.showinfo("已停止", f"增量导入已停止，已导入 {stats['imported']} 个人员的档案，"
+                                             f"共 {stats['files']} 个文件。\n再次导入该目录时可从停止处继续。")
+                self.search_suggestions.rebuild()
+                return
+            self.search_result_var.set("导入档案完成")
+            messagebox.showinfo("成功", f"成功导入 {stats['imported']} 个人员的档案，共 {stats['files']} 个文件！"
+                                + (f"\n（跳过上次已完成的 {stats['skipped']} 个目录）" if stats['skipped'] else ""))
+            self.search_suggestions.rebuild()
+            
+            # 刷新文件列表
+            self.search_person()
+        
+        self.tools_menu.entryconfigure("停止增量导入", state=tk.NORMAL)
+        self.run_in_background(task, on_success, "正在导入档案", on_finish=self.end_import)
+
+    def stop_archive_import(self):
+        """停止正在进行的增量导入（当前目录完成并提交后停止，之后可继续导入）"""
+        if self.archive_importer.is_running():
+            self.archive_importer.stop()
+            self.search_result_var.set("正在停止增量导入...")
 
     def search_person(self):
         """搜索人员档案（支持分类过滤）"""
@@ -1214,6 +1255,7 @@ class MainWindow:
                 self.current_search_name = None
                 self.current_search_id = None
                 self.has_searched = False
+                self.update_category_counts(show=False)
                 self.search_result_var.set("就绪")
                 messagebox.showinfo("提示", "请输入姓名或编号进行搜索")
                 return
@@ -1226,20 +1268,14 @@ class MainWindow:
             self.has_searched = True
             
             logging.info(f"执行搜索：姓名='{search_name}', 编号='{search_id}'")
+            self.record_access('search', search_name or None, search_id or None)
             # 直接执行搜索，不检查分类选择
             # 因为我们已经取消了分类选择，所以这里直接执行搜索逻辑
             
             # 如果只通过姓名搜索，检查是否有重名人员
             if search_name and not search_id:
                 # 获取所有不同的编号
-                self.db.cursor.execute('''
-                    SELECT DISTINCT file_id 
-                    FROM person_files 
-                    WHERE person_name = ?
-                    ORDER BY file_id
-                ''', (search_name,))
-                
-                id_list = [str(row[0]) for row in self.db.cursor.fetchall() if row[0]]
+                id_list = self.search_backend.find_duplicate_ids(search_name)
                 
                 if len(id_list) > 1:
                     # 设置重名标志
@@ -1255,43 +1291,23 @@ class MainWindow:
                     )
                     # 清空文件列表，等待用户输入编号
                     self.file_list.delete(*self.file_list.get_children())
+                    self.update_category_counts(show=False)
                     return
                 else:
                     # 如果没有重名，清除重名标志
                     self.has_duplicate_names = False
             
-            # 构建查询
-            query = '''
-                SELECT DISTINCT file_name, file_path 
-                FROM person_files 
-                WHERE 1=1
-            '''
-            params = []
-            
-            # 添加文件名过滤条件
-            query += ' AND file_name NOT LIKE ? AND file_name NOT LIKE ? AND file_name LIKE ?'
-            params.extend(['~%', '.%', '%.pdf'])
-            
-            # 添加人名过滤条件 - 使用完全匹配
-            if search_name:
-                query += ' AND person_name = ?'
-                params.append(search_name)
-            
-            # 添加编号过滤条件
-            if search_id:
-                query += ' AND file_id = ?'
-                params.append(search_id)
-            
-            query += ' ORDER BY file_name'
-            
-            logging.info(f"搜索查询SQL: {query}, 参数: {params}")
-            
             # 执行查询
-            self.db.cursor.execute(query, params)
-            files = self.db.cursor.fetchall()
+            files = self.search_backend.search_files(search_name or None, search_id or None)
             
-            # 更新文件列表显示
+            # 更新文件列表显示和各分类的文件数量
             self.update_file_list(files)
+            self.update_category_counts()
+            
+            # 后台预取当前人员PDF的缩略图（选中文件时先显示缩略图，再加载完整页面）
+            if files:
+                self.thumbnail_service.prefetch(file_path for _, file_path in files
+                                                if file_path.lower().endswith('.pdf'))
             
             # 更新状态栏显示搜索结果数量
             if files:
@@ -1337,180 +1353,49 @@ class MainWindow:
             logging.info("未进行搜索，不显示文件")
             return
 
-        selected_item = selected_items[0]
-        selected_text = self.tree.item(selected_item)['text']
-        parent_item = self.tree.parent(selected_item)
-        
-        # 从显示文本中提取原始分类名称（去除数字前缀）
-        # 例如：从"一、履历材料"提取"履历材料"
-        if '、' in selected_text:
-            category_name = selected_text.split('、', 1)[1]
-        else:
-            category_name = selected_text
-        
+        category = self.taxonomy.get(self.category_items.get(selected_items[0]))
+        if category is None:
+            return
+
         try:
-            if parent_item:  # 二级分类
-                parent_text = self.tree.item(parent_item)['text']
-                
-                # 从父分类显示文本中提取原始名称
-                if '、' in parent_text:
-                    parent_category_name = parent_text.split('、', 1)[1]
-                else:
-                    parent_category_name = parent_text
-                
-                category_key = (parent_category_name, category_name)
-                category_code = self.category_mapping.get(category_key)
-                
-                logging.debug(f"二级分类选择: {parent_category_name} -> {category_name}")
-                logging.debug(f"二级分类编码: {category_code}")
-                
-                if category_code:
-                    # 构建查询，精确匹配分类代码-开头
-                    query = '''
-                        SELECT DISTINCT file_name, file_path 
-                        FROM person_files 
-                        WHERE (
-                            file_name LIKE ? OR    -- 精确的分类代码-开头 (4-1-%)
-                            file_name LIKE ?       -- 点号分隔的格式 (4.1.%)
-                        )
-                        AND file_name NOT LIKE '~%'
-                        AND file_name NOT LIKE '.%'
-                        AND file_name LIKE '%.pdf'
-                    '''
-                    # 两种模式匹配: 标准格式(4-1-%)和点分格式(4.1.%)
-                    params = [f'{category_code}-%', f'{category_code.replace("-", ".")}%']
-                    
-                    # 检查是否有搜索条件
-                    if not (hasattr(self, 'current_search_name') and self.current_search_name):
-                        # 清空文件列表
-                        self.file_list.delete(*self.file_list.get_children())
-                        self.search_result_var.set("请先输入姓名进行搜索")
-                        return
-                    
-                    # 检查是否有重名但未输入编号的情况
-                    if hasattr(self, 'has_duplicate_names') and self.has_duplicate_names and \
-                       not (hasattr(self, 'current_search_id') and self.current_search_id):
-                        # 清空文件列表
-                        self.file_list.delete(*self.file_list.get_children())
-                        self.search_result_var.set("发现重名，请输入编号后重试")
-                        return
-                        
-                    # 添加人名过滤条件
-                    query += ' AND person_name = ?'
-                    params.append(self.current_search_name)
-                    
-                    # 如果有编号，添加编号过滤条件
-                    if hasattr(self, 'current_search_id') and self.current_search_id:
-                        query += ' AND file_id = ?'
-                        params.append(self.current_search_id)
-                    
-                    query += ' ORDER BY file_name'
-                    
-                    logging.debug(f"二级分类查询: {query}, 参数: {params}")
-                    
-                    self.db.cursor.execute(query, params)
-                    files = self.db.cursor.fetchall()
-                    
-                    # 记录查询结果
-                    logging.debug(f"二级分类查询结果数量: {len(files)}")
-                    if len(files) > 0:
-                        logging.debug(f"第一个结果: {files[0]}")
-                    
-                    self.update_file_list(files)
-                    
-                    # 更新状态栏显示搜索结果数量
-                    self.search_result_var.set(f"搜索结果: {len(files)} 个文件")
-                    
-                    logging.info(f"二级分类查询: {category_code}, 找到文件数量: {len(files)}")
-                else:
-                    logging.warning(f"未找到分类编码: {category_key}")
-            else:  # 一级分类
-                category_code = self.category_mapping.get(category_name)
-                
-                logging.debug(f"一级分类选择: {category_name}")
-                logging.debug(f"一级分类编码: {category_code}")
-                
-                if category_code:
-                    # 检查是否有子分类
-                    self.db.cursor.execute('''
-                        SELECT COUNT(*) 
-                        FROM categories 
-                        WHERE parent_category = ?
-                    ''', (category_name,))
-                    
-                    has_subcategories = self.db.cursor.fetchone()[0] > 0
-                    
-                    if has_subcategories:
-                        # 如果有子分类，不显示任何文件
-                        self.file_list.delete(*self.file_list.get_children())
-                        logging.info(f"一级分类有子分类，不显示文件")
-                    else:
-                        # 构建查询，精确匹配分类代码-开头
-                        query = '''
-                            SELECT DISTINCT file_name, file_path 
-                            FROM person_files 
-                            WHERE (
-                                file_name LIKE ? OR    -- 精确的分类代码-开头 (4-%)
-                                file_name LIKE ?       -- 点号分隔的格式 (4.%)
-                            )
-                            AND file_name NOT LIKE '~%'
-                            AND file_name NOT LIKE '.%'
-                            AND file_name LIKE '%.pdf'
-                        '''
-                        params = [f'{category_code}-%', f'{category_code}.%']
-                        
-                        # 检查是否有搜索条件
-                        if not (hasattr(self, 'current_search_name') and self.current_search_name):
-                            # 清空文件列表
-                            self.file_list.delete(*self.file_list.get_children())
-                            self.search_result_var.set("请先输入姓名进行搜索")
-                            return
-                        
-                        # 检查是否有重名但未输入编号的情况
-                        if hasattr(self, 'has_duplicate_names') and self.has_duplicate_names and \
-                           not (hasattr(self, 'current_search_id') and self.current_search_id):
-                            # 清空文件列表
-                            self.file_list.delete(*self.file_list.get_children())
-                            self.search_result_var.set("发现重名，请输入编号后重试")
-                            return
-                            
-                        # 添加人名过滤条件
-                        query += ' AND person_name = ?'
-                        params.append(self.current_search_name)
-                        
-                        # 如果有编号，添加编号过滤条件
-                        if hasattr(self, 'current_search_id') and self.current_search_id:
-                            query += ' AND file_id = ?'
-                            params.append(self.current_search_id)
-                        
-                        query += ' ORDER BY file_name'
-                        
-                        logging.debug(f"一级分类查询: {query}, 参数: {params}")
-                        
-                        self.db.cursor.execute(query, params)
-                        files = self.db.cursor.fetchall()
-                        
-                        # 记录查询结果
-                        logging.debug(f"一级分类查询结果数量: {len(files)}")
-                        if len(files) > 0:
-                            logging.debug(f"第一个结果: {files[0]}")
-                            
-                        self.update_file_list(files)
-                        
-                        logging.info(f"一级分类查询: {category_code}, 找到文件数量: {len(files)}")
-                
+            # 有子分类的一级分类不显示文件
+            if category.children:
+                self.file_list.delete(*self.file_list.get_children())
+                logging.info(f"一级分类有子分类，不显示文件")
+                return
+
+            # 检查是否有搜索条件
+            if not (hasattr(self, 'current_search_name') and self.current_search_name):
+                # 清空文件列表
+                self.file_list.delete(*self.file_list.get_children())
+                self.search_result_var.set("请先输入姓名进行搜索")
+                return
+
+            # 检查是否有重名但未输入编号的情况
+            if hasattr(self, 'has_duplicate_names') and self.has_duplicate_names and \
+               not (hasattr(self, 'current_search_id') and self.current_search_id):
+                # 清空文件列表
+                self.file_list.delete(*self.file_list.get_children())
+                self.search_result_var.set("发现重名，请输入编号后重试")
+                return
+
+            # 按人名（和编号）分页查询
+            files = self.search_backend.search_files(self.current_search_name,
+                                                     getattr(self, 'current_search_id', None), category.name_patterns)
+            self.update_file_list(files)
+
+            # 更新状态栏显示搜索结果数量
+            self.search_result_var.set(f"搜索结果: {len(files)} 个文件")
+
+            logging.info(f"分类查询: {category.code} {category.name}, 找到文件数量: {len(files)}")
+
         except Exception as e:
             logging.error(f"分类查询失败: {str(e)}", exc_info=True)
             messagebox.showerror("错误", f"获取分类文件失败：{str(e)}")
 
     def update_category_tree(self):
         """更新分类树显示"""
-        self.tree.delete(*self.tree.get_children())  # 清空现有分类
-        # 从数据库获取分类
-        self.db.cursor.execute('SELECT category FROM categories')
-        categories = self.db.cursor.fetchall()
-        for category in categories:
-            self.tree.insert('', 'end', text=category[0])
+        self.load_categories_from_db()
     
     def on_file_double_click(self, event):
         """处理文件双击事件"""
@@ -1531,29 +1416,96 @@ class MainWindow:
             
             # 打开文件
             logging.debug(f"打开文件: {file_path}")
+            values = self.file_list.item(item)['values']
+            self.record_access('open', str(values[1]) or None, str(values[0]) or None, file_path,
+                               detail=str(values[2]) or None)
             if sys.platform == 'win32':
                 os.startfile(file_path)
             elif sys.platform == 'darwin':  # macOS
-                subprocess.run(['open', file_path])
-            else:  # linux
-                subprocess.run(['xdg-open', file_path])
+                subprocess.Popen(['open', file_path])
+            else:  # linux，不等待查看器退出，避免界面卡住
+                subprocess.Popen(['xdg-open', file_path])
             
         except Exception as e:
             error_msg = f"打开文件失败：{str(e)}"
             logging.error(error_msg)
             messagebox.showerror("错误", error_msg)
 
+    def record_access(self, action, person_name=None, file_id=None, file_path=None, detail=None):
+        """记录当前用户的访问（只放入缓冲区，不影响界面响应）"""
+        user_name = self.current_user[1] if self.current_user else None
+        self.access_log.record(action, user_name, person_name, file_id, file_path, detail)
+
+    def show_access_log(self):
+        """按用户、姓名、编号和日期查询访问记录"""
+        window = tk.Toplevel(self.root)
+        window.title("访问记录")
+        window.geometry("1000x500")
+
+        filter_frame = ttk.Frame(window, padding=5)
+        filter_frame.pack(fill=tk.X)
+        filter_vars = {}
+        for key, label in (('user_name', "用户"), ('person_name', "姓名"), ('file_id', "编号"),
+                           ('start_date', "开始日期"), ('end_date', "结束日期")):
+            ttk.Label(filter_frame, text=label).pack(side=tk.LEFT)
+            filter_vars[key] = tk.StringVar()
+            ttk.Entry(filter_frame, textvariable=filter_vars[key], width=12).pack(side=tk.LEFT, padx=(2, 8))
+
+        status_var = tk.StringVar()
+        ttk.Label(window, textvariable=status_var, padding=(5, 0)).pack(fill=tk.X)
+
+        frame = ttk.Frame(window)
+        frame.pack(fill=tk.BOTH, expand=True)
+        tree = ttk.Treeview(frame, columns=ACCESS_LOG_FIELDS, show='headings')
+        for field, heading, width in zip(ACCESS_LOG_FIELDS, ACCESS_LOG_HEADERS, (140, 80, 70, 80, 80, 400, 80)):
+            tree.heading(field, text=heading)
+            tree.column(field, width=width)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True)
+
+        def parse_date(text, next_day=False):
+            if not text:
+                return None
+            day = datetime.strptime(text, '%Y-%m-%d')
+            return day.timestamp() + (24 * 3600 if next_day else 0)
+
+        def query():
+            try:
+                rows = self.access_log.query(
+                    user_name=filter_vars['user_name'].get().strip() or None,
+                    person_name=filter_vars['person_name'].get().strip() or None,
+                    file_id=filter_vars['file_id'].get().strip() or None,
+                    start_time=parse_date(filter_vars['start_date'].get().strip()),
+                    end_time=parse_date(filter_vars['end_date'].get().strip(), next_day=True),
+                )
+            except ValueError:
+                messagebox.showerror("错误", "日期格式应为 YYYY-MM-DD", parent=window)
+                return
+            except Exception as e:
+                logging.error(f"查询访问记录失败: {str(e)}", exc_info=True)
+                messagebox.showerror("错误", f"查询访问记录失败：{str(e)}", parent=window)
+                return
+            tree.delete(*tree.get_children())
+            for row in rows:
+                tree.insert('', 'end', values=[row[field] for field in ACCESS_LOG_FIELDS])
+            status_var.set(f"共 {len(rows)} 条记录（最近几秒内的访问可能尚未写入）")
+
+        ttk.Button(filter_frame, text="查询", command=query).pack(side=tk.LEFT)
+        query()
+
     def load_files_from_db(self):
-        """从数据库加载所有文件"""
+        """
+        统计数据库中的文件记录。
+        文件列表在搜索、导出时通过 Database.iter_person_files 按需分页读取，不再一次性加载全部记录。
+        """
         try:
-            self.db.cursor.execute('''
-                SELECT file_name, file_path 
-                FROM person_files
-            ''')
-            self.all_files = self.db.cursor.fetchall()
+            self.db.cursor.execute('SELECT COUNT(*) FROM person_files')
+            self.files_count = self.db.cursor.fetchone()[0]
         except Exception as e:
             logging.error(f"加载文件失败: {str(e)}")
-            self.all_files = []
+            self.files_count = 0
 
     def open_install_directory(self):
         """打开程序安装目录"""
@@ -1615,29 +1567,636 @@ class MainWindow:
     def cleanup_database(self):
         """清理数据库中的重复记录和无效记录"""
         try:
-            # 删除重复记录
-            self.db.cursor.execute('''
-                DELETE FROM person_files 
-                WHERE rowid NOT IN (
-                    SELECT MIN(rowid)
-                    FROM person_files
-                    GROUP BY person_name, file_name, file_path
-                )
-            ''')
-            
-            # 删除不存在的文件记录
-            self.db.cursor.execute('SELECT file_path FROM person_files')
-            for (file_path,) in self.db.cursor.fetchall():
-                if not os.path.exists(file_path):
-                    self.db.cursor.execute('DELETE FROM person_files WHERE file_path = ?', (file_path,))
-            
-            self.db.conn.commit()
-            messagebox.showinfo("成功", "数据库清理完成！")
+            duplicate_count, missing_count = FileManager.cleanup_database(self.db)
+            messagebox.showinfo("成功", f"数据库清理完成！\n删除重复记录 {duplicate_count} 条，无效记录 {missing_count} 条")
             
         except Exception as e:
             logging.error(f"数据库清理失败: {str(e)}")
             messagebox.showerror("错误", f"清理失败：{str(e)}")
 
+    def run_in_background(self, task, on_success, busy_text, on_finish=None):
+        """
+        在后台线程中执行耗时任务，完成后在界面线程中回调。
+        :param task: 后台执行的函数（不能操作界面）
+        :param on_success: 成功后的回调，参数为task的返回值
+        :param busy_text: 执行期间状态栏显示的文字
+        :param on_finish: 任务结束（成功或失败）后、on_success 之前的回调，无参数
+        """
+        results = queue.Queue()
+        
+        def worker():
+            try:
+                results.put((True, task()))
+            except Exception as e:
+                logging.error(f"{busy_text}失败: {str(e)}", exc_info=True)
+                results.put((False, e))
+        
+        def poll():
+            try:
+                success, value = results.get_nowait()
+            except queue.Empty:
+                self.root.after(200, poll)
+                return
+            self.background_jobs -= 1
+            if on_finish is not None:
+                on_finish()
+            if success:
+                on_success(value)
+            else:
+                self.search_result_var.set("就绪")
+                messagebox.showerror("错误", f"{busy_text}失败：{str(value)}")
+        
+        self.search_result_var.set(f"{busy_text}...")
+        self.background_jobs += 1
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(200, poll)
+
+    def find_duplicate_files(self):
+        """按内容查找重复文件并生成报告"""
+        finder = DuplicateFinder(self.db)
+        
+        def task():
+            groups = finder.find_duplicates()
+            report_path = finder.write_report(groups) if groups else None
+            return groups, report_path
+        
+        self.run_in_background(task, lambda result: self.show_duplicate_report(*result, finder.stats), "正在查找重复文件")
+
+    def show_duplicate_report(self, groups, report_path, stats):
+        """显示重复文件报告"""
+        summary = (f"共检查 {stats['total_files']} 个文件，发现 {len(groups)} 组重复文件，"
+                   f"读取 {stats['bytes_read'] / 1024 / 1024:.1f} MB / {stats['total_bytes'] / 1024 / 1024:.1f} MB")
+        self.search_result_var.set(summary)
+        if not groups:
+            messagebox.showinfo("重复文件", summary)
+            return
+        
+        report_window = tk.Toplevel(self.root)
+        report_window.title("重复文件报告")
+        report_window.geometry("900x500")
+        
+        ttk.Label(report_window, text=f"{summary}\n报告已保存: {report_path}", padding=5).pack(fill=tk.X)
+        
+        tree = ttk.Treeview(report_window, columns=('person', 'file_id', 'size', 'path'), show='tree headings')
+        tree.heading('#0', text='重复组')
+        tree.heading('person', text='姓名')
+        tree.heading('file_id', text='编号')
+        tree.heading('size', text='大小')
+        tree.heading('path', text='路径')
+        tree.column('#0', width=80)
+        tree.column('person', width=100)
+        tree.column('file_id', width=80)
+        tree.column('size', width=80)
+        tree.column('path', width=500)
+        scrollbar = ttk.Scrollbar(report_window, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        for index, group in enumerate(groups, 1):
+            group_id = tree.insert('', 'end', text=f"第 {index} 组", open=True)
+            for dir_name, person_name, file_id, file_path in group['files']:
+                tree.insert(group_id, 'end', values=(person_name, file_id, group['file_size'], file_path))
+
+    def show_archive_statistics(self):
+        """显示档案统计（读取统计表，不扫描文件表）"""
+        try:
+            stats = self.db.get_archive_stats()
+        except Exception as e:
+            logging.error(f"读取档案统计失败: {str(e)}", exc_info=True)
+            messagebox.showerror("错误", f"读取档案统计失败：{str(e)}")
+            return
+
+        summary = stats['summary']
+        window = tk.Toplevel(self.root)
+        window.title("档案统计")
+        window.geometry("900x500")
+        ttk.Label(window, padding=5, text=(
+            f"共 {summary['persons']} 人，{summary['files']} 个文件，"
+            f"{summary['pdfs']} 个PDF文件，{summary['pages']} 页"
+        )).pack(fill=tk.X)
+
+        notebook = ttk.Notebook(window)
+        notebook.pack(fill=tk.BOTH, expand=True)
+
+        def add_tree(title, columns, show='headings'):
+            frame = ttk.Frame(notebook)
+            notebook.add(frame, text=title)
+            tree = ttk.Treeview(frame, columns=[key for key, _, _ in columns], show=show)
+            for key, heading, width in columns:
+                tree.heading(key, text=heading)
+                tree.column(key, width=width)
+            scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+            tree.configure(yscrollcommand=scrollbar.set)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            tree.pack(fill=tk.BOTH, expand=True)
+            return tree
+
+        # 各分类的PDF文件数量
+        category_tree = add_tree("分类统计", [('count', '文件数', 100)], show='tree headings')
+        category_tree.heading('#0', text='分类')
+        category_tree.column('#0', width=400)
+        counts = get_category_counts(stats, self.taxonomy)
+        for root in self.taxonomy.roots:
+            node_id = category_tree.insert('', 'end', text=root.display_text, open=True,
+                                           values=(counts.get(root.code, 0),))
+            for child in root.children:
+                category_tree.insert(node_id, 'end', text=child.display_text, values=(counts.get(child.code, 0),))
+
+        # 每人的文件数量、页数和最近修改时间，不完整的档案单独列出
+        person_columns = [
+            ('file_id', '编号', 80), ('person_name', '姓名', 100), ('file_count', '文件数', 70),
+            ('pdf_count', 'PDF数', 70), ('page_total', '页数', 70), ('last_modified', '最近修改', 130),
+            ('status', '问题', 250),
+        ]
+        person_tree = add_tree("人员统计", person_columns)
+        incomplete_tree = add_tree("不完整档案", person_columns)
+        incomplete_count = 0
+        for row in iter_person_stats(stats):
+            values = [row[key] for key, _, _ in person_columns]
+            person_tree.insert('', 'end', values=values)
+            if row['status']:
+                incomplete_tree.insert('', 'end', values=values)
+                incomplete_count += 1
+        notebook.tab(2, text=f"不完整档案 ({incomplete_count})")
+
+    def run_archive_audit(self):
+        """后台检查全部档案的PDF文件与Excel目录是否一致，完成后显示报告"""
+        if not self.import_root_dir or not os.path.isdir(self.import_root_dir):
+            messagebox.showinfo("提示", "请先设置导入目录")
+            return
+        auditor = ArchiveAuditor(self.db)
+        import_root_dir = self.import_root_dir
+
+        def task():
+            run_id = auditor.run(import_root_dir)
+            conn = self.db.new_connection()
+            try:
+                return auditor.write_report(run_id, conn=conn)
+            finally:
+                conn.close()
+
+        def on_success(result):
+            report_path, count = result
+            self.show_audit_report(auditor, report_path, count)
+
+        self.run_in_background(task, on_success, "正在检查档案")
+
+    def show_audit_report(self, auditor, report_path, count):
+        """显示档案检查报告（按问题类型分组）"""
+        summary = f"档案检查完成，发现 {count} 个问题" + (
+            "：" + "，".join(f"{issue_type} {number}" for issue_type, number in auditor.stats.items()) if count else "")
+        self.search_result_var.set(summary)
+        if not count:
+            messagebox.showinfo("档案检查", summary)
+            return
+
+        report_window = tk.Toplevel(self.root)
+        report_window.title("档案检查报告")
+        report_window.geometry("1000x500")
+        ttk.Label(report_window, text=f"{summary}\n报告已保存: {report_path}", padding=5).pack(fill=tk.X)
+
+        columns = AUDIT_FIELDS[1:]
+        tree = ttk.Treeview(report_window, columns=columns, show='tree headings')
+        tree.heading('#0', text='问题')
+        tree.column('#0', width=200)
+        for field, heading in zip(columns, AUDIT_HEADERS[1:]):
+            tree.heading(field, text=heading)
+            tree.column(field, width=300 if field.endswith('path') else 90)
+        scrollbar = ttk.Scrollbar(report_window, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True)
+
+        groups = {}
+        for issue in auditor.iter_issues():
+            if issue['issue_type'] not in groups:
+                groups[issue['issue_type']] = tree.insert('', 'end', text=issue['issue_type'])
+            tree.insert(groups[issue['issue_type']], 'end', values=[issue[field] for field in columns])
+        for issue_type, group_id in groups.items():
+            tree.item(group_id, text=f"{issue_type} ({len(tree.get_children(group_id))})")
+
+    def ask_export_path(self, prefix):
+        """选择导出文件路径，默认位于导出目录"""
+        default_path = get_default_export_path(prefix)
+        return filedialog.asksaveasfilename(
+            title="导出",
+            initialdir=os.path.dirname(default_path),
+            initialfile=os.path.basename(default_path),
+            defaultextension='.xlsx',
+            filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv")]
+        )
+
+    def export_current_results(self):
+        """导出文件列表中当前显示的结果"""
+        items = self.file_list.get_children()
+        if not items:
+            messagebox.showinfo("提示", "当前没有可导出的结果")
+            return
+        output_path = self.ask_export_path("检索结果")
+        if not output_path:
+            return
+        
+        # 文件列表的列顺序与导出列一致
+        columns = self.file_list['columns']
+        rows = (
+            {field: self.file_list.set(item, column) for (field, _), column in zip(EXPORT_COLUMNS, columns)}
+            for item in items
+        )
+        try:
+            count = CatalogExporter(self.db).export_rows(rows, output_path)
+            messagebox.showinfo("导出成功", f"已导出 {count} 条记录到：\n{output_path}")
+        except Exception as e:
+            logging.error(f"导出失败: {str(e)}", exc_info=True)
+            messagebox.showerror("错误", f"导出失败：{str(e)}")
+
+    def export_person_catalog(self):
+        """导出当前搜索人员的完整档案目录"""
+        if not self.current_search_name and not self.current_search_id:
+            messagebox.showinfo("提示", "请先搜索人员")
+            return
+        output_path = self.ask_export_path(f"档案目录_{self.current_search_name or self.current_search_id}")
+        if output_path:
+            self._export_catalog_in_background(output_path, self.current_search_name, self.current_search_id)
+
+    def export_archive_catalog(self):
+        """导出全部档案目录"""
+        output_path = self.ask_export_path("全部档案目录")
+        if output_path:
+            self._export_catalog_in_background(output_path)
+
+    def _export_catalog_in_background(self, output_path, person_name=None, file_id=None):
+        """在后台线程中流式导出档案目录"""
+        exporter = CatalogExporter(self.db, self.import_root_dir)
+        
+        def task():
+            conn = self.db.new_connection()
+            try:
+                return exporter.export_catalog(output_path, person_name, file_id, conn=conn)
+            finally:
+                conn.close()
+        
+        def on_success(count):
+            self.search_result_var.set(f"已导出 {count} 条记录")
+            messagebox.showinfo("导出成功", f"已导出 {count} 条记录到：\n{output_path}")
+        
+        self.run_in_background(task, on_success, "正在导出档案目录")
+
+    def show_batch_lookup_dialog(self):
+        """批量查询对话框：粘贴编号或姓名列表"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("批量查询")
+        dialog.geometry("420x420")
+        dialog.transient(self.root)
+        
+        ttk.Label(dialog, text="粘贴编号或姓名（每行一个，或用逗号、空格分隔）：", padding=5).pack(fill=tk.X)
+        
+        text_frame = ttk.Frame(dialog)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=5)
+        text = tk.Text(text_frame, wrap=tk.WORD, height=15)
+        scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=text.yview)
+        text.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        text.focus_set()
+        
+        def run(export):
+            tokens = FileManager.parse_lookup_tokens(text.get('1.0', tk.END))
+            if not tokens:
+                messagebox.showinfo("提示", "请输入编号或姓名", parent=dialog)
+                return
+            output_path = None
+            if export:
+                output_path = self.ask_export_path("批量查询结果")
+                if not output_path:
+                    return
+            dialog.destroy()
+            self.run_batch_lookup(tokens, output_path)
+        
+        button_frame = ttk.Frame(dialog, padding=5)
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="查询", command=lambda: run(False)).pack(side=tk.RIGHT, padx=(5, 0))
+        ttk.Button(button_frame, text="查询并导出", command=lambda: run(True)).pack(side=tk.RIGHT)
+
+    def run_batch_lookup(self, tokens, output_path=None):
+        """
+        在后台执行批量查询，结果分批显示到文件列表，或直接导出到文件。
+        :param tokens: 编号/姓名列表
+        :param output_path: 导出文件路径，为None时显示到文件列表
+        """
+        exporter = CatalogExporter(self.db, self.import_root_dir)
+        messages = queue.Queue()
+        
+        def worker():
+            conn = self.db.new_connection()
+            try:
+                rows, duplicate_names, unmatched = FileManager.batch_lookup(self.db, tokens, conn=conn)
+                messages.put(('summary', (duplicate_names, unmatched)))
+                rows = exporter.enrich_rows(rows, conn)
+                if output_path:
+                    messages.put(('done', exporter.export_rows(rows, output_path)))
+                    return
+                count = 0
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= 200:
+                        messages.put(('rows', batch))
+                        count += len(batch)
+                        batch = []
+                messages.put(('rows', batch))
+                messages.put(('done', count + len(batch)))
+            except Exception as e:
+                logging.error(f"批量查询失败: {str(e)}", exc_info=True)
+                messages.put(('error', e))
+            finally:
+                conn.close()
+        
+        summary = {}
+        
+        def poll():
+            while True:
+                try:
+                    kind, value = messages.get_nowait()
+                except queue.Empty:
+                    self.root.after(100, poll)
+                    return
+                if kind == 'summary':
+                    summary['duplicate_names'], summary['unmatched'] = value
+                elif kind == 'rows':
+                    for row in value:
+                        self.file_list.insert('', 'end', values=[row.get(field, '') for field, _ in EXPORT_COLUMNS])
+                    self.search_result_var.set(f"正在批量查询... 已找到 {len(self.file_list.get_children())} 个文件")
+                elif kind == 'error':
+                    self.search_result_var.set("批量查询失败")
+                    messagebox.showerror("错误", f"批量查询失败：{str(value)}")
+                    return
+                else:
+                    self.show_batch_lookup_summary(len(tokens), value, output_path, **summary)
+                    return
+        
+        if not output_path:
+            # 批量结果不对应单个人员
+            self.file_list.delete(*self.file_list.get_children())
+            self.preview_pane.clear()
+            self.current_search_name = None
+            self.current_search_id = None
+            self.has_searched = True
+        self.search_result_var.set("正在批量查询...")
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(100, poll)
+
+    def show_batch_lookup_summary(self, token_count, file_count, output_path, duplicate_names, unmatched):
+        """汇总显示批量查询结果（重名、未匹配一次性提示）"""
+        result_text = f"批量查询 {token_count} 个，找到 {file_count} 个文件"
+        self.search_result_var.set(result_text)
+        
+        lines = [result_text]
+        if output_path:
+            lines.append(f"已导出到：{output_path}")
+        if duplicate_names:
+            lines.append(f"\n{len(duplicate_names)} 个姓名存在重名（已包含全部编号的文件）：")
+            lines.extend(f"  {name}: {', '.join(id_list)}" for name, id_list in duplicate_names.items())
+        if unmatched:
+            lines.append(f"\n{len(unmatched)} 个未找到：")
+            lines.append("  " + ", ".join(unmatched))
+        messagebox.showinfo("批量查询结果", "\n".join(lines))
+
+    def publish_database_snapshot(self):
+        """发布数据库快照到发布目录，供其他电脑同步只读副本"""
+        publish_dir = self.settings.get('replica_dir')
+        if not publish_dir:
+            publish_dir = filedialog.askdirectory(title="选择数据库快照发布目录")
+            if not publish_dir:
+                return
+            self.settings['replica_dir'] = publish_dir
+            self.save_settings()
+        
+        def task():
+            conn = self.db.new_connection()
+            try:
+                return publish_snapshot(self.db, publish_dir, conn=conn)
+            finally:
+                conn.close()
+        
+        def on_success(manifest):
+            self.search_result_var.set(f"已发布数据库快照，版本 {manifest['version']}")
+        
+        self.run_in_background(task, on_success, "正在发布数据库快照")
+
+    def backup_database(self, silent=False):
+        """
+        在后台在线备份数据库到备份目录（分步复制，不影响界面使用）。
+        :param silent: 自动备份时不弹出提示
+        """
+        backup_dir = get_backup_dir(self.settings)
+        keep = self.settings.get('backup_keep', DEFAULT_KEEP_BACKUPS)
+
+        def task():
+            conn = self.db.new_connection()
+            try:
+                return create_backup(conn, backup_dir, keep=keep)
+            finally:
+                conn.close()
+
+        def on_success(info):
+            self.search_result_var.set(f"数据库已备份: {os.path.basename(info['path'])}")
+            if not silent:
+                messagebox.showinfo("备份成功", f"数据库已备份到：\n{info['path']}")
+
+        self.run_in_background(task, on_success, "正在备份数据库")
+
+    def auto_backup_database(self):
+        """启动时检查：距上次备份超过间隔时自动备份（可在设置中用 auto_backup: false 关闭）"""
+        if self.db.read_only or not self.settings.get('auto_backup', True):
+            return
+        try:
+            backups = [backup for backup in list_backups(get_backup_dir(self.settings))
+                       if not backup['name'].startswith('before_restore_')]
+        except Exception as e:
+            logging.warning(f"读取备份目录失败: {str(e)}")
+            return
+        if backups and time.time() - backups[0]['created_at'].timestamp() < self.AUTO_BACKUP_INTERVAL:
+            return
+        logging.info("开始自动备份数据库")
+        self.backup_database(silent=True)
+
+    # 恢复数据库前等待后台任务停止的最长时间（秒）
+    RESTORE_STOP_TIMEOUT = 30
+
+    def restore_database(self):
+        """从备份恢复数据库：后台校验、解压、检查完整性并写回当前数据库，完成后重新加载数据"""
+        # 导入、档案检查等任务无法中途停止，进行中时不能恢复（恢复后它们会写入或换入恢复前的数据）
+        if self.background_jobs > 0 or self.import_running is not None:
+            messagebox.showinfo("提示", "有导入或其他后台任务正在进行，请完成后再恢复数据库")
+            return
+        backup_path = filedialog.askopenfilename(
+            title="选择数据库备份",
+            initialdir=get_backup_dir(self.settings),
+            filetypes=[("数据库备份", "*.db.gz"), ("数据库文件", "*.db"), ("All files", "*.*")]
+        )
+        if not backup_path:
+            return
+        if not messagebox.askyesno("恢复数据库", f"确定用以下备份替换当前数据库吗？\n{backup_path}\n\n"
+                                                  "恢复前会自动备份当前数据库。"):
+            return
+        # 恢复期间不允许开始导入
+        if not self.begin_import("恢复数据库"):
+            return
+
+        # 恢复期间停止后台写入
+        self.shutdown()
+        backup_dir = get_backup_dir(self.settings)
+        stoppable_workers = [self.pdf_extractor, self.workbook_ingestor, self.maintenance,
+                             self.archive_importer, self.access_log]
+        if self.folder_watcher is not None:
+            stoppable_workers.append(self.folder_watcher)
+
+        def task():
+            # 等待已请求停止的后台任务结束
+            deadline = time.time() + self.RESTORE_STOP_TIMEOUT
+            while any(worker.is_running() for worker in stoppable_workers):
+                if time.time() > deadline:
+                    raise RuntimeError("后台任务未能及时停止，请稍后再试")
+                time.sleep(0.2)
+
+            work_dir = tempfile.mkdtemp(dir=os.path.dirname(self.db.db_path))
+            conn = None
+            try:
+                restored_path = prepare_restore(backup_path, work_dir)
+                conn = self.db.new_connection()
+                return restore_backup(self.db, backup_path, backup_dir, restored_path, conn=conn)
+            finally:
+                if conn is not None:
+                    conn.close()
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        def on_finish():
+            # 无论恢复是否成功，都补齐表和列、重新加载数据，并重新启动停止的后台任务
+            try:
+                self.db.ensure_schema()
+            except Exception as e:
+                logging.error(f"检查数据库表结构失败: {str(e)}", exc_info=True)
+            self.end_import(restart_watcher=False)
+            self.file_list.delete(*self.file_list.get_children())
+            self.has_searched = False
+            # 重新启动目录监控、PDF元数据提取、访问记录写入等
+            self.init_data()
+
+        def on_success(safety_backup):
+            self.search_result_var.set("数据库已恢复")
+            messagebox.showinfo("恢复成功", f"数据库已恢复。\n恢复前的数据库已备份到：\n{safety_backup['path']}")
+
+        self.run_in_background(task, on_success, "正在恢复数据库", on_finish=on_finish)
+
+    def on_user_activity(self, event=None):
+        """记录最近一次用户操作的时间"""
+        self.last_activity = time.time()
+
+    def check_idle_maintenance(self):
+        """定期检查：界面空闲且没有其他后台写入时，执行到期的数据库维护"""
+        try:
+            if (not self.db.read_only
+                    and time.time() - self.last_activity >= self.MAINTENANCE_IDLE_SECONDS
+                    and not self.has_background_writers()):
+                self.maintenance.start()
+        except Exception as e:
+            logging.error(f"启动数据库维护失败: {str(e)}", exc_info=True)
+        finally:
+            self.root.after(self.MAINTENANCE_CHECK_MS, self.check_idle_maintenance)
+
+    def has_background_writers(self):
+        """是否有写数据库的后台任务在进行（有时不执行空闲维护，避免与其争用写锁）"""
+        return (self.background_jobs > 0
+                or self.import_running is not None
+                or self.pdf_extractor.is_running()
+                or self.workbook_ingestor.is_running()
+                or self.archive_importer.is_running()
+                or (self.folder_watcher is not None and self.folder_watcher.syncing))
+
+    def run_database_maintenance(self):
+        """立即执行全部数据库维护任务，完成后显示本次结果和最近的维护记录"""
+        if self.maintenance.is_running():
+            messagebox.showinfo("提示", "数据库维护正在后台进行，请稍后再试")
+            return
+
+        def task():
+            return self.maintenance.run(force=True)
+
+        def on_success(results):
+            lines = [f"{task_name}: {result}，用时 {duration:.1f} 秒" for task_name, result, duration in results]
+            page_count, freelist_count = DatabaseMaintenance.get_fragmentation(self.db.conn)
+            lines.append(f"\n当前数据库: {page_count} 页，空闲页 {freelist_count}")
+            history = self.maintenance.get_history(limit=10)
+            if history:
+                lines.append("\n最近的维护记录:")
+                for task_name, started_at, duration, _, free_before, _, free_after, result in history:
+                    started = datetime.fromtimestamp(started_at).strftime('%Y-%m-%d %H:%M')
+                    lines.append(f"{started} {task_name} {result}（{duration:.1f} 秒，空闲页 {free_before} -> {free_after}）")
+            self.search_result_var.set("数据库维护完成")
+            messagebox.showinfo("数据库维护", "\n".join(lines))
+
+        self.run_in_background(task, on_success, "正在维护数据库")
+
+    def toggle_folder_watcher(self):
+        """切换档案目录自动监控"""
+        self.settings['watch_import_dir'] = self.watch_enabled_var.get()
+        self.save_settings()
+        self.restart_folder_watcher()
+
+    def restart_folder_watcher(self):
+        """按设置启动或停止档案目录监控"""
+        if self.watcher_restart_pending:
+            # 正在等待上一个监控线程结束，结束后按当时的设置启动
+            return
+        if self.folder_watcher is not None:
+            if not self.folder_watcher.stop():
+                # 上一个监控线程还在比对目录，结束后再启动，避免两个监控同时写入重复记录
+                self.watcher_restart_pending = True
+                self.root.after(1000, self.wait_folder_watcher_stopped)
+                return
+            self.folder_watcher = None
+        
+        # 导入期间不启动监控，导入结束后由 end_import 重新启动
+        if not self.watch_enabled_var.get() or self.db.read_only or self.import_running:
+            return
+        if not self.import_root_dir or not os.path.isdir(self.import_root_dir):
+            logging.warning("档案目录未设置或不存在，无法启动监控")
+            return
+        
+        self.folder_watcher = FolderWatcher(self.db, self.import_root_dir)
+        self.folder_watcher.add_listener(self.on_folder_changed)
+        self.folder_watcher.start()
+
+    def wait_folder_watcher_stopped(self):
+        """等待已停止的监控线程结束，然后按设置重新启动监控"""
+        if self.folder_watcher is not None and self.folder_watcher.is_running():
+            self.root.after(1000, self.wait_folder_watcher_stopped)
+            return
+        self.folder_watcher = None
+        self.watcher_restart_pending = False
+        self.restart_folder_watcher()
+
+    def on_folder_changed(self, added_rows, removed_paths):
+        """目录监控发现变化后的处理（在监控线程中调用，不能操作界面）"""
+        self.search_suggestions.add_rows(added_rows)
+        added_pdfs = [row[2] for row in added_rows if row[1].lower().endswith('.pdf')]
+        if added_pdfs:
+            self.pdf_extractor.start(added_pdfs)
+        changed_paths = [row[2] for row in added_rows] + list(removed_paths)
+        if any(path.lower().endswith('.xlsx') for path in changed_paths):
+            self.workbook_ingestor.start(self.import_root_dir)
+
+    def shutdown(self):
+        """程序退出前停止后台任务"""
+        self.pdf_extractor.stop()
+        self.workbook_ingestor.stop()
+        self.maintenance.stop()
+        self.archive_importer.stop()
+        self.access_log.stop()
+        if self.folder_watcher is not None:
+            self.folder_watcher.stop()
+
     def init_data(self):
         """初始化数据：加载分类树和文件列表"""
         try:
@@ -1654,132 +2213,86 @@ class MainWindow:
                 self.load_files_from_db()
                 logging.info(f"从数据库加载了 {files_count} 条文件记录")
                 
+                # 后台检查新增或变化的PDF（只读副本中由发布机提取）
+                if not self.db.read_only:
+                    self.pdf_extractor.start()
+                    if self.import_root_dir and os.path.isdir(self.import_root_dir):
+                        self.workbook_ingestor.start(self.import_root_dir)
+            
+            if self.db.read_only:
+                self.search_result_var.set("使用只读数据库副本")
+            
+            # 启动档案目录监控（如已开启）
+            self.restart_folder_watcher()
+
+            # 访问记录的后台写入
+            self.access_log.start()
+
+            # 定期自动备份
+            self.root.after(2000, self.auto_backup_database)
+            
+            # 界面显示后再建立输入提示索引，不影响启动速度（瘦客户端使用搜索服务的索引）
+            if isinstance(self.search_backend, LocalSearchBackend):
+                self.root.after(500, self.search_suggestions.rebuild)
+                
         except Exception as e:
             logging.error(f"初始化数据失败: {str(e)}", exc_info=True)
             messagebox.showerror("错误", f"初始化数据失败：{str(e)}")
 
     def load_categories_from_db(self):
-        """加载分类树并构建映射（不依赖数据库，直接在代码中写死）"""
+        """从分类表加载分类体系（分类表为空时使用默认分类）并显示分类树"""
         try:
-            # 清空现有树和映射
-            self.tree.delete(*self.tree.get_children())
-            self.category_mapping = {}
-            
-            # 中文数字映射
-            chinese_numbers = {
-                1: "一", 2: "二", 3: "三", 4: "四", 5: "五",
-                6: "六", 7: "七", 8: "八", 9: "九", 10: "十"
-            }
-            
-            # 手动定义所有一级分类
-            all_main_categories = [
-                (1, "履历材料"),
-                (2, "自传材料"),
-                (3, "鉴定、考核材料"),
-                (4, "学历学位、职称、学术、培训等材料"),
-                (5, "政审材料"),
-                (6, "党团材料"),
-                (7, "奖励材料"),
-                (8, "处分材料"),
-                (9, "工资、任免、出国、会议等材料"),
-                (10, "其他材料")
-            ]
-            
-            # 创建一级分类节点和映射
-            parent_nodes = {}
-            for main_num, category in all_main_categories:
-                # 添加中文数字前缀，使用中文顿号"、"
-                chinese_num = chinese_numbers.get(main_num, str(main_num))
-                display_text = f"{chinese_num}、{category}"
-                
-                # 创建树节点
-                node_id = self.tree.insert('', 'end', text=display_text)
-                parent_nodes[category] = node_id
-                
-                # 添加一级分类映射
-                self.category_mapping[category] = str(main_num)
-                logging.debug(f"添加一级分类映射: {category} -> {main_num}")
-            
-            # 手动定义第4类的二级分类
-            subcategories_4 = [
-                (4, 1, "学历学位材料"),
-                (4, 2, "专业技术职务材料"),
-                (4, 3, "科研学术材料"),
-                (4, 4, "培训材料")
-            ]
-            
-            # 手动定义第9类的二级分类
-            subcategories_9 = [
-                (9, 1, "工资材料"),
-                (9, 2, "任免材料"),
-                (9, 3, "出国（境）审批材料"),
-                (9, 4, "会议代表材料")
-            ]
-            
-            # 合并所有二级分类
-            all_subcategories = subcategories_4 + subcategories_9
-            
-            # 创建二级分类节点和映射
-            for main_num, sub_num, category in all_subcategories:
-                # 查找父分类
-                parent_category = None
-                for name, code in self.category_mapping.items():
-                    if code == str(main_num) and not isinstance(name, tuple):
-                        parent_category = name
-                        break
-                
-                if parent_category and parent_category in parent_nodes:
-                    # 添加阿拉伯数字前缀，使用中文顿号"、"
-                    display_text = f"{sub_num}、{category}"
-                    
-                    # 创建树节点
-                    child_id = self.tree.insert(parent_nodes[parent_category], 'end', text=display_text)
-                    
-                    # 添加二级分类映射
-                    key = (parent_category, category)
-                    value = f"{main_num}-{sub_num}"
-                    self.category_mapping[key] = value
-                    logging.debug(f"添加二级分类映射: {key} -> {value}")
-            
-            # 打印完整的映射字典
-            logging.debug("完整的分类映射字典:")
-            for k, v in self.category_mapping.items():
-                if isinstance(k, tuple):
-                    logging.debug(f"  二级分类: {k[0]} -> {k[1]} = {v}")
-                else:
-                    logging.debug(f"  一级分类: {k} = {v}")
-                
+            self.taxonomy = CategoryTaxonomy.from_db(self.db.cursor)
         except Exception as e:
-            logging.error(f"加载分类树失败: {str(e)}", exc_info=True)
-            # 如果出错，不抛出异常，只记录日志
-            pass
+            logging.error(f"加载分类失败，使用默认分类: {str(e)}", exc_info=True)
+            self.taxonomy = CategoryTaxonomy.default()
+        set_taxonomy(self.taxonomy)
+        self.populate_category_tree()
+
+    def populate_category_tree(self):
+        """按当前分类体系重建分类树，并记录树节点到类号的映射"""
+        self.tree.delete(*self.tree.get_children())
+        self.category_items = {}
+        for root in self.taxonomy.roots:
+            node_id = self.tree.insert('', 'end', text=root.display_text)
+            self.category_items[node_id] = root.code
+            for child in root.children:
+                child_id = self.tree.insert(node_id, 'end', text=child.display_text)
+                self.category_items[child_id] = child.code
+        logging.debug(f"分类树已加载: {len(self.taxonomy.roots)} 个一级分类，共 {len(self.taxonomy)} 个分类")
+
+    def update_category_counts(self, show=True):
+        """
+        在分类树节点后显示当前搜索人员各分类的文件数量（一次分组查询），没有文件的分类显示为灰色。
+        :param show: False 时清除数量显示（清空搜索、退出登录、发现重名时）
+        """
+        counts = None
+        if show and (getattr(self, 'current_search_name', None) or getattr(self, 'current_search_id', None)):
+            try:
+                counts = self.taxonomy.count_by_code(
+                    self.search_backend.count_categories(self.current_search_name, self.current_search_id))
+            except Exception as e:
+                # 统计失败（例如旧版本的只读副本缺少分类号列）不影响搜索
+                logging.warning(f"统计分类文件数量失败: {str(e)}")
+
+        self.tree.tag_configure('empty', foreground='gray')
+        for item_id, code in self.category_items.items():
+            category = self.taxonomy.get(code)
+            if counts is None:
+                self.tree.item(item_id, text=category.display_text, tags=())
+            else:
+                count = counts.get(code, 0)
+                self.tree.item(item_id, text=f"{category.display_text} ({count})",
+                               tags=() if count else ('empty',))
             
     def load_settings(self):
         """加载用户设置"""
-        if os.path.exists(self.settings_file):
-            try:
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                logging.info(f"成功加载用户设置: {settings}")
-                return settings
-            except Exception as e:
-                logging.error(f"加载用户设置失败: {str(e)}")
-                return {}
-        else:
-            logging.info("未找到用户设置文件，将使用默认设置")
-            return {}
+        return load_user_settings(self.settings_file)
     
     def save_settings(self):
-        """保存用户设置"""
-        try:
-            settings = {
-                'import_root_dir': self.import_root_dir
-            }
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False, indent=2)
-            logging.info(f"成功保存用户设置: {settings}")
-        except Exception as e:
-            logging.error(f"保存用户设置失败: {str(e)}")
+        """保存用户设置（保留其他设置项）"""
+        self.settings['import_root_dir'] = self.import_root_dir
+        save_user_settings(self.settings, self.settings_file)
 
     def show_change_password_dialog(self):
         """显示修改密码对话框"""
@@ -0,0 +1,290 @@
+import os
+import bisect
+import logging
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+class _PageRenderer(threading.Thread):
+    """后台渲染线程：独占打开的PDF文档，按请求渲染页面"""
+
+    def __init__(self, results):
+        super().__init__(name="PdfPreviewRenderer", daemon=True)
+        self.requests = queue.Queue()
+        self.results = results
+        # 当前需要的页面（界面线程更新），不再需要的请求直接跳过
+        self.wanted = set()
+        self.wanted_lock = threading.Lock()
+        self._doc = None
+        self._generation = None
+
+    def run(self):
+        while True:
+            command = self.requests.get()
+            if command is None:
+                break
+            try:
+                if command[0] == 'open':
+                    self._open(*command[1:])
+                elif command[0] == 'render':
+                    self._render(*command[1:])
+            except Exception as e:
+                logging.error(f"PDF预览渲染失败: {str(e)}")
+                self.results.put(('error', command[1], str(e)))
+        self._close()
+
+    def _close(self):
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    def _open(self, generation, file_path):
+        self._close()
+        self._generation = generation
+        self._doc = fitz.open(file_path)
+        # 只读取页面尺寸，不渲染内容
+        sizes = [(page.rect.width, page.rect.height) for page in self._doc]
+        self.results.put(('opened', generation, sizes))
+
+    def _render(self, generation, page_no, zoom):
+        if generation != self._generation or self._doc is None:
+            return
+        with self.wanted_lock:
+            if (generation, page_no) not in self.wanted:
+                return
+        pixmap = self._doc.load_page(page_no).get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        self.results.put(('page', generation, page_no, zoom, pixmap.tobytes("ppm")))
+
+
+class PdfPreviewPane(ttk.Frame):
+    """PDF预览面板：只渲染可见页面，缓存最近使用的页面图像"""
+
+    # 页面之间的间距（像素）
+    PAGE_GAP = 8
+    # 最多缓存的页面图像数量
+    CACHE_SIZE = 12
+    # 可见区域上下额外预渲染的页数
+    PRELOAD_PAGES = 1
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.file_path = None
+        self._generation = 0
+        self._page_sizes = []
+        self._page_offsets = []
+        self._zoom = 1.0
+        self._images = OrderedDict()     # page_no -> PhotoImage（LRU）
+        self._image_items = {}           # page_no -> canvas item id
+        self._requested = set()
+        self._relayout_job = None
+        self._results = queue.Queue()
+        self._renderer = None
+        self._thumbnail = None
+
+        # 标题栏
+        self.title_var = tk.StringVar(value="未选择文件")
+        ttk.Label(self, textvariable=self.title_var, anchor=tk.W).pack(side=tk.TOP, fill=tk.X, padx=2, pady=2)
+
+        # 画布和滚动条
+        canvas_frame = ttk.Frame(self)
+        canvas_frame.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(canvas_frame, background='#808080', highlightthickness=0)
+        scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # 绑定事件
+        self.canvas.bind('<Configure>', self._on_configure)
+        self.canvas.bind('<MouseWheel>', self._on_mousewheel)
+        self.canvas.bind('<Button-4>', lambda e: self._scroll(-3))
+        self.canvas.bind('<Button-5>', lambda e: self._scroll(3))
+
+        if fitz is None:
+            self.title_var.set("未安装PyMuPDF，无法预览")
+            return
+
+        self._renderer = _PageRenderer(self._results)
+        self._renderer.start()
+        self.after(30, self._poll_results)
+
+    def show_file(self, file_path, thumbnail_path=None):
+        """
+        预览指定的PDF文件。
+        :param thumbnail_path: 已缓存的首页缩略图，文档加载完成前先显示
+        """
+        if self._renderer is None or file_path == self.file_path:
+            return
+        self.clear()
+        self.file_path = file_path
+        if not file_path or not file_path.lower().endswith('.pdf') or not os.path.exists(file_path):
+            self.title_var.set("无法预览该文件")
+            return
+        self.title_var.set(f"{os.path.basename(file_path)}（加载中...）")
+        if thumbnail_path:
+            self._show_thumbnail(thumbnail_path)
+        self._renderer.requests.put(('open', self._generation, file_path))
+
+    def _show_thumbnail(self, thumbnail_path):
+        """显示首页缩略图（排版时被清除）"""
+        try:
+            self._thumbnail = tk.PhotoImage(file=thumbnail_path)
+        except tk.TclError as e:
+            logging.debug(f"读取缩略图失败: {thumbnail_path}, {str(e)}")
+            return
+        x = max((self.canvas.winfo_width() - self._thumbnail.width()) / 2, 0)
+        self.canvas.create_image(x, self.PAGE_GAP, image=self._thumbnail, anchor=tk.NW)
+
+    def clear(self):
+        """清空预览"""
+        self._generation += 1
+        self.file_path = None
+        self._page_sizes = []
+        self._page_offsets = []
+        self._reset_images()
+        self._thumbnail = None
+        self.canvas.delete('all')
+        self.canvas.configure(scrollregion=(0, 0, 0, 0))
+        self.title_var.set("未选择文件")
+
+    def destroy(self):
+        if self._renderer is not None:
+            self._renderer.requests.put(None)
+        super().destroy()
+
+    def _reset_images(self):
+        """释放所有已渲染的页面"""
+        self._images.clear()
+        self._image_items.clear()
+        self._requested.clear()
+        if self._renderer is not None:
+            with self._renderer.wanted_lock:
+                self._renderer.wanted.clear()
+
+    def _layout(self):
+        """根据画布宽度计算每页的缩放比例和位置，并绘制占位框"""
+        self.canvas.delete('all')
+        self._thumbnail = None
+        self._reset_images()
+        self._page_offsets = []
+        if not self._page_sizes:
+            return
+
+        canvas_width = max(self.canvas.winfo_width(), 100)
+        max_page_width = max(width for width, _ in self._page_sizes)
+        self._zoom = (canvas_width - 2 * self.PAGE_GAP) / max_page_width
+
+        y = self.PAGE_GAP
+        for page_no, (width, height) in enumerate(self._page_sizes):
+            self._page_offsets.append(y)
+            page_width = width * self._zoom
+            page_height = height * self._zoom
+            x = (canvas_width - page_width) / 2
+            self.canvas.create_rectangle(x, y, x + page_width, y + page_height, fill='white', outline='')
+            self.canvas.create_text(canvas_width / 2, y + page_height / 2, text=f"第 {page_no + 1} 页", fill='#a0a0a0')
+            y += page_height + self.PAGE_GAP
+
+        self.canvas.configure(scrollregion=(0, 0, canvas_width, y))
+        self._request_visible_pages()
+
+    def _visible_pages(self):
+        """计算当前可见（含预渲染范围）的页码"""
+        if not self._page_offsets:
+            return []
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        first = max(bisect.bisect_right(self._page_offsets, top) - 1, 0)
+        last = max(bisect.bisect_right(self._page_offsets, bottom) - 1, 0)
+        first = max(first - self.PRELOAD_PAGES, 0)
+        last = min(last + self.PRELOAD_PAGES, len(self._page_offsets) - 1)
+        return list(range(first, last + 1))
+
+    def _request_visible_pages(self):
+        """请求渲染可见但尚未缓存的页面"""
+        visible = self._visible_pages()
+        with self._renderer.wanted_lock:
+            self._renderer.wanted = {(self._generation, page_no) for page_no in visible}
+        # 滚出可见范围且未完成的请求作废，之后需要时重新请求
+        self._requested &= set(visible)
+
+        for page_no in visible:
+            if page_no in self._images:
+                self._images.move_to_end(page_no)
+            elif page_no not in self._requested:
+                self._requested.add(page_no)
+                self._renderer.requests.put(('render', self._generation, page_no, self._zoom))
+
+    def _poll_results(self):
+        """在界面线程中处理渲染结果"""
+        try:
+            while True:
+                result = self._results.get_nowait()
+                if result[1] != self._generation:
+                    continue
+                if result[0] == 'opened':
+                    self._page_sizes = result[2]
+                    self.title_var.set(f"{os.path.basename(self.file_path)}（共 {len(self._page_sizes)} 页）")
+                    self._layout()
+                elif result[0] == 'page':
+                    self._show_page(*result[2:])
+                elif result[0] == 'error':
+                    self.title_var.set(f"预览失败: {result[2]}")
+        except queue.Empty:
+            pass
+        if self.winfo_exists():
+            self.after(30, self._poll_results)
+
+    def _show_page(self, page_no, zoom, ppm_data):
+        """显示渲染好的页面，超过缓存上限时释放最久未看的页面"""
+        self._requested.discard(page_no)
+        if zoom != self._zoom or page_no >= len(self._page_offsets):
+            return
+        if page_no in self._images:
+            # 滚出后重新请求的页面可能收到两次结果，已显示的不再重复创建
+            self._images.move_to_end(page_no)
+            return
+
+        image = tk.PhotoImage(data=ppm_data)
+        x = (self.canvas.winfo_width() - image.width()) / 2
+        self._image_items[page_no] = self.canvas.create_image(
+            x, self._page_offsets[page_no], image=image, anchor=tk.NW
+        )
+        self._images[page_no] = image
+
+        while len(self._images) > self.CACHE_SIZE:
+            old_page, _ = self._images.popitem(last=False)
+            item = self._image_items.pop(old_page, None)
+            if item is not None:
+                self.canvas.delete(item)
+
+    def _on_configure(self, event):
+        """窗口大小变化后重新排版（延迟执行，避免拖动时频繁重排）"""
+        if self._relayout_job is not None:
+            self.after_cancel(self._relayout_job)
+        self._relayout_job = self.after(200, self._relayout)
+
+    def _relayout(self):
+        self._relayout_job = None
+        if self._page_sizes:
+            self._layout()
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        if self._page_offsets:
+            self._request_visible_pages()
+
+    def _on_mousewheel(self, event):
+        self._scroll(int(-event.delta / 120) * 3)
+
+    def _scroll(self, units):
+        self.canvas.yview_scroll(units, 'units')
+        if self._page_offsets:
+            self._request_visible_pages()
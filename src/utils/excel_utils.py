@@ -1,141 +1,295 @@
 import os
+import re
 import logging
+import threading
+from collections import OrderedDict
+
 import pandas as pd
 
+from src.models.taxonomy import get_taxonomy
+
 class ExcelFileNotFound(Exception):
     pass
 
-def get_excel_info(import_root_dir, person_name, person_id, class_code):
+# 已解析的Excel目录缓存（按路径+修改时间+大小判断是否有效）
+_CATALOG_CACHE_SIZE = 32
+_catalog_cache = OrderedDict()
+_catalog_cache_lock = threading.Lock()
+
+
+def get_sheet_name(class_code):
+    """
+    根据类号获取对应的sheet名（由当前分类体系决定）。
+    :return: sheet名，无对应sheet时返回 None
+    """
+    return get_taxonomy().sheet_name_for(class_code)
+
+
+def list_excel_files(import_root_dir):
+    """列出目录下所有Excel文件（跳过临时文件），按遍历顺序返回"""
+    excel_files = []
+    for root, dirs, files in os.walk(import_root_dir):
+        for file in files:
+            if file.lower().endswith('.xlsx') and not file.startswith('~'):
+                excel_files.append(os.path.join(root, file))
+    return excel_files
+
+
+def find_excel_file(import_root_dir, person_name, person_id, excel_files=None):
+    """
+    查找人员对应的Excel文件，优先编号+姓名精确匹配。
+    :param excel_files: 预先列出的Excel文件列表（批量查找时避免重复遍历目录）
+    :return: Excel文件路径，未找到返回 None
+    """
+    if excel_files is None:
+        logging.info(f"开始搜索Excel文件 - 目录: {import_root_dir}")
+        excel_files = list_excel_files(import_root_dir)
+    logging.debug(f"搜索条件 - 编号: '{person_id}', 姓名: '{person_name}'")
+
+    # 首先尝试精确匹配
+    for file_path in excel_files:
+        file_name_without_ext = os.path.splitext(os.path.basename(file_path))[0]
+
+        # 1. 检查文件名是否包含编号或姓名
+        if (person_id and person_id in file_name_without_ext) or \
+           (person_name and person_name in file_name_without_ext):
+            logging.debug(f"找到匹配的Excel文件(包含编号/姓名): {file_path}")
+            return file_path
+
+        # 2. 检查文件名是否与编号或姓名相同（不区分大小写）
+        if (person_id and person_id.lower() == file_name_without_ext.lower()) or \
+           (person_name and person_name.lower() == file_name_without_ext.lower()):
+            logging.debug(f"找到匹配的Excel文件(完全匹配): {file_path}")
+            return file_path
+
+        # 3. 检查文件名是否以下划线分隔，并且包含编号或姓名
+        parts = file_name_without_ext.split('_')
+        if (person_id and person_id in parts) or \
+           (person_name and person_name in parts):
+            logging.debug(f"找到匹配的Excel文件(部分匹配): {file_path}")
+            return file_path
+
+        # 4. 检查文件名是否包含编号或姓名的部分匹配（不区分大小写）
+        if (person_id and any(part.lower() == person_id.lower() for part in parts)) or \
+           (person_name and any(part.lower() == person_name.lower() for part in parts)):
+            logging.debug(f"找到匹配的Excel文件(部分不区分大小写匹配): {file_path}")
+            return file_path
+
+    # 如果还没找到，尝试更宽松的匹配
+    logging.debug("未找到精确匹配的Excel文件，尝试更宽松的匹配...")
+    for file_path in excel_files:
+        file_name_without_ext = os.path.splitext(os.path.basename(file_path))[0].lower()
+
+        # 检查是否包含编号或姓名的部分内容
+        if (person_id and person_id.lower() in file_name_without_ext) or \
+           (person_name and person_name.lower() in file_name_without_ext):
+            logging.debug(f"找到部分匹配的Excel文件: {file_path}")
+            return file_path
+
+    return None
+
+
+class ExcelFileIndex:
+    """
+    批量查找人员Excel文件时使用的索引：按文件名中的数字段、非数字段的所有子串建立索引，
+    先取出可能匹配的少量文件，再按 find_excel_file 的规则确定结果（结果与逐个查找相同）。
+    """
+
+    # 建立索引的子串最大长度，超过时退回逐个比较
+    MAX_TOKEN_LENGTH = 12
+
+    def __init__(self, import_root_dir, excel_files=None):
+        self.import_root_dir = import_root_dir
+        self.excel_files = list_excel_files(import_root_dir) if excel_files is None else list(excel_files)
+        self._index = {}
+        for position, file_path in enumerate(self.excel_files):
+            name = os.path.splitext(os.path.basename(file_path))[0].lower()
+            for run in re.findall(r'\d+|\D+', name):
+                for start in range(len(run)):
+                    for end in range(start + 1, min(len(run), start + self.MAX_TOKEN_LENGTH) + 1):
+                        self._index.setdefault(run[start:end], set()).add(position)
+
+    def _candidates(self, value):
+        """文件名（不区分大小写）包含 value 的文件位置；无法用索引判断时返回 None"""
+        value = value.lower()
+        if len(value) > self.MAX_TOKEN_LENGTH or len(re.findall(r'\d+|\D+', value)) != 1:
+            return None
+        return self._index.get(value, set())
+
+    def find(self, person_name, person_id):
+        """查找人员对应的Excel文件，规则同 find_excel_file"""
+        positions = set()
+        for value in (person_id, person_name):
+            if not value:
+                continue
+            candidates = self._candidates(value)
+            if candidates is None:
+                return find_excel_file(self.import_root_dir, person_name, person_id, self.excel_files)
+            positions |= candidates
+        if not positions:
+            return None
+        return find_excel_file(self.import_root_dir, person_name, person_id,
+                               [self.excel_files[position] for position in sorted(positions)])
+
+
+def _parse_int_cell(row, column, location):
+    """
+    读取数字单元格。
+    :return: 整数文本；单元格为空或不是数字时返回空字符串（不是数字时记录警告）
+    """
+    value = row.iloc[column]
+    if pd.isna(value):
+        return ""
+    try:
+        return str(int(value))
+    except (TypeError, ValueError):
+        try:
+            return str(int(float(str(value).strip())))
+        except (TypeError, ValueError, OverflowError):
+            logging.warning(f"Excel目录单元格不是数字，已忽略: {location or ''} 第{column + 1}列 '{value}'")
+            return ""
+
+
+def parse_catalog_row(row, location=None):
+    """
+    解析目录sheet中的一行（日期、页数不是数字时留空，不影响其他行）。
+    :param location: 行的位置说明，用于日志
+    :return: (material_name, file_date, page_count)
+    """
+    material_name = str(row.iloc[1]) if len(row) > 1 and pd.notna(row.iloc[1]) else ""
+    file_date = ""
+    page_count = ""
+    # 日期
+    if len(row) > 4:
+        year, month, day = (_parse_int_cell(row, column, location) for column in (2, 3, 4))
+        if year and month and day:
+            file_date = f"{year}-{month}-{day}"
+    # 页数
+    if len(row) > 5:
+        page_count = _parse_int_cell(row, 5, location)
+    return material_name, file_date, page_count
+
+
+def parse_workbook(excel_file_path):
+    """
+    解析整个Excel文件的所有目录sheet。
+    :return: {sheet_name: {class_code: (material_name, file_date, page_count)}}
+    """
+    catalog = {}
+    sheets = pd.read_excel(excel_file_path, sheet_name=None)
+    for sheet_name, df in sheets.items():
+        entries = {}
+        for i, value in enumerate(df.iloc[:, 0] if not df.empty else []):
+            class_code = str(value).strip()
+            # 同一类号只取第一行，与逐行查找的结果一致
+            if class_code and class_code not in entries:
+                # Excel行号：表头占第1行
+                location = f"{excel_file_path} [{sheet_name}] 第{i + 2}行"
+                try:
+                    entries[class_code] = parse_catalog_row(df.iloc[i], location)
+                except Exception as e:
+                    # 单行格式错误不影响整个文件，跳过该行
+                    logging.warning(f"Excel目录行解析失败，已跳过: {location}, {str(e)}")
+        catalog[sheet_name] = entries
+    return catalog
+
+
+def parse_workbook_rows(excel_file_path):
+    """
+    解析Excel目录为紧凑的行（在进程池中执行，异常不抛出）。
+    :return: (excel_file_path, [(sheet_name, class_code, material_name, file_date, page_count), ...], 错误信息或None)
+    """
+    try:
+        catalog = parse_workbook(excel_file_path)
+    except Exception as e:
+        return excel_file_path, [], str(e)
+    rows = [
+        (sheet_name, class_code, material_name, file_date, page_count)
+        for sheet_name, entries in catalog.items()
+        for class_code, (material_name, file_date, page_count) in entries.items()
+    ]
+    return excel_file_path, rows, None
+
+
+def load_excel_catalog(excel_file_path, db=None, conn=None):
+    """
+    读取Excel目录（带缓存，文件修改后自动失效）。
+    先查内存缓存，再查已入库的Excel目录（WorkbookIngestor 写入，程序重启后仍有效），都没有时才解析Excel。
+    :param db: Database 对象，不传时不查询已入库的Excel目录
+    :param conn: 数据库连接（后台线程中需传入独立连接），默认使用 db.conn
+    :return: {sheet_name: {class_code: (material_name, file_date, page_count)}}
+    """
+    stat = os.stat(excel_file_path)
+    key = (os.path.abspath(excel_file_path), stat.st_mtime, stat.st_size)
+    with _catalog_cache_lock:
+        if key in _catalog_cache:
+            _catalog_cache.move_to_end(key)
+            return _catalog_cache[key]
+
+    catalog = _load_from_database(db, excel_file_path, conn) if db is not None else None
+    if catalog is None:
+        catalog = parse_workbook(excel_file_path)
+
+    with _catalog_cache_lock:
+        _catalog_cache[key] = catalog
+        while len(_catalog_cache) > _CATALOG_CACHE_SIZE:
+            _catalog_cache.popitem(last=False)
+    return catalog
+
+
+def _load_from_database(db, excel_file_path, conn):
+    try:
+        return db.get_excel_catalog(excel_file_path, conn=conn)
+    except Exception as e:
+        # 数据库读取失败时直接解析Excel
+        logging.warning(f"读取已入库的Excel目录失败: {str(e)}")
+        return None
+
+
+def invalidate_excel_cache(excel_file_path=None):
+    """清除Excel目录的内存缓存（不指定路径时清除全部）"""
+    with _catalog_cache_lock:
+        if excel_file_path is None:
+            _catalog_cache.clear()
+            return
+        abs_path = os.path.abspath(excel_file_path)
+        for key in [key for key in _catalog_cache if key[0] == abs_path]:
+            del _catalog_cache[key]
+
+
+def lookup_catalog(catalog, class_code):
+    """
+    在已解析的Excel目录中查找类号。
+    :return: (material_name, file_date, page_count)
+    """
+    sheet_name = get_sheet_name(class_code)
+    if not sheet_name:
+        return "", "", ""
+    if sheet_name not in catalog:
+        # 尝试模糊sheet名
+        candidates = [s for s in catalog if sheet_name in s]
+        if not candidates:
+            return "", "", ""
+        sheet_name = candidates[0]
+    return catalog[sheet_name].get(class_code, ("", "", ""))
+
+
+def get_excel_info(import_root_dir, person_name, person_id, class_code, db=None):
     """
     从Excel获取文件相关信息。
     :param import_root_dir: Excel文件根目录
     :param person_name: 人名
     :param person_id: 编号
     :param class_code: 类号
+    :param db: Database 对象，传入时优先使用已入库的Excel目录
     :return: (material_name, file_date, page_count)
     :raises ExcelFileNotFound: 未找到匹配的Excel文件
     """
-    material_name = ""
-    file_date = ""
-    page_count = ""
+    if not get_sheet_name(class_code):
+        return "", "", ""
 
-    # 解析sheet名
-    class_parts = class_code.split('-')
-    main_code = class_parts[0]
-    sheet_code = main_code
-    if main_code in ['4', '9'] and len(class_parts) >= 2:
-        sheet_code = f"{main_code}-{class_parts[1]}"
-    sheet_map = {
-        '1': '一', '2': '二', '3': '三',
-        '4-1': '四-1', '4-2': '四-2', '4-3': '四-3', '4-4': '四-4',
-        '5': '五', '6': '六', '7': '七', '8': '八',
-        '9-1': '九-1', '9-2': '九-2', '9-3': '九-3', '9-4': '九-4',
-        '10': '十'
-    }
-    sheet_name = sheet_map.get(sheet_code)
-    if not sheet_name:
-        return material_name, file_date, page_count
-
-    # 搜索Excel文件，优先编号+姓名精确匹配
-    excel_file_path = None
-    logging.info(f"开始搜索Excel文件 - 目录: {import_root_dir}")
-    logging.info(f"搜索条件 - 编号: '{person_id}', 姓名: '{person_name}', 类号: '{class_code}'")
-    
-    # 首先尝试精确匹配
-    for root, dirs, files in os.walk(import_root_dir):
-        excel_files = [f for f in files if f.lower().endswith('.xlsx') and not f.startswith('~')]
-        
-        for file in excel_files:
-            file_path = os.path.join(root, file)
-            file_name_without_ext = os.path.splitext(file)[0]
-            
-            # 记录调试信息
-            logging.debug(f"检查文件: {file_path}")
-            
-            # 尝试不同的匹配模式
-            # 1. 检查文件名是否包含编号或姓名
-            if (person_id and person_id in file_name_without_ext) or \
-               (person_name and person_name in file_name_without_ext):
-                logging.info(f"找到匹配的Excel文件(包含编号/姓名): {file_path}")
-                excel_file_path = file_path
-                break
-                
-            # 2. 检查文件名是否与编号或姓名相同（不区分大小写）
-            if (person_id and person_id.lower() == file_name_without_ext.lower()) or \
-               (person_name and person_name.lower() == file_name_without_ext.lower()):
-                logging.info(f"找到匹配的Excel文件(完全匹配): {file_path}")
-                excel_file_path = file_path
-                break
-                
-            # 3. 检查文件名是否以下划线分隔，并且包含编号或姓名
-            parts = file_name_without_ext.split('_')
-            if (person_id and person_id in parts) or \
-               (person_name and person_name in parts):
-                logging.info(f"找到匹配的Excel文件(部分匹配): {file_path}")
-                excel_file_path = file_path
-                break
-                
-            # 4. 检查文件名是否包含编号或姓名的部分匹配（不区分大小写）
-            if (person_id and any(part.lower() == person_id.lower() for part in parts)) or \
-               (person_name and any(part.lower() == person_name.lower() for part in parts)):
-                logging.info(f"找到匹配的Excel文件(部分不区分大小写匹配): {file_path}")
-                excel_file_path = file_path
-                break
-                
-        if excel_file_path:
-            break
-    
-    # 如果还没找到，尝试更宽松的匹配
-    if not excel_file_path:
-        logging.info("未找到精确匹配的Excel文件，尝试更宽松的匹配...")
-        for root, dirs, files in os.walk(import_root_dir):
-            excel_files = [f for f in files if f.lower().endswith('.xlsx') and not f.startswith('~')]
-            
-            for file in excel_files:
-                file_path = os.path.join(root, file)
-                file_name_without_ext = os.path.splitext(file)[0].lower()
-                
-                # 检查是否包含编号或姓名的部分内容
-                if (person_id and person_id.lower() in file_name_without_ext) or \
-                   (person_name and person_name.lower() in file_name_without_ext):
-                    logging.info(f"找到部分匹配的Excel文件: {file_path}")
-                    excel_file_path = file_path
-                    break
-            
-            if excel_file_path:
-                break
+    excel_file_path = find_excel_file(import_root_dir, person_name, person_id)
     if not excel_file_path:
         raise ExcelFileNotFound(f"未找到匹配的Excel文件: {person_name}")
 
-    # 读取sheet
-    excel = pd.ExcelFile(excel_file_path)
-    if sheet_name not in excel.sheet_names:
-        # 尝试模糊sheet名
-        candidates = [s for s in excel.sheet_names if sheet_name in s]
-        if candidates:
-            sheet_name = candidates[0]
-        else:
-            return material_name, file_date, page_count
-    df = pd.read_excel(excel_file_path, sheet_name=sheet_name)
-    if df.empty:
-        return material_name, file_date, page_count
-    # 精确查找A列
-    found = False
-    for i, value in enumerate(df.iloc[:, 0]):
-        if str(value).strip() == class_code:
-            row = df.iloc[i]
-            material_name = str(row.iloc[1]) if len(row) > 1 and pd.notna(row.iloc[1]) else ""
-            # 日期
-            if len(row) > 4:
-                year = str(int(row.iloc[2])) if pd.notna(row.iloc[2]) else ""
-                month = str(int(row.iloc[3])) if pd.notna(row.iloc[3]) else ""
-                day = str(int(row.iloc[4])) if pd.notna(row.iloc[4]) else ""
-                if year and month and day:
-                    file_date = f"{year}-{month}-{day}"
-            # 页数
-            if len(row) > 5:
-                page_value = row.iloc[5]
-                page_count = str(int(page_value)) if pd.notna(page_value) else ""
-            found = True
-            break
-    return material_name, file_date, page_count
+    return lookup_catalog(load_excel_catalog(excel_file_path, db), class_code)
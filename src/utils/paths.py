@@ -56,6 +56,10 @@ def get_database_path():
     """获取数据库文件路径"""
     return os.path.join(get_database_dir(), 'archimgr.db')
 
+def get_local_access_log_path():
+    """获取本机访问记录库的路径（使用只读数据库副本时，访问记录写入本机）"""
+    return os.path.join(get_database_dir(), 'access_log.db')
+
 def get_temp_dir():
     """获取临时文件目录"""
     temp_dir = os.path.join(get_user_data_dir(), 'temp')
@@ -81,6 +85,24 @@ def get_icon_path():
     """获取应用图标路径"""
     return os.path.join(get_resources_path(), 'app.ico')
 
+def get_backup_dir(settings=None):
+    """
+    获取数据库备份目录：优先使用用户设置中的 backup_dir，其次为 config/settings.ini 中的 [Paths] backup_dir，
+    相对路径以用户数据目录为基准。
+    :param settings: 用户设置（dict）
+    """
+    backup_dir = (settings or {}).get('backup_dir')
+    if not backup_dir:
+        import configparser
+        config = configparser.ConfigParser()
+        config.read(os.path.join(get_application_path(), 'config', 'settings.ini'), encoding='utf-8')
+        backup_dir = config.get('Paths', 'backup_dir', fallback='backups')
+    if not os.path.isabs(backup_dir):
+        backup_dir = os.path.join(get_user_data_dir(), backup_dir)
+    backup_dir = os.path.normpath(backup_dir)
+    os.makedirs(backup_dir, exist_ok=True)
+    return backup_dir
+
 def get_exports_dir():
     """获取导出文件目录，默认放在用户的文档目录下"""
     try:
@@ -0,0 +1,82 @@
+import os
+import logging
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+def is_pymupdf_available():
+    """检查是否安装了PyMuPDF"""
+    return fitz is not None
+
+
+def extract_pdf_info(file_path):
+    """
+    读取PDF的页数和元数据（在工作进程中执行）。
+    :param file_path: PDF文件路径
+    :return: dict，包含 file_path, page_count, metadata, parse_error, error_message
+    """
+    result = {
+        'file_path': file_path,
+        'page_count': None,
+        'metadata': {},
+        'parse_error': 0,
+        'error_message': None,
+    }
+    if fitz is None:
+        result['parse_error'] = 1
+        result['error_message'] = "未安装PyMuPDF"
+        return result
+
+    try:
+        with fitz.open(file_path) as doc:
+            result['page_count'] = doc.page_count
+            # 只保留有值的元数据字段
+            result['metadata'] = {k: v for k, v in (doc.metadata or {}).items() if v}
+    except Exception as e:
+        result['parse_error'] = 1
+        result['error_message'] = str(e)
+    return result
+
+
+def get_file_signature(file_path):
+    """
+    获取文件的 (mtime, size)，用于判断文件是否变化。
+    :return: (mtime, size)，文件不存在时返回 None
+    """
+    try:
+        stat = os.stat(file_path)
+        return stat.st_mtime, stat.st_size
+    except OSError as e:
+        logging.debug(f"无法读取文件状态: {file_path}, {str(e)}")
+        return None
+
+
+def render_first_page(file_path, output_path, dpi=36):
+    """
+    将PDF第一页渲染为PNG缩略图（在工作进程中执行）。
+    :param file_path: PDF文件路径
+    :param output_path: 缩略图保存路径
+    :param dpi: 渲染分辨率
+    :return: (file_path, 是否成功)
+    """
+    if fitz is None:
+        return file_path, False
+
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with fitz.open(file_path) as doc:
+            if doc.page_count == 0:
+                return file_path, False
+            pixmap = doc.load_page(0).get_pixmap(dpi=dpi)
+            pixmap.save(temp_path, output="png")
+        # 先写临时文件再替换，避免其他进程读到不完整的图片
+        os.replace(temp_path, output_path)
+        return file_path, True
+    except Exception as e:
+        logging.warning(f"渲染缩略图失败: {file_path}, {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return file_path, False
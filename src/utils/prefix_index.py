@@ -0,0 +1,59 @@
+import bisect
+import threading
+
+# 前缀查询的上界字符
+_MAX_CHAR = '\U0010ffff'
+
+
+class PrefixIndex:
+    """
+    内存前缀索引：有序数组 + 二分查找。
+    比逐字符建树的字典树占用内存少得多，前缀查询为 O(log n + k)。
+    """
+
+    def __init__(self, values=()):
+        self._values = sorted(set(values))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def replace(self, values):
+        """用新的取值集合整体替换索引"""
+        new_values = sorted(set(values))
+        with self._lock:
+            self._values = new_values
+
+    def add(self, values):
+        """增量添加取值（已存在的忽略）"""
+        with self._lock:
+            current = self._values
+            new_values = [value for value in set(values) if value and not self._contains(current, value)]
+            if not new_values:
+                return
+            if len(new_values) > 64:
+                # 大批量时合并后重新排序，比逐个插入快
+                self._values = sorted(current + new_values)
+            else:
+                current = list(current)
+                for value in new_values:
+                    bisect.insort(current, value)
+                self._values = current
+
+    @staticmethod
+    def _contains(values, value):
+        index = bisect.bisect_left(values, value)
+        return index < len(values) and values[index] == value
+
+    def search(self, prefix, limit=10):
+        """
+        查找以 prefix 开头的取值。
+        :return: 按字典序排列的取值列表，最多 limit 个
+        """
+        if not prefix:
+            return []
+        # 读取时不加锁：更新总是替换整个列表，不修改正在读取的列表
+        values = self._values
+        start = bisect.bisect_left(values, prefix)
+        end = bisect.bisect_left(values, prefix + _MAX_CHAR, start, min(len(values), start + limit))
+        return values[start:end]
@@ -0,0 +1,35 @@
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# 全局进程池（按需创建，供PDF解析、缩略图渲染等CPU密集型任务共用）
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_count():
+    """获取工作进程数量，保留一个CPU核心给界面线程"""
+    cpu_count = os.cpu_count() or 2
+    return max(1, min(cpu_count - 1, 8))
+
+
+def get_process_pool():
+    """获取共享进程池，首次调用时创建"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = get_worker_count()
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            logging.info(f"已创建后台进程池，工作进程数: {workers}")
+        return _pool
+
+
+def shutdown_process_pool():
+    """关闭共享进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+            logging.info("后台进程池已关闭")
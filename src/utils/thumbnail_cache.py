@@ -0,0 +1,124 @@
+import os
+import hashlib
+import logging
+import threading
+
+from src.utils.paths import get_temp_dir
+
+# 计算内容指纹时读取的文件头、中、尾各部分的字节数
+FINGERPRINT_CHUNK_SIZE = 64 * 1024
+# 新写入的缩略图累计超过容量上限的该比例时才检查是否需要淘汰（检查需要遍历整个缓存目录）
+EVICT_CHECK_RATIO = 0.05
+
+
+def get_content_fingerprint(file_path):
+    """
+    计算文件的内容指纹（文件大小 + 头、中、尾各64KB的SHA1），只取决于文件内容：
+    内容相同的副本得到相同的指纹，修改时间变化（复制、touch）不影响指纹。
+    PDF修改后通常在末尾追加内容或大小变化，会得到新指纹。
+    :return: 指纹字符串，文件无法读取时返回 None
+    """
+    try:
+        size = os.path.getsize(file_path)
+        sha1 = hashlib.sha1(str(size).encode())
+        with open(file_path, 'rb') as f:
+            sha1.update(f.read(FINGERPRINT_CHUNK_SIZE))
+            if size > FINGERPRINT_CHUNK_SIZE * 3:
+                f.seek((size - FINGERPRINT_CHUNK_SIZE) // 2)
+                sha1.update(f.read(FINGERPRINT_CHUNK_SIZE))
+            if size > FINGERPRINT_CHUNK_SIZE * 2:
+                f.seek(-FINGERPRINT_CHUNK_SIZE, os.SEEK_END)
+                sha1.update(f.read(FINGERPRINT_CHUNK_SIZE))
+        return sha1.hexdigest()
+    except OSError as e:
+        logging.debug(f"计算文件指纹失败: {file_path}, {str(e)}")
+        return None
+
+
+class ThumbnailCache:
+    """按内容寻址的缩略图磁盘缓存，超过容量上限时按最近使用时间淘汰"""
+
+    def __init__(self, cache_dir=None, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.path.join(get_temp_dir(), 'thumbnails')
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 上次检查淘汰后新写入的字节数；None 表示本次运行还没有检查过
+        self._written_bytes = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_path(self, fingerprint, dpi):
+        """获取缩略图在缓存中的路径（前两位作为子目录，避免单个目录文件过多）"""
+        return os.path.join(self.cache_dir, fingerprint[:2], f"{fingerprint}_{dpi}.png")
+
+    def prepare_path(self, fingerprint, dpi):
+        """获取写入缩略图的路径，并创建所在的子目录"""
+        path = self.get_path(fingerprint, dpi)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def get(self, fingerprint, dpi):
+        """
+        查找缓存的缩略图，命中时更新其使用时间。
+        :return: 缩略图路径，未命中返回 None
+        """
+        path = self.get_path(fingerprint, dpi)
+        if not os.path.exists(path):
+            return None
+        try:
+            # 用修改时间记录最近使用时间（部分系统不更新访问时间）
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+
+    def add_written(self, size):
+        """记录新写入的缩略图大小"""
+        with self._lock:
+            if self._written_bytes is not None:
+                self._written_bytes += size
+
+    def evict_if_needed(self):
+        """
+        本次运行首次调用，或上次检查后新写入的缩略图超过阈值时才检查淘汰。
+        :return: 删除的文件数
+        """
+        with self._lock:
+            if self._written_bytes is not None and self._written_bytes < self.max_bytes * EVICT_CHECK_RATIO:
+                return 0
+        return self.evict()
+
+    def evict(self):
+        """缓存超过容量上限时，删除最久未使用的缩略图直到降到上限的90%"""
+        with self._lock:
+            self._written_bytes = 0
+            entries = []
+            total_size = 0
+            for root, _, files in os.walk(self.cache_dir):
+                for file in files:
+                    if not file.endswith('.png'):
+                        continue
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total_size += stat.st_size
+
+            if total_size <= self.max_bytes:
+                return 0
+
+            target_size = self.max_bytes * 0.9
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total_size <= target_size:
+                    break
+                try:
+                    os.remove(path)
+                    total_size -= size
+                    removed += 1
+                except OSError as e:
+                    logging.debug(f"删除缩略图缓存失败: {path}, {str(e)}")
+
+            logging.info(f"缩略图缓存淘汰 {removed} 个文件，当前大小 {total_size / 1024 / 1024:.1f} MB")
+            return removed